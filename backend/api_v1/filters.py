@@ -0,0 +1,80 @@
+import operator
+import re
+from functools import reduce
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    """
+    Поиск ?search= по индексам PostgreSQL вместо последовательного просмотра таблицы
+    Запись подходит, если:
+        - каждое слово есть подстрокой в одном из search_fields (icontains, индекс pg_trgm по UPPER(поле))
+        - или все слова - начала слов в search_vector модели (полнотекстовый поиск с морфологией)
+    Без ?ordering= результаты по релевантности: SearchRank, затем TrigramSimilarity
+    На view можно отключить сортировку (search_ranking = False), если порядок задает пагинация
+    """
+    vector_field = 'search_vector'
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = getattr(view, 'search_fields', None)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        ranking = getattr(view, 'search_ranking', True)
+        queryset = self.search(queryset, search_terms, search_fields, ranking)
+        if ranking and not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by('-search_rank', '-search_similarity', '-pk')
+        return queryset
+
+    def search(self, queryset, search_terms, search_fields, ranking=True):
+        """
+        Отбор по словам поиска
+        :param search_terms: list, слова поиска
+        :param search_fields: list, текстовые поля модели
+        :param ranking: bool, аннотировать search_rank и search_similarity
+        :return: QuerySet
+        """
+        fields = [field.lstrip('^=@$') for field in search_fields]
+        condition = reduce(operator.and_, (
+            reduce(operator.or_, (Q(**{f'{field}__icontains': term}) for field in fields))
+            for term in search_terms
+        ))
+
+        query = self.get_search_query(search_terms)
+        if query is not None:
+            condition |= Q(**{self.vector_field: query})
+        queryset = queryset.filter(condition)
+
+        if not ranking:
+            return queryset
+
+        text = ' '.join(search_terms)
+        similarities = [TrigramSimilarity(field, text) for field in fields]
+        queryset = queryset.annotate(
+            search_similarity=Greatest(*similarities) if len(similarities) > 1 else similarities[0],
+        )
+        if query is not None:
+            return queryset.annotate(search_rank=SearchRank(F(self.vector_field), query))
+        return queryset.annotate(search_rank=F('search_similarity'))
+
+    @staticmethod
+    def get_search_query(search_terms):
+        """
+        Запрос to_tsquery по префиксам слов: "курс англ" -> 'курс:* & англ:*'
+        :return: SearchQuery или None, если в поиске нет слов
+        """
+        words = [word for term in search_terms for word in re.findall(r'[^\W_]+', term)]
+        if not words:
+            return None
+        return SearchQuery(
+            ' & '.join(f'{word}:*' for word in words),
+            config=settings.SEARCH_CONFIG,
+            search_type='raw',
+        )
@@ -79,6 +79,8 @@ from backend.users.views import (
     ClientUserDayActivityViewSet,
     CourseClientADView,
     CuratorUserProgressView,
+    CuratorCompanyProgressView,
+    CuratorCompanyRollupView,
     UsersOnlineView,
     UserOnlineHistoryViewSet,
     SingleUserCreation,
@@ -89,6 +91,7 @@ from backend.users.views import (
 from backend.conference.views import GetApiKeyView, ChangeApiKeyViewSet
 from backend.quickauth.views import QuickloginViews, ChangeQuickLogin
 from backend.notifications.views import MessageNotificationView, MessageNotificationDetail
+from backend.extra.views import ImportJobListCreate, ImportJobDetail
 
 app_name = 'api_v1'
 
@@ -201,6 +204,8 @@ curator_patterns = ([
     path('all_activity/', curator_views.CuratorUserAllActivityListView.as_view(), name='curator_all_activity'),
     path('users/', CuratorUserViewSet.as_view({'get': 'list'}), name='curator_users'),
     path('user/<int:pk>/progress/', CuratorUserProgressView.as_view(), name='curator_user_progress'),
+    path('progress/', CuratorCompanyProgressView.as_view(), name='curator_company_progress'),
+    path('progress/companies/', CuratorCompanyRollupView.as_view(), name='curator_company_rollup'),
     path('user_course_settings/', CuratorUserCourseSettingsViewSet.as_view(), name='user_course_settings'),
 ])
 
@@ -222,6 +227,12 @@ notifications_patterns = ([
     path('<int:pk>', MessageNotificationDetail.as_view(), name='update notification'),
 ])
 
+# API IMPORT JOBS
+import_jobs_patterns = ([
+    path('', ImportJobListCreate.as_view(), name='import_job_list_create'),
+    path('<int:id>/', ImportJobDetail.as_view(), name='import_job_detail'),
+])
+
 urlpatterns = [
     path('token/', include(jwt_patterns)),
     path('users/', include(company_patterns)),
@@ -240,4 +251,5 @@ urlpatterns = [
     path('conference/', include(conference_patterns)),
     path('quickauth/', include(quicklogin_patterns)),
     path('notifications/', include(notifications_patterns)),
+    path('import_jobs/', include(import_jobs_patterns)),
 ]
@@ -0,0 +1,115 @@
+from collections import namedtuple
+
+from django.db import transaction
+from openpyxl import load_workbook
+
+from backend.courses.models import Answer, Question, TaskScoring
+
+# Строка файла с вопросом: номер строки, текст, баллы и ответы [(номер строки, текст, правильный ли), ...]
+ParsedQuestion = namedtuple('ParsedQuestion', ['row', 'text', 'score', 'answers'])
+
+# Пределы models.SmallIntegerField для Question.score
+MAX_SCORE = 32767
+
+
+def iter_questions(question_file):
+    """
+    Потоковый разбор файла вопросов '.xlsx' за один проход (read_only)
+    Колонки: A - номер вопроса, B - баллы, C - вопрос, D - вариант ответа, E - правильный ли ответ
+    Вопрос начинается со строки с заполненной колонкой A и продолжается до следующего вопроса,
+    первая строка - названия столбцов.
+
+    :return: generator, ParsedQuestion
+    """
+    wb = load_workbook(filename=question_file, read_only=True)
+    try:
+        question = None
+        rows = wb.active.iter_rows(min_row=2, max_col=5, values_only=True)
+        for row_num, values in enumerate(rows, start=2):
+            num, score, text, answer, is_true = (tuple(values) + (None,) * 5)[:5]
+
+            if num:
+                if question:
+                    yield question
+                question = ParsedQuestion(row_num, text, score, [])
+
+            if question and answer:
+                question.answers.append((row_num, answer, is_true))
+
+        if question:
+            yield question
+    finally:
+        wb.close()
+
+
+def validate_question(question):
+    """
+    Проверка разобранного вопроса
+    :return: str, текст ошибки или None
+    """
+    if question.text is None or not str(question.text).strip():
+        return 'Не заполнен текст вопроса'
+
+    if question.score:
+        try:
+            score = int(question.score)
+        except (TypeError, ValueError):
+            return f'Баллы за вопрос должны быть целым числом: {question.score}'
+        if not 0 <= score <= MAX_SCORE:
+            return f'Баллы за вопрос должны быть от 0 до {MAX_SCORE}: {question.score}'
+
+
+def save_questions(task_id, questions):
+    """
+    Создание вопросов задания и их ответов пакетными вставками в одной транзакции.
+    Снимок баллов задания (TaskScoring) пересчитывается один раз.
+
+    :param questions: list, ParsedQuestion (уже проверенные validate_question)
+    :return: list, созданные вопросы
+    """
+    question_instances = []
+    for question in questions:
+        payload = {
+            'is_free_answer': not question.answers,
+        }
+        if question.score:
+            payload['score'] = int(question.score)
+        question_instances.append(Question(text=question.text, **payload))
+
+    with transaction.atomic():
+        Question.objects.bulk_create(question_instances)
+
+        through = Question.tasks.through
+        through.objects.bulk_create([
+            through(question_id=question_instance.pk, task_id=task_id)
+            for question_instance in question_instances
+        ])
+
+        Answer.objects.bulk_create([
+            Answer(question=question_instance, text=answer, is_true=bool(is_true))
+            for question_instance, question in zip(question_instances, questions)
+            for _, answer, is_true in question.answers
+        ])
+
+        TaskScoring.refresh_for_tasks([task_id])
+
+    return question_instances
+
+
+def parse_questions(question_file):
+    """
+    Разбор и проверка вопросов из файла '.xlsx'
+    Вопросы с ошибками пропускаются и возвращаются списком ошибок.
+
+    :return: tuple, (вопросы без ошибок, ошибки [{'row': номер строки, 'error': текст ошибки}, ...])
+    """
+    questions = []
+    errors = []
+    for question in iter_questions(question_file):
+        error = validate_question(question)
+        if error:
+            errors.append({'row': question.row, 'error': error})
+        else:
+            questions.append(question)
+
+    return questions, errors
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from backend.courses.models import TaskVariantAssignment
+from backend.courses.variants import get_user_variants
+from tqdm import tqdm
+
+
+class Command(BaseCommand):
+    help = 'Compare stored task variants (TaskVariantAssignment) with the live selection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Overwrite mismatched variants')
+
+    def handle(self, *args, **kwargs):
+        stored = {}
+        for user_id, material_id, task_id in TaskVariantAssignment.objects.values_list(
+            'user_id', 'material_id', 'task_id',
+        ):
+            stored.setdefault(user_id, {})[material_id] = task_id
+
+        mismatches = 0
+        for user_id, variants in tqdm(stored.items(), desc='check task variants'):
+            live = get_user_variants(user_id, list(variants.keys()))
+            wrong = {
+                material_id: live.get(material_id)
+                for material_id, task_id in variants.items()
+                if live.get(material_id) != task_id
+            }
+            if not wrong:
+                continue
+
+            mismatches += len(wrong)
+            for material_id, task_id in wrong.items():
+                self.stdout.write(
+                    f'user {user_id}, material {material_id}: '
+                    f'stored {variants[material_id]}, live {task_id}'
+                )
+            if kwargs['fix']:
+                TaskVariantAssignment.objects.filter(user_id=user_id, material_id__in=wrong.keys()).delete()
+                TaskVariantAssignment.assign(user_id, {m: t for m, t in wrong.items() if t})
+
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'Mismatched task variants: {mismatches}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'All task variants are consistent.'))
@@ -0,0 +1,28 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from backend.courses.models import MaterialPassing, Passing, UserCourseProgress
+from tqdm import tqdm
+
+
+class Command(BaseCommand):
+    help = 'Fill curator progress read model (UserCourseProgress) from passings and material passings'
+
+    def handle(self, *args, **kwargs):
+        user_tasks = defaultdict(set)
+        for user_id, task_id in Passing.objects.filter(is_trial=False).order_by().values_list(
+            'user_id', 'task_id',
+        ).distinct():
+            user_tasks[user_id].add(task_id)
+
+        user_materials = defaultdict(set)
+        for user_id, material_id in MaterialPassing.objects.order_by().values_list(
+            'user_id', 'material_id',
+        ).distinct():
+            user_materials[user_id].add(material_id)
+
+        for user_id in tqdm(user_tasks.keys() | user_materials.keys(), desc='fill course progress'):
+            UserCourseProgress.refresh_tasks(user_id, user_tasks[user_id])
+            UserCourseProgress.refresh_materials(user_id, user_materials[user_id])
+
+        self.stdout.write(self.style.WARNING(f'Course progress filled for {len(user_tasks.keys() | user_materials.keys())} users.'))
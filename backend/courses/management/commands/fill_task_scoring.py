@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from backend.courses.models import Task, TaskScoring
+from tqdm import tqdm
+
+
+class Command(BaseCommand):
+    help = 'Fill task scoring snapshots (max score, questions count, correct answers)'
+
+    def handle(self, *args, **kwargs):
+        task_ids = list(Task.objects.values_list('id', flat=True))
+        batch_size = 500
+
+        for start in tqdm(range(0, len(task_ids), batch_size), desc='fill task scoring'):
+            TaskScoring.refresh_for_tasks(task_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.WARNING(f'All task scoring filled.'))
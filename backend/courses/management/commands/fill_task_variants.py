@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from backend.courses.models import Material, TaskVariantAssignment
+from backend.courses.variants import get_user_variants
+from backend.users.models import User
+from tqdm import tqdm
+
+
+class Command(BaseCommand):
+    help = 'Fill current task variants of users (TaskVariantAssignment)'
+
+    def handle(self, *args, **kwargs):
+        users = User.objects.filter(courses__is_active=True).distinct()
+
+        for user in tqdm(users, desc='fill task variants'):
+            material_ids = Material.objects.filter(
+                course__users=user,
+                course__is_active=True,
+                is_active=True,
+            ).values_list('id', flat=True).distinct()
+            TaskVariantAssignment.assign(user.pk, get_user_variants(user, list(material_ids)))
+
+        self.stdout.write(self.style.WARNING(f'All task variants filled.'))
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0047_auto_20230204_0555'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='passing',
+            index=models.Index(condition=models.Q(finish_time__isnull=True), fields=['start_time'], name='passing_open_start_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 11:05
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0048_passing_open_start_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskScoring',
+            fields=[
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Время создания')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Время изменения')),
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='scoring', serialize=False, to='courses.Task', verbose_name='Задание')),
+                ('questions_score', models.IntegerField(default=0, verbose_name='Сумма баллов за вопросы')),
+                ('num_questions', models.PositiveIntegerField(default=0, verbose_name='Кол-во вопросов')),
+                ('answer_key', django.contrib.postgres.fields.jsonb.JSONField(default=dict, verbose_name='Правильные ответы')),
+            ],
+            options={
+                'verbose_name': 'Баллы задания',
+                'verbose_name_plural': 'Баллы заданий',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0049_taskscoring'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='passing',
+            index=models.Index(fields=['-created', '-id'], name='passing_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passing',
+            index=models.Index(fields=['task', '-created', '-id'], name='passing_task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passing',
+            index=models.Index(fields=['user', '-created', '-id'], name='passing_user_created_idx'),
+        ),
+    ]
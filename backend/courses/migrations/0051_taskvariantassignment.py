@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 13:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0050_passing_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskVariantAssignment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Время создания')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Время изменения')),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_variants', to='courses.Material', verbose_name='Материал')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variant_assignments', to='courses.Task', verbose_name='Задание')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_variants', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Вариант задания пользователя',
+                'verbose_name_plural': 'Варианты заданий пользователей',
+                'unique_together': {('user', 'material')},
+            },
+        ),
+    ]
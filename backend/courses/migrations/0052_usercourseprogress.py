@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0051_taskvariantassignment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCourseProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Время создания')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Время изменения')),
+                ('material_status', models.SmallIntegerField(blank=True, choices=[(0, 'Не начато'), (1, 'Начато'), (2, 'Пройдено')], null=True, verbose_name='Статус прохождения материала')),
+                ('passing_status', models.SmallIntegerField(blank=True, choices=[(0, 'Тест пройден успешно'), (1, 'На проверке'), (2, 'Превышено допустимое время прохождения'), (3, 'Превышено допустимое кол-во попыток'), (4, 'Процент прохождения не набран'), (5, 'Не закончен')], null=True, verbose_name='Статус прохождения')),
+                ('start_time', models.DateTimeField(blank=True, null=True, verbose_name='Время начала прохождения')),
+                ('finish_time', models.DateTimeField(blank=True, null=True, verbose_name='Время окончания прохождения')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_progress', to='courses.Course', verbose_name='Курс')),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_progress', to='courses.Material', verbose_name='Материал')),
+                ('passing', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.Passing', verbose_name='Последнее прохождение')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='user_progress', to='courses.Task', verbose_name='Задание')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_progress', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Прогресс пользователя по курсу',
+                'verbose_name_plural': 'Прогресс пользователей по курсам',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='usercourseprogress',
+            index=models.Index(fields=['user', 'course'], name='progress_user_course_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='usercourseprogress',
+            constraint=models.UniqueConstraint(condition=models.Q(task__isnull=True), fields=('user', 'material'), name='progress_user_material_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='usercourseprogress',
+            constraint=models.UniqueConstraint(condition=models.Q(task__isnull=False), fields=('user', 'task'), name='progress_user_task_uniq'),
+        ),
+    ]
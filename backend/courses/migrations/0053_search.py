@@ -0,0 +1,65 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0052_usercourseprogress'),
+        # Расширение pg_trgm
+        ('users', '0031_user_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunSQL(
+            'CREATE TRIGGER courses_material_search_vector_update BEFORE INSERT OR UPDATE '
+            'OF title, text, search_vector ON courses_material FOR EACH ROW '
+            "EXECUTE PROCEDURE tsvector_update_trigger(search_vector, 'pg_catalog.russian', title, text)",
+            'DROP TRIGGER courses_material_search_vector_update ON courses_material',
+        ),
+        migrations.RunSQL(
+            'CREATE TRIGGER courses_question_search_vector_update BEFORE INSERT OR UPDATE '
+            'OF text, search_vector ON courses_question FOR EACH ROW '
+            "EXECUTE PROCEDURE tsvector_update_trigger(search_vector, 'pg_catalog.russian', text)",
+            'DROP TRIGGER courses_question_search_vector_update ON courses_question',
+        ),
+        migrations.RunSQL(
+            "UPDATE courses_material SET search_vector = to_tsvector('pg_catalog.russian', "
+            "concat_ws(' ', title, text))",
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            "UPDATE courses_question SET search_vector = to_tsvector('pg_catalog.russian', coalesce(text, ''))",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='material_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='question_search_vector_idx'),
+        ),
+        # icontains -> UPPER(поле) LIKE UPPER(%s)
+        migrations.RunSQL(
+            'CREATE INDEX courses_material_title_trgm_idx ON courses_material USING gin (UPPER(title) gin_trgm_ops)',
+            'DROP INDEX courses_material_title_trgm_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX courses_question_text_trgm_idx ON courses_question USING gin (UPPER(text) gin_trgm_ops)',
+            'DROP INDEX courses_question_text_trgm_idx',
+        ),
+    ]
@@ -1,8 +1,14 @@
 import datetime
+from collections import defaultdict
 
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import Count, OuterRef, Subquery, IntegerField, Q
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery, IntegerField, Q, F, ExpressionWrapper, DateTimeField, \
+    DurationField, Exists, Case, When
+from django.db.models.functions import Cast, Coalesce
 from django.utils.timezone import now
 from django.core.files.base import ContentFile
 from upload_validator import FileTypeValidator
@@ -227,11 +233,17 @@ class Material(BaseModel):
         null=True,
     )
     video_link = models.URLField('Ссылка на видео', blank=True, null=True)
+    # title, text - заполняется триггером в базе (migrations/0053_search)
+    search_vector = SearchVectorField('Поисковый вектор', null=True, editable=False)
 
     class Meta:
         verbose_name = 'Материалы курса'
         verbose_name_plural = 'Материалы курсов'
         ordering = ['rank', 'title', '-created']
+        indexes = [
+            # Поиск backend.api_v1.filters.TrigramSearchFilter, индексы pg_trgm - в миграции
+            GinIndex(fields=['search_vector'], name='material_search_vector_idx'),
+        ]
 
     class MPTTMeta:
         order_insertion_by = ['title']
@@ -279,6 +291,9 @@ class TaskQuerySet(models.QuerySet):
     def with_select_related(self):
         return self.select_related('material')
 
+    def with_scoring(self):
+        return self.select_related('scoring')
+
 
 class Task(BaseModel):
     """
@@ -350,15 +365,26 @@ class Task(BaseModel):
     def __str__(self):
         return self.title
 
+    @property
+    def scoring_snapshot(self):
+        """
+        Снимок данных для подсчета баллов, создается при первом обращении
+        """
+        try:
+            return self.scoring
+        except TaskScoring.DoesNotExist:
+            self.scoring = TaskScoring.refresh_for_tasks([self.pk])[0]
+            return self.scoring
+
     @property
     def num_questions(self):
-        return self.questions.all().count()
+        return self.scoring_snapshot.num_questions
 
     def get_questions_score(self):
         """
         Сумма всех балоов за правильные ответы
         """
-        return sum(q.score for q in self.questions.all())
+        return self.scoring_snapshot.questions_score
 
     def get_min_passing_score(self):
         """
@@ -408,10 +434,17 @@ class Question(BaseModel):
         validators=[MinValueValidator(0)]
     )
 
+    # text - заполняется триггером в базе (migrations/0053_search)
+    search_vector = SearchVectorField('Поисковый вектор', null=True, editable=False)
+
     class Meta:
         verbose_name = 'Вопрос'
         verbose_name_plural = 'Вопросы'
         ordering = ['-created']
+        indexes = [
+            # Поиск backend.api_v1.filters.TrigramSearchFilter, индексы pg_trgm - в миграции
+            GinIndex(fields=['search_vector'], name='question_search_vector_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -428,7 +461,18 @@ class Question(BaseModel):
         """
         Список id правильных ответов
         """
-        return self.answers.filter(is_true=True).values_list('id', flat=True)
+        return self.get_correct_answers()
+
+    def get_correct_answers(self, scoring=None):
+        """
+        Список id правильных ответов из снимка задания (TaskScoring.answer_key),
+        из базы - если снимка нет или вопрос не входит в задание
+        :param scoring: TaskScoring, снимок задания, в котором задан вопрос
+        """
+        answers = scoring and scoring.answer_key.get(str(self.pk))
+        if answers is None:
+            return list(self.answers.filter(is_true=True).values_list('id', flat=True))
+        return answers
 
 
 class Answer(BaseModel):
@@ -455,6 +499,80 @@ class Answer(BaseModel):
         return self.text
 
 
+class TaskScoring(BaseModel):
+    """
+    Снимок данных задания для подсчета баллов: сумма баллов, кол-во вопросов и правильные ответы
+    Обновляется сигналами при изменении вопросов и ответов (backend.courses.signals)
+    """
+
+    task = models.OneToOneField(
+        Task,
+        verbose_name='Задание',
+        related_name='scoring',
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    questions_score = models.IntegerField('Сумма баллов за вопросы', default=0)
+    num_questions = models.PositiveIntegerField('Кол-во вопросов', default=0)
+    answer_key = JSONField('Правильные ответы', default=dict)  # {id вопроса: [id правильных ответов]}
+
+    class Meta:
+        verbose_name = 'Баллы задания'
+        verbose_name_plural = 'Баллы заданий'
+
+    def __str__(self):
+        return f'Баллы задания id_{self.task_id}'
+
+    def correct_answers(self, question_id):
+        """
+        Множество id правильных ответов на вопрос, None - если вопроса нет в задании
+        """
+        answers = self.answer_key.get(str(question_id))
+        if answers is None:
+            return None
+        return frozenset(answers)
+
+    @classmethod
+    def refresh_for_tasks(cls, task_ids):
+        """
+        Пересчет снимков для заданий тремя запросами на чтение
+        :return: list, актуальные снимки
+        """
+        task_ids = set(Task.objects.filter(pk__in=task_ids).values_list('id', flat=True))
+        if not task_ids:
+            return []
+
+        moment = now()
+        snapshots = {task_id: cls(task_id=task_id, updated=moment) for task_id in task_ids}
+        question_tasks = defaultdict(list)
+        for task_id, question_id, score in Question.tasks.through.objects.filter(
+            task_id__in=task_ids,
+        ).values_list('task_id', 'question_id', 'question__score'):
+            snapshot = snapshots[task_id]
+            snapshot.questions_score += score
+            snapshot.num_questions += 1
+            snapshot.answer_key[str(question_id)] = []
+            question_tasks[question_id].append(task_id)
+
+        for question_id, answer_id in Answer.objects.filter(
+            question_id__in=question_tasks.keys(),
+            is_true=True,
+        ).order_by('id').values_list('question_id', 'id'):
+            for task_id in question_tasks[question_id]:
+                snapshots[task_id].answer_key[str(question_id)].append(answer_id)
+
+        existing = set(cls.objects.filter(task_id__in=task_ids).values_list('task_id', flat=True))
+        cls.objects.bulk_update(
+            [snapshot for task_id, snapshot in snapshots.items() if task_id in existing],
+            ['questions_score', 'num_questions', 'answer_key', 'updated'],
+        )
+        cls.objects.bulk_create(
+            [snapshot for task_id, snapshot in snapshots.items() if task_id not in existing],
+            ignore_conflicts=True,
+        )
+        return list(snapshots.values())
+
+
 class MaterialPassing(BaseModel):
     """
     Прохождение материала клиентом
@@ -510,6 +628,97 @@ class PassingQuerySet(models.QuerySet):
     def with_select_related(self):
         return self.select_related('task')
 
+    def with_deadline(self):
+        """
+        аннотируется момент окончания отведенного времени: start_time + task.travel_time
+        """
+        return self.annotate(
+            deadline=ExpressionWrapper(
+                F('start_time') + Cast('task__travel_time', DurationField()),
+                output_field=DateTimeField(),
+            ),
+        )
+
+    def expired(self, moment=None):
+        """
+        Незакрытые прохождения, время которых истекло к moment
+        """
+        return self.filter(
+            finish_time__isnull=True,
+        ).with_deadline().filter(
+            deadline__lte=moment or now(),
+        )
+
+    def with_computed_fields(self):
+        """
+        аннотируются поля для списков прохождений, которые иначе считаются запросом на каждую строку
+        -> attempts_count - кол-во прохождений задания пользователем (task_attempts)
+        -> last_finish_time, last_out_of_time - последнее прохождение задания пользователем (retake_seconds)
+        -> trial_correct, trial_total - правильные ответы / все ответы пробной попытки (response_rate)
+        """
+        from backend.testing.models import UserAnswer
+
+        same_task = Passing.objects.filter(
+            task=OuterRef('task'),
+            user=OuterRef('user'),
+        )
+        attempts = same_task.order_by().values('task').annotate(c=Count('pk')).values('c')
+        latest = same_task.order_by('-created')
+
+        # Выбранные ответы: ответ не того вопроса или неверный
+        through = UserAnswer.answers.through
+        wrong_chosen = through.objects.filter(
+            useranswer=OuterRef('pk'),
+        ).exclude(
+            answer__question=OuterRef('question'),
+            answer__is_true=True,
+        )
+        # Правильные ответы вопроса: все и выбранные (в answers или в одиночном answer).
+        # Ссылки только на ответ пользователя - в Django 2.2 OuterRef(OuterRef()) не разрешается
+        question_true = Answer.objects.filter(
+            question=OuterRef('question'),
+            is_true=True,
+        ).order_by().values('question')
+        true_total = question_true.annotate(c=Count('pk')).values('c')
+        true_chosen = question_true.filter(
+            Q(pk=OuterRef('answer')) | Q(u_answers=OuterRef('pk')),
+        ).annotate(c=Count('pk', distinct=True)).values('c')
+
+        # Правила совпадают с UserAnswer.get_user_points() == UserAnswer.max_points
+        correct_answers = UserAnswer.objects.filter(
+            passing=OuterRef('pk'),
+        ).annotate(
+            has_wrong=Exists(wrong_chosen),
+            true_total=Coalesce(Subquery(true_total, output_field=IntegerField()), 0),
+            true_chosen=Coalesce(Subquery(true_chosen, output_field=IntegerField()), 0),
+        ).filter(
+            Q(question__score=0)
+            | Q(question__is_free_answer=True, user_points=F('question__score'))
+            | Q(
+                Q(answer__isnull=True) | Q(answer__is_true=True, answer__question=F('question')),
+                question__is_free_answer=False,
+                has_wrong=False,
+                true_chosen=F('true_total'),
+            )
+        ).order_by().values('passing').annotate(c=Count('pk')).values('c')
+        all_answers = UserAnswer.objects.filter(
+            passing=OuterRef('pk'),
+        ).order_by().values('passing').annotate(c=Count('pk')).values('c')
+
+        return self.annotate(
+            attempts_count=Subquery(attempts, output_field=IntegerField()),
+            last_finish_time=Subquery(latest.values('finish_time')[:1]),
+            last_out_of_time=Subquery(latest.values('out_of_time')[:1]),
+            trial_correct=Case(
+                When(is_trial=True, then=Coalesce(Subquery(correct_answers, output_field=IntegerField()), 0)),
+                output_field=IntegerField(),
+            ),
+            trial_total=Case(
+                When(is_trial=True, then=Coalesce(Subquery(all_answers, output_field=IntegerField()), 0)),
+                output_field=IntegerField(),
+            ),
+        )
+
 
 class Passing(BaseModel):
     """
@@ -576,6 +785,18 @@ class Passing(BaseModel):
         verbose_name = 'Прохождение теста'
         verbose_name_plural = 'Прохождения тестов'
         ordering = ['-created']
+        indexes = [
+            # Незакрытые прохождения, для пакетного автозакрытия по времени
+            models.Index(
+                fields=['start_time'],
+                name='passing_open_start_idx',
+                condition=Q(finish_time__isnull=True),
+            ),
+            # Постраничная выдача по курсору (created, id) - TestPassingViewSet
+            models.Index(fields=['-created', '-id'], name='passing_created_id_idx'),
+            models.Index(fields=['task', '-created', '-id'], name='passing_task_created_idx'),
+            models.Index(fields=['user', '-created', '-id'], name='passing_user_created_idx'),
+        ]
 
     def __str__(self):
         return f'Прохождение теста id_{self.task.pk} пользователем {self.user.username}'
@@ -588,23 +809,29 @@ class Passing(BaseModel):
 
     @property
     def retake_seconds(self):
-        previous_passing = Passing.objects.with_select_related().filter(
-            task=self.task,
-            user=self.user,
-        ).order_by('-created').first()
-
-        if previous_passing:
-            if not previous_passing.finish_time:
+        if hasattr(self, 'last_finish_time'):
+            # Аннотировано в PassingQuerySet.with_computed_fields()
+            finish_time, out_of_time = self.last_finish_time, self.last_out_of_time
+        else:
+            previous_passing = Passing.objects.filter(
+                task=self.task_id,
+                user=self.user_id,
+            ).order_by('-created').first()
+            if not previous_passing:
                 return None
+            finish_time, out_of_time = previous_passing.finish_time, previous_passing.out_of_time
 
-            past_time = now() - previous_passing.finish_time
-            retake_seconds = previous_passing.task.retake_seconds
-            retake_timedelta = datetime.timedelta(seconds=retake_seconds)
+        if not finish_time:
+            return None
 
-            if not previous_passing.out_of_time:
-                if past_time < retake_timedelta:
-                    tt = retake_timedelta - past_time
-                    return tt.total_seconds()
+        past_time = now() - finish_time
+        retake_seconds = self.task.retake_seconds
+        retake_timedelta = datetime.timedelta(seconds=retake_seconds)
+
+        if not out_of_time:
+            if past_time < retake_timedelta:
+                tt = retake_timedelta - past_time
+                return tt.total_seconds()
 
         return None
 
@@ -614,6 +841,8 @@ class Passing(BaseModel):
 
     @property
     def task_attempts(self):
+        if hasattr(self, 'attempts_count'):
+            return self.attempts_count
         return Passing.objects.filter(task=self.task, user=self.user).count()
 
     @property
@@ -622,14 +851,17 @@ class Passing(BaseModel):
         Процент правильных ответов
         """
 
+        if self.is_trial and getattr(self, 'trial_total', None) is not None:
+            return f'{self.trial_correct}:{self.trial_total}'
+
         if self.is_trial:
             count = 0
-            user_answers = self.user_answers.all().distinct()
+            user_answers = list(self.user_answers.with_scoring().distinct())
             for answer in user_answers:
                 if answer.get_user_points() == answer.max_points:
                     count += 1
 
-            answers_count = user_answers.count()
+            answers_count = len(user_answers)
             return f'{count}:{answers_count}'
 
         try:
@@ -667,13 +899,9 @@ class Passing(BaseModel):
         Получение баллов за прохождение тестирования
         :return: int, сумма баллов за ответы
         """
-        user_points = 0
-        user_answers = self.user_answers.all().distinct()
+        from backend.testing.grading import grade_passings
 
-        for item in user_answers:
-            user_points += item.get_user_points()
-
-        return user_points
+        return grade_passings([self.pk])[self.pk]
 
     def check_free_answer(self):
         user_answer = self.user_answers.filter(
@@ -684,65 +912,292 @@ class Passing(BaseModel):
         if user_answer:
             return True
 
-    def check_passing(self, finish=True):
+    def apply_grading(self, graded_answers, attempts=None):
         """
-        Рсчитать прохождение теста
+        Рассчитать статус и баллы прохождения по уже загруженным ответам, без записи в базу
+        :param graded_answers: list, GradedAnswer этого прохождения
+        :param attempts: int, кол-во прохождений задания пользователем (если не передано - считается запросом)
+        :return: bool, пройден ли тест
         """
-        if finish:
-            # Устанавливаем время окончания тестирования
-            self.finish_time = now()
-            self.save(update_fields=['finish_time'])
 
         # Уложились ли в отведенное время тестирования
         limit = self.task.travel_time.second + self.task.travel_time.minute * \
                 60 + self.task.travel_time.hour * 60 * 60
         if self.travel_time and (limit - self.travel_time) < 0:
             self.success_passed = self.LIMIT
-            self.save(update_fields=['success_passed'])
             return False
 
+        user_points = sum(answer.points for answer in graded_answers)
+
         if self.is_trial:
-            self.user_points = self._get_user_points()
-            self.save(update_fields=['user_points'])
+            self.user_points = user_points
             return False
 
         # Кол-во попыток
-        current_test_passings = Passing.objects.filter(
-            task=self.task,
-            user=self.user,
-        )
-        if current_test_passings.count() > self.task.attempts:
+        if attempts is None:
+            attempts = Passing.objects.filter(task=self.task_id, user=self.user_id).count()
+        if attempts > self.task.attempts:
             self.success_passed = self.ATTEMPTS
-            self.save(update_fields=['success_passed'])
             return False
 
         # На проверке у модератора
-        on_check = self.check_free_answer()
-        if on_check:
+        if any(answer.is_pending for answer in graded_answers):
             self.success_passed = self.ON_CHECK
-            self.save(update_fields=['success_passed'])
             return False
 
         # Проверка по проценту баллов
-        self.user_points = self._get_user_points()
-        self.save(update_fields=['user_points'])
-
+        self.user_points = user_points
         response_rate = self.int_response_rate
 
         if response_rate and response_rate < self.task.passing:
             self.success_passed = self.SCORE
-            self.save(update_fields=['success_passed'])
             return False
         elif response_rate and response_rate >= (self.task.passing - 0.1):
             self.success_passed = self.PASSED
-            self.save(update_fields=['success_passed'])
             return True
         else:
             if response_rate == 0:
                 self.success_passed = self.SCORE
-                self.save(update_fields=['success_passed'])
             return False
 
+    def check_passing(self, finish=True):
+        """
+        Рсчитать прохождение теста
+        Все ответы проверяются пакетно, результат сохраняется одним UPDATE
+        """
+        from backend.testing.grading import load_graded_answers
+
+        update_fields = ['success_passed', 'user_points']
+        if finish:
+            # Устанавливаем время окончания тестирования
+            self.finish_time = now()
+            update_fields.append('finish_time')
+
+        graded_answers = load_graded_answers([self.pk]).get(self.pk, [])
+        is_passed = self.apply_grading(graded_answers)
+        self.save(update_fields=update_fields)
+        TaskVariantAssignment.refresh_for_passings([self])
+        return is_passed
+
+
+class TaskVariantAssignment(BaseModel):
+    """
+    Текущий вариант задания материала для пользователя
+    Пересчитывается при неуспешном завершении прохождения (статусы 2, 3, 4),
+    сбрасывается при изменении заданий материала и при изменении или удалении прохождения
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='task_variants',
+        on_delete=models.CASCADE,
+    )
+    material = models.ForeignKey(
+        Material,
+        verbose_name='Материал',
+        related_name='task_variants',
+        on_delete=models.CASCADE,
+    )
+    task = models.ForeignKey(
+        Task,
+        verbose_name='Задание',
+        related_name='variant_assignments',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = 'Вариант задания пользователя'
+        verbose_name_plural = 'Варианты заданий пользователей'
+        unique_together = ['user', 'material']
+
+    def __str__(self):
+        return f'Вариант задания id_{self.task_id} материала id_{self.material_id} пользователя id_{self.user_id}'
+
+    @classmethod
+    def assign(cls, user_id, variants):
+        """
+        Сохранение вариантов заданий пользователя
+        :param variants: dict, {material_id: task_id}
+        """
+        if not variants:
+            return
+        with transaction.atomic():
+            cls.objects.filter(user_id=user_id, material_id__in=variants.keys()).delete()
+            cls.objects.bulk_create([
+                cls(user_id=user_id, material_id=material_id, task_id=task_id)
+                for material_id, task_id in variants.items()
+            ], ignore_conflicts=True)
+
+    @classmethod
+    def refresh_for_passings(cls, passings):
+        """
+        Пересчет вариантов по завершенным прохождениям с неуспешным статусом
+        :param passings: list, прохождения с подгруженным task
+        """
+        from backend.courses.variants import FAILED_STATUSES, get_user_variants
+
+        user_materials = defaultdict(set)
+        for passing in passings:
+            if passing.finish_time and passing.success_passed in FAILED_STATUSES:
+                user_materials[passing.user_id].add(passing.task.material_id)
+
+        for user_id, material_ids in user_materials.items():
+            variants = get_user_variants(user_id, list(material_ids))
+            # Материалы, для которых вариант не выбран - выбор заново при чтении
+            cls.objects.filter(
+                user_id=user_id,
+                material_id__in=material_ids - variants.keys(),
+            ).delete()
+            cls.assign(user_id, variants)
+
+
+class UserCourseProgress(BaseModel):
+    """
+    Прогресс пользователя по курсу для отчетов куратора
+    Строка материала (task пустой) - статус прохождения материала (последний MaterialPassing),
+    строка задания - последнее прохождение задания без пробных.
+    Обновляется при записи Passing и MaterialPassing (backend.courses.signals, finish_passings)
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='course_progress',
+        on_delete=models.CASCADE,
+    )
+    course = models.ForeignKey(
+        Course,
+        verbose_name='Курс',
+        related_name='user_progress',
+        on_delete=models.CASCADE,
+    )
+    material = models.ForeignKey(
+        Material,
+        verbose_name='Материал',
+        related_name='user_progress',
+        on_delete=models.CASCADE,
+    )
+    task = models.ForeignKey(
+        Task,
+        verbose_name='Задание',
+        related_name='user_progress',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+    )
+    material_status = models.SmallIntegerField(
+        'Статус прохождения материала',
+        choices=MaterialPassing.STATUS_CHOICES,
+        blank=True,
+        null=True,
+    )
+    passing = models.ForeignKey(
+        Passing,
+        verbose_name='Последнее прохождение',
+        related_name='+',
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+    )
+    passing_status = models.SmallIntegerField(
+        'Статус прохождения',
+        choices=Passing.PASSED_CHOICES,
+        blank=True,
+        null=True,
+    )
+    start_time = models.DateTimeField('Время начала прохождения', blank=True, null=True)
+    finish_time = models.DateTimeField('Время окончания прохождения', blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Прогресс пользователя по курсу'
+        verbose_name_plural = 'Прогресс пользователей по курсам'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'material'],
+                condition=Q(task__isnull=True),
+                name='progress_user_material_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'task'],
+                condition=Q(task__isnull=False),
+                name='progress_user_task_uniq',
+            ),
+        ]
+        indexes = [
+            # Отчет куратора: весь прогресс страницы пользователей одним проходом по индексу
+            models.Index(fields=['user', 'course'], name='progress_user_course_idx'),
+        ]
+
+    def __str__(self):
+        return f'Прогресс пользователя id_{self.user_id} по курсу id_{self.course_id}'
+
+    @classmethod
+    def refresh_tasks(cls, user_id, task_ids):
+        """
+        Пересчет строк заданий пользователя по последним прохождениям (без пробных)
+        """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return
+        passings = Passing.objects.filter(
+            user_id=user_id,
+            task_id__in=task_ids,
+            is_trial=False,
+        ).select_related('task__material').order_by('task_id', '-created', '-id').distinct('task_id')
+
+        with transaction.atomic():
+            cls.objects.filter(user_id=user_id, task_id__in=task_ids).delete()
+            cls.objects.bulk_create([
+                cls(
+                    user_id=user_id,
+                    course_id=passing.task.material.course_id,
+                    material_id=passing.task.material_id,
+                    task_id=passing.task_id,
+                    passing=passing,
+                    passing_status=passing.success_passed,
+                    start_time=passing.start_time,
+                    finish_time=passing.finish_time,
+                )
+                for passing in passings
+            ])
+
+    @classmethod
+    def refresh_materials(cls, user_id, material_ids):
+        """
+        Пересчет строк материалов пользователя по последним прохождениям материалов
+        """
+        material_ids = list(material_ids)
+        if not material_ids:
+            return
+        material_passings = MaterialPassing.objects.filter(
+            user_id=user_id,
+            material_id__in=material_ids,
+        ).select_related('material').order_by('material_id', '-created', '-id').distinct('material_id')
+
+        with transaction.atomic():
+            cls.objects.filter(user_id=user_id, material_id__in=material_ids, task__isnull=True).delete()
+            cls.objects.bulk_create([
+                cls(
+                    user_id=user_id,
+                    course_id=material_passing.material.course_id,
+                    material_id=material_passing.material_id,
+                    material_status=material_passing.status,
+                )
+                for material_passing in material_passings
+            ])
+
+    @classmethod
+    def refresh_for_passings(cls, passings):
+        """
+        Пересчет строк заданий по прохождениям, записанным в обход save (bulk_update)
+        """
+        user_tasks = defaultdict(set)
+        for passing in passings:
+            user_tasks[passing.user_id].add(passing.task_id)
+        for user_id, task_ids in user_tasks.items():
+            cls.refresh_tasks(user_id, task_ids)
+
 
 class Bookmark(BaseModel):
     """
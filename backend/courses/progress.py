@@ -0,0 +1,240 @@
+from collections import defaultdict
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.fields import DateTimeField
+
+from backend.courses.models import Course, Material, MaterialPassing, Passing, Task, UserCourseProgress
+from backend.users.models import User
+
+_datetime = DateTimeField()
+
+
+class CourseProgressReport:
+    """
+    Прогресс пользователей по их курсам для отчетов куратора (из UserCourseProgress)
+    Активные материалы и задания курсов и прогресс загружаются на всех пользователей сразу,
+    кол-во запросов не зависит от кол-ва пользователей.
+
+    :param users: list, пользователи с подгруженными courses
+    """
+
+    def __init__(self, users):
+        users = list(users)
+        course_ids = {course.pk for user in users for course in user.courses.all()}
+
+        # {course_id: [материал, ...]} в порядке показа
+        self.materials = defaultdict(list)
+        for material in Material.objects.filter(
+            course_id__in=course_ids,
+            is_active=True,
+        ).order_by('rank', 'id').values('id', 'title', 'course_id'):
+            self.materials[material['course_id']].append(material)
+
+        # {material_id: [задание, ...]}
+        self.tasks = defaultdict(list)
+        for task in Task.objects.filter(
+            material__course_id__in=course_ids,
+            is_active=True,
+        ).values('id', 'title', 'is_final', 'material_id'):
+            self.tasks[task['material_id']].append(task)
+
+        # {(user_id, material_id): статус}, {(user_id, task_id): строка прогресса}
+        self.material_status = {}
+        self.task_progress = {}
+        for row in UserCourseProgress.objects.filter(
+            user_id__in=[user.pk for user in users],
+            course_id__in=course_ids,
+        ).values('user_id', 'material_id', 'task_id', 'material_status', 'passing_status', 'start_time', 'finish_time'):
+            if row['task_id'] is None:
+                self.material_status[row['user_id'], row['material_id']] = row['material_status']
+            else:
+                self.task_progress[row['user_id'], row['task_id']] = row
+
+    def get_materials(self, user_id, course_id):
+        """
+        Активные материалы курса со статусом прохождения и последними прохождениями заданий пользователя
+        (материал без прохождения - STATUS_NOT_STARTED)
+        """
+        materials = []
+        for material in self.materials[course_id]:
+            tasks = []
+            for task in self.tasks[material['id']]:
+                task = {
+                    'id': task['id'],
+                    'title': task['title'],
+                    'is_final': task['is_final'],
+                }
+                progress = self.task_progress.get((user_id, task['id']))
+                if progress:
+                    task.update({
+                        'start_time': progress['start_time'] and _datetime.to_representation(progress['start_time']),
+                        'finish_time': progress['finish_time'] and _datetime.to_representation(progress['finish_time']),
+                        'passing_status': progress['passing_status'],
+                    })
+                tasks.append(task)
+
+            materials.append({
+                'id': material['id'],
+                'title': material['title'],
+                'material_passing_status': self.material_status.get(
+                    (user_id, material['id']),
+                    MaterialPassing.STATUS_NOT_STARTED,
+                ),
+                'tasks': tasks,
+            })
+        return materials
+
+
+class CuratorPassingsReport:
+    """
+    Прохождения пользователей по их курсам для списка пользователей куратора (CuratorUsersListView)
+    Задания курсов и прохождения пользователей загружаются двумя запросами на всю страницу
+    и группируются в памяти по (пользователь, курс).
+
+    :param users: list, пользователи с подгруженными courses_with_num_intermediate_tests
+    """
+
+    def __init__(self, users):
+        users = list(users)
+        course_ids = {course.pk for user in users for course in user.courses_with_num_intermediate_tests}
+
+        tasks = {
+            task.pk: task
+            for task in Task.objects.filter(material__course_id__in=course_ids).select_related('material__course')
+        }
+
+        # {(user_id, course_id): [прохождение, ...]} от последнего к первому
+        self.final = defaultdict(list)
+        self.intermediate = defaultdict(list)
+        for passing in Passing.objects.filter(
+            user_id__in=[user.pk for user in users],
+            task_id__in=tasks.keys(),
+        ).with_computed_fields().order_by('-created'):
+            passing.task = task = tasks[passing.task_id]
+            key = (passing.user_id, task.material.course_id)
+            if task.is_final:
+                self.final[key].append(passing)
+            elif task.is_active and not passing.is_trial:
+                self.intermediate[key].append(passing)
+
+    def get_final_passings(self, user_id, course_id):
+        return self.final[user_id, course_id]
+
+    def get_intermediate_passings(self, user_id, course_id):
+        return self.intermediate[user_id, course_id]
+
+
+def progress_percent(passed_tasks, passed_materials, tasks_total, materials_total):
+    """
+    Прогресс по курсу: пройденные задания и материалы от всех активных заданий и материалов курса, %
+    """
+    try:
+        return ceil((passed_tasks + passed_materials) / (tasks_total + materials_total) * 100)
+    except ZeroDivisionError:
+        return 0
+
+
+def company_progress(company_ids=None, course_id=None, user_id=None):
+    """
+    Прогресс пользователей по их курсам одним сгруппированным запросом
+    Задание пройдено, если у пользователя есть хоть одно успешное прохождение (как Course.get_success_tasks_for_user),
+    материал - по статусу в UserCourseProgress; учитываются только активные задания и материалы
+    :param company_ids: list, только активные пользователи этих компаний (None - без ограничения)
+
+    :return: list, [{'user_id', 'company_id', 'course_id', 'progress', 'passed_tasks', 'tasks_total',
+                     'passed_materials', 'materials_total', 'average_score', 'on_check'}, ...]
+    """
+    where = []
+    if company_ids is not None:
+        company_ids = list(company_ids)
+        if not company_ids:
+            return []
+        where += ['u.is_active', 'u.company_id = ANY(%(company_ids)s)']
+    if course_id:
+        where.append('cu.course_id = %(course_id)s')
+    if user_id:
+        where.append('cu.user_id = %(user_id)s')
+
+    course_users = Course.users.through._meta.db_table
+    users = User._meta.db_table
+    progress = UserCourseProgress._meta.db_table
+    passings = Passing._meta.db_table
+    materials = Material._meta.db_table
+    tasks = Task._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT cu.user_id, u.company_id, cu.course_id, '
+            f'(SELECT COUNT(DISTINCT s.task_id) FROM {passings} s '
+            f'JOIN {tasks} t ON t.id = s.task_id JOIN {materials} m ON m.id = t.material_id '
+            f'WHERE s.user_id = cu.user_id AND s.success_passed = %(passed)s '
+            f'AND m.course_id = cu.course_id AND m.is_active AND t.is_active), '
+            f'(SELECT COUNT(*) FROM {tasks} t JOIN {materials} m ON m.id = t.material_id '
+            f'WHERE m.course_id = cu.course_id AND m.is_active AND t.is_active), '
+            f'COUNT(p.id) FILTER (WHERE p.task_id IS NULL AND p.material_status = %(material_passed)s AND pm.is_active), '
+            f'(SELECT COUNT(*) FROM {materials} m WHERE m.course_id = cu.course_id AND m.is_active), '
+            f'AVG(ps.user_points * 100.0 / NULLIF(ps.max_points, 0)) '
+            f'FILTER (WHERE ps.finish_time IS NOT NULL AND ps.success_passed <> %(on_check)s), '
+            f'COUNT(p.id) FILTER (WHERE p.passing_status = %(on_check)s) '
+            f'FROM {course_users} cu '
+            f'JOIN {users} u ON u.id = cu.user_id '
+            f'LEFT JOIN {progress} p ON p.user_id = cu.user_id AND p.course_id = cu.course_id '
+            f'LEFT JOIN {materials} pm ON pm.id = p.material_id '
+            f'LEFT JOIN {passings} ps ON ps.id = p.passing_id '
+            f'WHERE {" AND ".join(where) or "TRUE"} '
+            f'GROUP BY cu.user_id, u.company_id, cu.course_id '
+            f'ORDER BY cu.user_id, cu.course_id',
+            {
+                'company_ids': company_ids,
+                'course_id': course_id,
+                'user_id': user_id,
+                'passed': Passing.PASSED,
+                'on_check': Passing.ON_CHECK,
+                'material_passed': MaterialPassing.STATUS_PASSED,
+            },
+        )
+        rows = cursor.fetchall()
+
+    result = []
+    for (row_user_id, company_id, row_course_id, passed_tasks, tasks_total,
+         passed_materials, materials_total, average_score, on_check) in rows:
+        result.append({
+            'user_id': row_user_id,
+            'company_id': company_id,
+            'course_id': row_course_id,
+            'progress': progress_percent(passed_tasks, passed_materials, tasks_total, materials_total),
+            'passed_tasks': passed_tasks,
+            'tasks_total': tasks_total,
+            'passed_materials': passed_materials,
+            'materials_total': materials_total,
+            'average_score': average_score and round(float(average_score), 1),
+            'on_check': on_check,
+        })
+    return result
+
+
+def company_rollup(company_id):
+    """
+    Сводка прогресса компании для обзора куратора, кэшируется на settings.COMPANY_PROGRESS_CACHE_TIMEOUT секунд
+    :return: dict, {'company_id', 'users', 'completed', 'progress', 'average_score', 'on_check'}
+    """
+    key = f'company_progress:{company_id}'
+    rollup = cache.get(key)
+    if rollup is not None:
+        return rollup
+
+    rows = company_progress([company_id])
+    scores = [row['average_score'] for row in rows if row['average_score'] is not None]
+    rollup = {
+        'company_id': company_id,
+        'users': len({row['user_id'] for row in rows}),
+        'completed': sum(1 for row in rows if row['progress'] >= 100),
+        'progress': round(sum(row['progress'] for row in rows) / len(rows), 1) if rows else 0,
+        'average_score': round(sum(scores) / len(scores), 1) if scores else None,
+        'on_check': sum(row['on_check'] for row in rows),
+    }
+    cache.set(key, rollup, settings.COMPANY_PROGRESS_CACHE_TIMEOUT)
+    return rollup
@@ -11,7 +11,10 @@ class MaterialClientSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Material
-        fields = '__all__'
+        # search_vector - служебное поле поиска (TrigramSearchFilter)
+        exclude = (
+            'search_vector',
+        )
 
 
 class MaterialSerializer(serializers.ModelSerializer):
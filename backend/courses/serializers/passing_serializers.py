@@ -1,13 +1,19 @@
 from rest_framework import serializers
 
 from backend.courses.models import Passing
+from backend.helpers import DynamicFieldsMixin
 
 
-class TestPassingSerializer(serializers.ModelSerializer):
+class TestPassingSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор прохождения тестов для модератора и выше (только для get)
+    response_rate и retake_seconds берутся из PassingQuerySet.with_computed_fields()
+    Поддерживает выборочные поля: ?fields=id,task,user
     """
 
+    # Поля, для которых нужны аннотации PassingQuerySet.with_computed_fields()
+    COMPUTED_FIELDS = {'response_rate', 'retake_seconds'}
+
     is_final_task = serializers.ReadOnlyField()
 
     class Meta:
@@ -18,12 +24,12 @@ class TestPassingSerializer(serializers.ModelSerializer):
             'is_final_task',
             'user',
             'success_passed',
-            'response_rate',  # !!! ~4000 запросов - убрать из запроса is_trial
+            'response_rate',
             'start_time',
             'out_of_time',
             'finish_time',
             'travel_time',
-            'retake_seconds',  # !!! ~1000 запросов - для админа убрать из запроса
+            'retake_seconds',
             'is_trial',
         ]
         read_only_fields = [
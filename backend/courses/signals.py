@@ -1,8 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
 
-from backend.courses.models import Passing
-from backend.courses.models import Task
+from backend.courses.models import MaterialPassing, Passing, UserCourseProgress
+from backend.courses.models import Task, TaskScoring, TaskVariantAssignment, Question, Answer
 from backend.courses.tasks import close_attempt
 from django.conf import settings
 
@@ -20,11 +20,105 @@ def fill_max_points(sender, instance, created, **kwargs):
 def auto_close_attempt(sender, instance, created, **kwargs):
     """
     создание задачи для автоматического закрытия попытки, если время истекло
+    при settings.PASSING_SWEEPER попытки закрываются периодической задачей close_expired_attempts
     """
-    if created:
+    if created and not settings.PASSING_SWEEPER:
         task = Task.objects.get(id=instance.task.pk)
         timeout = task.travel_time.second + task.travel_time.minute * \
                 60 + task.travel_time.hour * 60 * 60
 
         if not settings.DJANGO_DEVELOPMENT:
             close_attempt.apply_async((instance.pk,), countdown=timeout)
+
+
+@receiver(post_save, sender=Question)
+def refresh_question_scoring(sender, instance, **kwargs):
+    """
+    Пересчет снимков баллов заданий при изменении вопроса (баллы, тип ответа)
+    """
+    TaskScoring.refresh_for_tasks(instance.tasks.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Question)
+def remember_question_tasks(sender, instance, **kwargs):
+    """
+    После удаления вопроса его задания уже не получить - запоминаем их заранее
+    """
+    instance.scoring_task_ids = list(instance.tasks.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Question)
+def refresh_deleted_question_scoring(sender, instance, **kwargs):
+    TaskScoring.refresh_for_tasks(getattr(instance, 'scoring_task_ids', []))
+
+
+@receiver(m2m_changed, sender=Question.tasks.through)
+def refresh_question_tasks_scoring(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Пересчет снимков баллов при добавлении/удалении вопросов задания
+    """
+    if action == 'pre_clear' and not reverse:
+        instance.scoring_task_ids = list(instance.tasks.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        task_ids = [instance.pk]
+    elif action == 'post_clear':
+        task_ids = getattr(instance, 'scoring_task_ids', [])
+    else:
+        task_ids = pk_set
+    TaskScoring.refresh_for_tasks(task_ids)
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def refresh_answer_scoring(sender, instance, **kwargs):
+    """
+    Пересчет правильных ответов в снимках баллов заданий
+    """
+    TaskScoring.refresh_for_tasks(
+        Task.objects.filter(questions=instance.question_id).values_list('id', flat=True)
+    )
+
+
+@receiver([post_save, post_delete], sender=Task)
+def reset_task_variants(sender, instance, **kwargs):
+    """
+    Сброс сохраненных вариантов заданий материала - набор вариантов изменился,
+    варианты выбираются заново при следующем запросе
+    """
+    TaskVariantAssignment.objects.filter(material=instance.material_id).delete()
+
+
+@receiver([post_save, post_delete], sender=Passing)
+def refresh_task_progress(sender, instance, update_fields=None, **kwargs):
+    """
+    Обновление прогресса пользователя по заданию (UserCourseProgress)
+    """
+    if instance.is_trial or update_fields == frozenset(['max_points']):
+        return
+    UserCourseProgress.refresh_tasks(instance.user_id, [instance.task_id])
+
+
+@receiver([post_save, post_delete], sender=Passing)
+def reset_passing_variant(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Сброс сохраненного варианта задания материала пользователя при изменении или удалении прохождения
+    (модератор меняет статус) - вариант выбирается заново при следующем запросе
+    Новое прохождение еще не завершено и на выбор варианта не влияет
+    """
+    if created or update_fields == frozenset(['max_points']):
+        return
+    TaskVariantAssignment.objects.filter(
+        user=instance.user_id,
+        material__tasks=instance.task_id,
+    ).delete()
+
+
+@receiver([post_save, post_delete], sender=MaterialPassing)
+def refresh_material_progress(sender, instance, **kwargs):
+    """
+    Обновление статуса материала в прогрессе пользователя (UserCourseProgress)
+    """
+    UserCourseProgress.refresh_materials(instance.user_id, [instance.material_id])
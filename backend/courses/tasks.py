@@ -1,6 +1,10 @@
 from celery import shared_task
 from celery.utils.log import get_task_logger
+from django.db import transaction
+from django.utils.timezone import now
+
 from backend.courses.models import Passing
+from backend.testing.grading import finish_passings
 
 logger = get_task_logger(__name__)
 
@@ -17,3 +21,46 @@ def close_attempt(pk):
     if not passing.finish_time:
         logger.info(f"Автоматическое закрытие попытки {pk} по истечении времени")
         passing.check_passing()
+
+
+@shared_task
+def close_expired_attempts(batch_size=500):
+    """
+    Пакетное закрытие попыток, время прохождения которых истекло (settings.PASSING_SWEEPER)
+    Попытка закрывается моментом окончания отведенного времени (start_time + travel_time),
+    поэтому задержка обхода не влияет на результат тестирования.
+    """
+    moment = now()
+    delays = []
+
+    while True:
+        with transaction.atomic():
+            passings = list(
+                Passing.objects.expired(moment).select_related('task').select_for_update(
+                    skip_locked=True,
+                    of=('self',),
+                ).order_by('deadline')[:batch_size]
+            )
+            for passing in passings:
+                passing.finish_time = passing.deadline
+            finish_passings(passings)
+
+        for passing in passings:
+            delay = (moment - passing.deadline).total_seconds()
+            delays.append(delay)
+            logger.info(f'Автоматическое закрытие попытки {passing.pk}, опоздание {delay:.1f} сек.')
+
+        if len(passings) < batch_size:
+            break
+
+    result = {
+        'closed': len(delays),
+        'max_delay': max(delays, default=0),
+        'avg_delay': sum(delays) / len(delays) if delays else 0,
+    }
+    if delays:
+        logger.info(
+            f"Закрыто попыток: {result['closed']}, "
+            f"опоздание: среднее {result['avg_delay']:.1f} сек., максимальное {result['max_delay']:.1f} сек."
+        )
+    return result
@@ -0,0 +1,429 @@
+import datetime
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.utils.timezone import now
+from openpyxl import Workbook
+from rest_framework.test import APITestCase
+
+from backend.courses.models import (
+    Answer, Course, Material, MaterialPassing, Passing, Question, Task, TaskScoring, TaskVariantAssignment,
+)
+from backend.courses.progress import company_progress, progress_percent
+from backend.courses.variants import get_assigned_variants
+from backend.testing.models import UserAnswer
+from backend.users.models import Company, User
+
+
+def create_moderator(username='moderator'):
+    return User.objects.create(username=username, user_status=User.STATUS_MODERATOR)
+
+
+def create_task(title='Тест', **kwargs):
+    course = Course.objects.create(title=f'Курс {title}')
+    material = Material.objects.create(course=course, title=f'Материал {title}')
+    return Task.objects.create(
+        material=material,
+        title=title,
+        travel_time=datetime.time(hour=1),
+        **kwargs,
+    )
+
+
+def create_question(task, correct=1, wrong=1, **kwargs):
+    """
+    :return: (Question, list правильных Answer, list неправильных Answer)
+    """
+    question = Question.objects.create(text='Вопрос', **kwargs)
+    question.tasks.add(task)
+    true = [Answer.objects.create(question=question, is_true=True, text='Да') for _ in range(correct)]
+    false = [Answer.objects.create(question=question, is_true=False, text='Нет') for _ in range(wrong)]
+    return question, true, false
+
+
+def create_xlsx(rows, name='questions.xlsx'):
+    """
+    Файл '.xlsx' с заголовком и строками rows (колонки A-E как в backend.courses.importers)
+    """
+    wb = Workbook()
+    wb.active.append(['№', 'Баллы', 'Вопрос', 'Ответ', 'Правильный'])
+    for row in rows:
+        wb.active.append(row)
+    content = io.BytesIO()
+    wb.save(content)
+    return SimpleUploadedFile(name, content.getvalue())
+
+
+def create_user_answer(passing, question, answer=None, answers=(), **kwargs):
+    user_answer = UserAnswer.objects.create(passing=passing, question=question, answer=answer, **kwargs)
+    user_answer.answers.set(answers)
+    return user_answer
+
+
+class PassingComputedFieldsTest(TestCase):
+    """
+    PassingQuerySet.with_computed_fields: подсчет в SQL совпадает с UserAnswer.get_user_points()
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='client')
+        self.task = create_task()
+        self.passing = Passing.objects.create(task=self.task, user=self.user, is_trial=True)
+
+    def add_answer(self, correct=1, wrong=1, chosen=(), answer=None, **kwargs):
+        question, true, false = create_question(self.task, correct, wrong, **kwargs)
+        variants = {'true': true, 'false': false}
+        answers = [variants[kind][index] for kind, index in chosen]
+        if answer is not None:
+            answer = variants[answer[0]][answer[1]]
+        return create_user_answer(self.passing, question, answer=answer, answers=answers)
+
+    def test_trial_counts_match_user_points(self):
+        # Верные: все правильные варианты, одиночный answer, оба поля, оцененный свободный ответ, вопрос без баллов
+        self.add_answer(correct=2, chosen=[('true', 0), ('true', 1)])
+        self.add_answer(answer=('true', 0))
+        self.add_answer(answer=('true', 0), chosen=[('true', 0)])
+        free = self.add_answer(correct=0, wrong=0, is_free_answer=True, score=2)
+        free.user_points = 2
+        free.save()
+        self.add_answer(score=0)
+        # Неверные: пропущен правильный вариант, лишний неверный, неверный answer, свободный ответ не оценен
+        self.add_answer(correct=2, chosen=[('true', 0)])
+        self.add_answer(correct=2, chosen=[('true', 0), ('true', 1), ('false', 0)])
+        self.add_answer(answer=('false', 0))
+        self.add_answer(answer=('true', 0), chosen=[('false', 0)])
+        self.add_answer(correct=0, wrong=0, is_free_answer=True, score=2)
+
+        passing = Passing.objects.with_computed_fields().get(pk=self.passing.pk)
+        self.assertEqual((passing.trial_correct, passing.trial_total), (5, 10))
+
+        user_answers = list(self.passing.user_answers.with_scoring())
+        expected = sum(answer.get_user_points() == answer.max_points for answer in user_answers)
+        self.assertEqual(expected, 5)
+        self.assertEqual(passing.response_rate, Passing.objects.get(pk=self.passing.pk).response_rate)
+
+    def test_computed_fields(self):
+        finish_time = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        Passing.objects.create(task=self.task, user=self.user, finish_time=finish_time)
+        self.add_answer(answer=('true', 0))
+
+        passings = {passing.pk: passing for passing in Passing.objects.with_computed_fields()}
+        self.assertEqual(len(passings), 2)
+        for passing in passings.values():
+            self.assertEqual(passing.attempts_count, 2)
+            self.assertIsNotNone(passing.last_finish_time)
+        self.assertEqual(passings[self.passing.pk].response_rate, '1:1')
+
+
+class TestPassingViewSetTest(APITestCase):
+    """
+    Список прохождений модератора: курсор, ?fields= и аннотации with_computed_fields
+    """
+    url = '/api/v1/courses/test_passing/'
+
+    def setUp(self):
+        self.client.force_authenticate(create_moderator())
+        user = User.objects.create(username='client')
+        task = create_task()
+        question, true, false = create_question(task)
+        self.passings = []
+        for is_trial in (False, True, False, True, False):
+            passing = Passing.objects.create(task=task, user=user, is_trial=is_trial)
+            create_user_answer(passing, question, answer=true[0])
+            self.passings.append(passing)
+
+    def test_default_page(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([row['id'] for row in results], [passing.pk for passing in reversed(self.passings)])
+        rates = {row['id']: row['response_rate'] for row in results}
+        self.assertEqual(rates[self.passings[1].pk], '1:1')
+        self.assertIn('retake_seconds', results[0])
+
+    def test_fields_projection(self):
+        response = self.client.get(self.url, {'fields': 'id,task,user'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'task', 'user'})
+
+        response = self.client.get(self.url, {'fields': 'id,response_rate'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'response_rate'})
+
+    def test_cursor_next(self):
+        ids = []
+        response = self.client.get(self.url, {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(ids, [passing.pk for passing in reversed(self.passings)])
+
+
+class TaskVariantAssignmentTest(TestCase):
+    """
+    Сохраненный вариант задания сбрасывается, когда модератор меняет или удаляет прохождение
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='client')
+        course = Course.objects.create(title='Курс', is_active=True)
+        course.users.add(self.user)
+        self.material = Material.objects.create(course=course, title='Материал')
+        self.first, self.second = [
+            Task.objects.create(material=self.material, title=title, travel_time=datetime.time(hour=1))
+            for title in ('Вариант 1', 'Вариант 2')
+        ]
+        self.passings = [Passing.objects.create(task=self.first, user=self.user) for _ in range(3)]
+        Passing.objects.filter(user=self.user).update(success_passed=Passing.SCORE, finish_time=now())
+
+    def assert_variant(self, task):
+        self.assertEqual(get_assigned_variants(self.user), {self.material.pk: task.pk})
+        self.assertEqual(
+            list(TaskVariantAssignment.objects.filter(user=self.user).values_list('task', flat=True)),
+            [task.pk],
+        )
+
+    def test_passing_status_changed(self):
+        self.assert_variant(self.second)
+
+        passing = self.passings[0]
+        passing.success_passed = Passing.PASSED
+        passing.save()
+        self.assertFalse(TaskVariantAssignment.objects.filter(user=self.user).exists())
+        self.assert_variant(self.first)
+
+    def test_passing_deleted(self):
+        self.assert_variant(self.second)
+
+        self.passings[0].delete()
+        self.assert_variant(self.first)
+
+    def test_new_passing_keeps_variant(self):
+        self.assert_variant(self.second)
+
+        Passing.objects.create(task=self.second, user=self.user)
+        self.assertTrue(TaskVariantAssignment.objects.filter(user=self.user).exists())
+
+
+class TaskScoringTest(TestCase):
+    """
+    Снимок баллов задания обновляется сигналами вопросов, ответов и связи вопрос-задание
+    """
+
+    def setUp(self):
+        self.task = create_task()
+
+    def assert_scoring(self, questions_score, answer_key):
+        scoring = TaskScoring.objects.get(task=self.task)
+        self.assertEqual(scoring.questions_score, questions_score)
+        self.assertEqual(scoring.num_questions, len(answer_key))
+        self.assertEqual(scoring.answer_key, {str(question.pk): answers for question, answers in answer_key.items()})
+
+    def test_question_signals(self):
+        question, true, false = create_question(self.task, score=2)
+        self.assert_scoring(2, {question: [true[0].pk]})
+
+        question.score = 3
+        question.save()
+        self.assert_scoring(3, {question: [true[0].pk]})
+
+        other, other_true, _ = create_question(create_task('Другой'))
+        self.task.questions.add(other)
+        self.assert_scoring(4, {question: [true[0].pk], other: [other_true[0].pk]})
+
+        other.tasks.remove(self.task)
+        self.assert_scoring(3, {question: [true[0].pk]})
+
+        question.delete()
+        self.assert_scoring(0, {})
+
+    def test_question_tasks_cleared(self):
+        question, _, _ = create_question(self.task)
+        question.tasks.clear()
+        self.assert_scoring(0, {})
+
+        question.tasks.add(self.task)
+        self.task.questions.clear()
+        self.assert_scoring(0, {})
+
+    def test_answer_signals(self):
+        question, true, false = create_question(self.task)
+
+        added = Answer.objects.create(question=question, is_true=True, text='Тоже да')
+        self.assert_scoring(1, {question: [true[0].pk, added.pk]})
+
+        false[0].is_true = True
+        false[0].save()
+        self.assert_scoring(1, {question: [true[0].pk, false[0].pk, added.pk]})
+
+        true[0].is_true = False
+        true[0].save()
+        added.delete()
+        self.assert_scoring(1, {question: [false[0].pk]})
+
+    def test_user_answer_reads_snapshot(self):
+        question, true, false = create_question(self.task)
+        passing = Passing.objects.create(task=self.task, user=User.objects.create(username='client'), is_trial=True)
+        user_answer = create_user_answer(passing, question, answers=[false[0]])
+
+        false[0].is_true = True
+        false[0].save()
+        true[0].is_true = False
+        true[0].save()
+
+        user_answer = passing.user_answers.with_scoring().get(pk=user_answer.pk)
+        self.assertEqual(user_answer.correct_answer, [false[0].pk])
+        self.assertEqual(user_answer.get_user_points(), question.score)
+
+
+class QuestionFromFileTest(APITestCase):
+    """
+    Импорт вопросов задания из '.xlsx': пропуск строк с ошибками и пересчет снимка баллов
+    """
+    url = '/api/v1/courses/questions_from_file/'
+
+    def setUp(self):
+        self.client.force_authenticate(create_moderator())
+        self.task = create_task()
+
+    def post(self, rows, task=None):
+        return self.client.post(
+            self.url,
+            {'task': task or self.task.pk, 'file': create_xlsx(rows)},
+            format='multipart',
+        )
+
+    def test_import(self):
+        response = self.post([
+            [1, 2, 'Вопрос с ответами', 'Да', 1],
+            [None, None, None, 'Нет', None],
+            [2, 1, None, 'Без текста', 1],
+            [3, 'много', 'Баллы не числом', 'Да', 1],
+            [4, None, 'Свободный ответ'],
+            [5, 40000, 'Слишком много баллов', 'Да', 1],
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['errors'], [
+            {'row': 4, 'error': 'Не заполнен текст вопроса'},
+            {'row': 5, 'error': 'Баллы за вопрос должны быть целым числом: много'},
+            {'row': 7, 'error': 'Баллы за вопрос должны быть от 0 до 32767: 40000'},
+        ])
+
+        with_answers = Question.objects.get(tasks=self.task, text='Вопрос с ответами')
+        free = Question.objects.get(tasks=self.task, text='Свободный ответ')
+        self.assertEqual((with_answers.score, with_answers.is_free_answer), (2, False))
+        self.assertEqual((free.score, free.is_free_answer), (1, True))
+        self.assertEqual(
+            list(with_answers.answers.order_by('id').values_list('text', 'is_true')),
+            [('Да', True), ('Нет', False)],
+        )
+
+        scoring = TaskScoring.objects.get(task=self.task)
+        self.assertEqual((scoring.questions_score, scoring.num_questions), (3, 2))
+        self.assertEqual(scoring.answer_key, {
+            str(with_answers.pk): list(with_answers.answers.filter(is_true=True).values_list('id', flat=True)),
+            str(free.pk): [],
+        })
+        self.assertEqual(self.task.num_questions, 2)
+
+    def test_import_adds_to_existing_scoring(self):
+        create_question(self.task, score=5)
+        self.assertEqual(TaskScoring.objects.get(task=self.task).questions_score, 5)
+
+        response = self.post([[1, 2, 'Новый вопрос', 'Да', 1]])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['errors'], [])
+        scoring = TaskScoring.objects.get(task=self.task)
+        self.assertEqual((scoring.questions_score, scoring.num_questions), (7, 2))
+
+    def test_unknown_task(self):
+        response = self.post([[1, 2, 'Вопрос', 'Да', 1]], task=self.task.pk + 100)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Question.objects.exists())
+
+
+class CompanyProgressTest(APITestCase):
+    """
+    company_progress: те же счетчики, что и в прежнем CuratorUserProgressView (методы Course),
+    процент - (пройденные задания + пройденные материалы) / (задания + материалы)
+    """
+
+    def setUp(self):
+        self.company = Company.objects.create(title='Компания')
+        self.user = User.objects.create(username='client', company=self.company)
+        self.course = Course.objects.create(title='Курс')
+        self.course.users.add(self.user)
+        self.materials = [Material.objects.create(course=self.course, title=f'Материал {index}') for index in range(3)]
+        self.tasks = [
+            Task.objects.create(material=material, title=f'Задание {index}', travel_time=datetime.time(hour=1))
+            for index, material in enumerate(self.materials[:2] + self.materials[:1])
+        ]
+
+        self.create_passing(self.tasks[0], Passing.PASSED)
+        self.create_passing(self.tasks[1], Passing.SCORE)
+        self.create_passing(self.tasks[2], Passing.PASSED)
+        MaterialPassing.objects.create(material=self.materials[0], user=self.user, status=MaterialPassing.STATUS_PASSED)
+        MaterialPassing.objects.create(material=self.materials[1], user=self.user, status=MaterialPassing.STATUS_STARTED)
+
+    def create_passing(self, task, success_passed, **kwargs):
+        return Passing.objects.create(task=task, user=self.user, success_passed=success_passed, finish_time=now(), **kwargs)
+
+    def old_counts(self):
+        """
+        Счетчики прежнего CuratorUserProgressView
+        """
+        return {
+            'passed_tasks': self.course.get_success_tasks_for_user(self.user).count(),
+            'tasks_total': self.course.get_all_tasks().count(),
+            'passed_materials': self.course.get_passed_materials_for_user(self.user).count(),
+            'materials_total': self.course.get_all_materials().count(),
+        }
+
+    def assert_matches_old(self):
+        old = self.old_counts()
+        row, = company_progress([self.company.pk], course_id=self.course.pk)
+        self.assertEqual({key: row[key] for key in old}, old)
+        self.assertEqual(row['progress'], progress_percent(**old))
+        return row
+
+    def test_matches_old_counts(self):
+        row = self.assert_matches_old()
+        self.assertEqual(row['progress'], 50)  # (2 + 1) / (3 + 3)
+
+        curator = User.objects.create(username='curator', user_status=User.STATUS_CURATOR)
+        curator.curator_company.add(self.company)
+        self.client.force_authenticate(curator)
+        response = self.client.get(f'/api/v1/curator/user/{self.user.pk}/progress/')
+        self.assertEqual(response.data['progress'], row['progress'])
+
+    def test_trial_and_retaken_passings(self):
+        # Задание пройдено, если был хоть один успех (как и раньше - без учета is_trial),
+        # неуспешная пересдача его не отменяет
+        self.create_passing(self.tasks[1], Passing.PASSED, is_trial=True)
+        self.create_passing(self.tasks[0], Passing.SCORE)
+        MaterialPassing.objects.create(material=self.materials[2], user=self.user, status=MaterialPassing.STATUS_PASSED)
+        row = self.assert_matches_old()
+        self.assertEqual((row['passed_tasks'], row['passed_materials']), (3, 2))
+
+    def test_inactive_not_counted(self):
+        # Отличие от прежних счетчиков: неактивные задания и материалы не учитываются
+        Task.objects.filter(pk=self.tasks[2].pk).update(is_active=False)
+        Material.objects.filter(pk=self.materials[0].pk).update(is_active=False)
+
+        row, = company_progress([self.company.pk], course_id=self.course.pk)
+        self.assertEqual(
+            (row['passed_tasks'], row['tasks_total'], row['passed_materials'], row['materials_total']),
+            (0, 1, 0, 2),
+        )
+
+    def test_repeated_success_counted_once(self):
+        # Отличие от прежних счетчиков: повторное успешное прохождение задания не считается дважды
+        self.create_passing(self.tasks[0], Passing.PASSED)
+        self.assertEqual(self.old_counts()['passed_tasks'], 3)
+        row, = company_progress([self.company.pk], course_id=self.course.pk)
+        self.assertEqual(row['passed_tasks'], 2)
@@ -0,0 +1,101 @@
+from collections import defaultdict
+
+from backend.courses.models import Material, Passing, Task, TaskVariantAssignment
+
+# Статусы неуспешного прохождения, по которым выбирается следующий вариант задания
+FAILED_STATUSES = (Passing.LIMIT, Passing.ATTEMPTS, Passing.SCORE)
+
+
+def choose_variant(task_ids, failed_task_ids):
+    """
+    Выбор варианта задания материала
+        - меньше 3 неуспешных прохождений - первое задание материала
+        - 3 последних неуспешных прохождения не одного задания - задание последнего прохождения
+        - пройдены не все варианты - последнее по порядку задание, которое еще не проходили
+        - пройдены все варианты - задание с наименьшим кол-вом неуспешных прохождений
+          (при равенстве - то, что проходили раньше остальных)
+    :param task_ids: list, активные задания материала в порядке сортировки Task
+    :param failed_task_ids: list, задания неуспешных прохождений материала, от последнего к первому
+    :return: int, id задания или None
+    """
+    if len(failed_task_ids) < 3:
+        return task_ids[0] if task_ids else None
+
+    if not failed_task_ids[0] == failed_task_ids[1] == failed_task_ids[2]:
+        return failed_task_ids[0]
+
+    # Порядок ключей - первое появление задания, как у Counter
+    num_passings = {}
+    for task_id in failed_task_ids:
+        num_passings[task_id] = num_passings.get(task_id, 0) + 1
+
+    if len(failed_task_ids) < len(task_ids) * 3:
+        not_passed = [task_id for task_id in task_ids if task_id not in num_passings]
+        return not_passed[-1] if not_passed else None
+
+    min_passings = min(num_passings.values())
+    return [task_id for task_id, num in num_passings.items() if num == min_passings][-1]
+
+
+def get_user_variants(user, material_ids=None):
+    """
+    Варианты заданий пользователя по всем активным материалам его активных курсов.
+    Задания и неуспешные прохождения загружаются двумя запросами, выбор - в памяти.
+
+    :param material_ids: list, ограничить выбор материалами (по умолчанию все материалы пользователя)
+    :return: dict, {material_id: task_id}
+    """
+    if material_ids is None:
+        material_ids = Material.objects.filter(
+            course__users=user,
+            course__is_active=True,
+            is_active=True,
+        ).values('id')
+
+    material_tasks = defaultdict(list)
+    for material_id, task_id in Task.objects.filter(
+        material_id__in=material_ids,
+        is_active=True,
+    ).values_list('material_id', 'id'):
+        material_tasks[material_id].append(task_id)
+
+    material_failed = defaultdict(list)
+    for material_id, task_id in Passing.objects.filter(
+        user=user,
+        success_passed__in=FAILED_STATUSES,
+        task__material_id__in=material_ids,
+    ).order_by('-created').values_list('task__material_id', 'task_id'):
+        material_failed[material_id].append(task_id)
+
+    variants = {}
+    for material_id in material_tasks.keys() | material_failed.keys():
+        task_id = choose_variant(material_tasks[material_id], material_failed[material_id])
+        if task_id:
+            variants[material_id] = task_id
+    return variants
+
+
+def get_assigned_variants(user):
+    """
+    Варианты заданий пользователя из TaskVariantAssignment.
+    Для материалов без сохраненного варианта он выбирается get_user_variants и сохраняется.
+
+    :return: dict, {material_id: task_id}
+    """
+    material_ids = list(Material.objects.filter(
+        course__users=user,
+        course__is_active=True,
+        is_active=True,
+    ).values_list('id', flat=True).distinct())
+
+    variants = dict(TaskVariantAssignment.objects.filter(
+        user=user,
+        material_id__in=material_ids,
+    ).values_list('material_id', 'task_id'))
+
+    missing = [material_id for material_id in material_ids if material_id not in variants]
+    if missing:
+        chosen = get_user_variants(user, missing)
+        TaskVariantAssignment.assign(user.pk, chosen)
+        variants.update(chosen)
+    return variants
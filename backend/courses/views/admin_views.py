@@ -6,10 +6,12 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status
 from rest_framework import generics
 from rest_framework import permissions
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from django.conf import settings
 
+from backend.api_v1.filters import TrigramSearchFilter
 from backend.api_v1.permissions import IsModerator, is_administrator, is_moderator
 from backend.api_v1.utils import response_success, response_error
 from backend.constants import INVALID_DATA
@@ -98,7 +100,7 @@ class MaterialListCreate(generics.ListCreateAPIView):
     queryset = Material.objects.all()
     serializer_class = MaterialSerializer
     permission_classes = (permissions.IsAuthenticated, IsModerator)
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, TrigramSearchFilter)
     ordering_fields = '__all__'
     lookup_field = 'id'
     filterset_fields = (
@@ -226,7 +228,7 @@ class TaskListCreate(generics.ListCreateAPIView):
     Задания
     """
 
-    queryset = Task.objects.with_prefetch_related()
+    queryset = Task.objects.with_scoring()
     serializer_class = ModeratorTaskSerializer
     permission_classes = (permissions.IsAuthenticated, IsModerator)
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter,)
@@ -249,7 +251,7 @@ class TaskDetail(generics.RetrieveUpdateDestroyAPIView):
     Задания
     """
 
-    queryset = Task.objects.all()
+    queryset = Task.objects.with_scoring()
     serializer_class = ModeratorTaskSerializer
     permission_classes = (permissions.IsAuthenticated, IsModerator)
     lookup_field = 'id'
@@ -262,7 +264,7 @@ class QuestionListCreate(generics.ListCreateAPIView):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = (permissions.IsAuthenticated, IsModerator)
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter,)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, TrigramSearchFilter)
     ordering_fields = '__all__'
     filterset_fields = (
         'id',
@@ -270,6 +272,7 @@ class QuestionListCreate(generics.ListCreateAPIView):
         'tasks',
         'score',
     )
+    search_fields = ['text']
 
 
 class QuestionDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -296,20 +299,32 @@ class QuestionFromFileCreation(generics.GenericAPIView):
         serializer = self.serializer_class(data=request.data)
         question_file = request.FILES.get('file')
         if serializer.is_valid():
-            created, message, result_list, code = serializer.create_questions(serializer.data, question_file)
+            created, message, result_list, code, errors = serializer.create_questions(serializer.data, question_file)
             if created:
                 res = json.dumps(['id: {}, text: {}'.format(question.id, question.text) for question in result_list])
-                return response_success(code, message, res, status.HTTP_201_CREATED)
+                return response_success(code, message, res, status.HTTP_201_CREATED, errors=errors)
             else:
-                return response_error(code, message, serializer.errors, status.HTTP_400_BAD_REQUEST)
+                return response_error(code, message, serializer.errors, status.HTTP_400_BAD_REQUEST, errors=errors)
         return response_error(INVALID_DATA, 'invalid data', serializer.errors, status.HTTP_400_BAD_REQUEST)
 
 
+class TestPassingCursorPagination(CursorPagination):
+    """
+    Постраничная выдача по курсору (created, id), без OFFSET
+    """
+    page_size = 500
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('-created', '-id')
+
+
 class TestPassingViewSet(ModelViewSet):
     """
     Прохождение тестов клиентами
+    ?fields=id,task,user - только перечисленные поля
     """
     serializer_class = TestPassingSerializer
+    pagination_class = TestPassingCursorPagination
     permission_classes = (permissions.IsAuthenticated, IsModerator)
     http_method_names = ['get']
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter,)
@@ -321,10 +336,19 @@ class TestPassingViewSet(ModelViewSet):
         'success_passed',
         'is_trial',
     )
-    ordering_fields = '__all__'
+    # Курсор строится по первому полю сортировки - только неизменяемые поля без NULL,
+    # CursorPagination берет сортировку из OrderingFilter, поэтому она задается и на view
+    ordering_fields = ('created',)
+    ordering = ('-created', '-id')
 
     def get_queryset(self):
-        return Passing.objects.with_select_related()
+        queryset = Passing.objects.with_select_related()
+
+        fields = self.request.query_params.get('fields')
+        requested = {field.strip() for field in fields.split(',')} if fields else None
+        if requested is None or requested & TestPassingSerializer.COMPUTED_FIELDS:
+            queryset = queryset.with_computed_fields()
+        return queryset
 
 
 class TestPassingDetail(generics.RetrieveUpdateAPIView):
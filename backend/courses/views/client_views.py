@@ -1,5 +1,4 @@
 import datetime
-from collections import Counter
 
 from django.utils.timezone import now
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet
@@ -38,6 +37,7 @@ from backend.courses.serializers.material_serializers import MaterialClientSeria
 from backend.courses.serializers.passing_serializers import ClientTestPassingSerializer, TestPassingSerializer
 from backend.courses.serializers.question_serializers import QuestionSerializer
 from backend.courses.serializers.task_serializers import CommonTaskSerializer
+from backend.courses.variants import get_assigned_variants, get_user_variants
 from backend.users.models import User
 from rest_framework import serializers
 
@@ -136,50 +136,12 @@ class MaterialClientViewSet(ModelViewSet):
 
 
 def get_old_or_new_task_for_user(user, material):
-    task = None
-
-    current_material_tasks = Task.objects.filter(material=material, is_active=True)
-
-    # TODO:
-    # Проверить есть ли прохождения этого теста другими пользователем
-    # Если нету - проходить этот тест
-    # Если есть - брать следующий вариант
-
-    all_passings = Passing.objects.filter(user=user, success_passed__in=[2, 3, 4], task__material=material)
-    all_passings_count = all_passings.count()
-    last_passing = all_passings.first()
-    passing_tasks = []
-    for p in all_passings:
-        passing_tasks.append(p.task)
-
-    if all_passings_count < 3:
-        task = current_material_tasks.first()
-        # print('passings less then 3')
-    else:
-        three_attempts_passed = all_passings[0].task == all_passings[1].task == all_passings[2].task
-        if three_attempts_passed:
-            all_tasks = Task.objects.filter(material=material, is_active=True)
-            passing_collection = dict(Counter(passing_tasks))
-            passed_tasks = passing_collection.values()
-            if all_passings_count < all_tasks.count() * 3:
-                for t in all_tasks:
-                    if t not in passing_tasks:
-                        task = t
-                # print('passings more then 3 but passed not all variants')
-            else:
-                min_passing = min(passed_tasks)
-                task_of_min_passings = None
-                for task, num_passings in passing_collection.items():
-                    if num_passings == min_passing:
-                        task_of_min_passings = task
-                task = task_of_min_passings
-                # print('passed all variants and chose task with min passings')
-        else:
-            # print('repeat last passing')
-            task = last_passing.task
-
-    return task
-
+    """
+    Вариант задания материала для пользователя (правила - backend.courses.variants.choose_variant)
+    """
+    task_id = get_user_variants(user, [material.pk]).get(material.pk)
+    if task_id:
+        return Task.objects.get(pk=task_id)
 
 
 def get_user_passes_task(user) -> Task:
@@ -217,26 +179,14 @@ class TaskClientViewSet(ModelViewSet):
     ordering_fields = '__all__'
 
     def get_queryset(self):
-        from functools import reduce
-        materials = {}
-
-        all_user_materials = reduce(lambda x, y: x + y,
-                                    [[material for material in course.materials.filter(is_active=True)] for course in
-                                     self.request.user.courses.filter(is_active=True)])
-
-        for material in all_user_materials:
-            task = get_old_or_new_task_for_user(self.request.user, material)
-
-            if task:
-                materials.update({material.pk: task})
-                continue
+        variants = get_assigned_variants(self.request.user)
 
         return Task.objects.filter(
             material__course__users__in=[self.request.user],
             material__course__is_active=True,
             material__is_active=True,
-            pk__in=[materials.get(mk).id for mk in materials.keys()]
-        ).order_by('rank')
+            pk__in=list(variants.values()),
+        ).with_scoring().order_by('rank')
 
 
 class QuestionClientViewSet(ModelViewSet):
@@ -282,7 +232,9 @@ class TestPassingClientListCreate(generics.ListCreateAPIView):
     ordering_fields = '__all__'
 
     def get_queryset(self):
-        return Passing.objects.filter(user=self.request.user).distinct()
+        return Passing.objects.filter(
+            user=self.request.user,
+        ).with_select_related().with_computed_fields().distinct()
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
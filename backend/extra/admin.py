@@ -1,7 +1,7 @@
 from django.contrib import admin
 from solo.admin import SingletonModelAdmin
 
-from .models import EmailLogger, EmailSettings
+from .models import EmailLogger, EmailSettings, ImportJob
 
 
 @admin.register(EmailLogger)
@@ -20,3 +20,10 @@ class EmailLoggerAdmin(admin.ModelAdmin):
 @admin.register(EmailSettings)
 class EmailSettingsAdmin(SingletonModelAdmin):
     list_display = ('email',)
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'author', 'total', 'processed', 'failed', 'created', 'finish_time')
+    list_filter = ('kind', 'status', 'created')
+    readonly_fields = ('total', 'processed', 'failed', 'errors', 'message', 'finish_time')
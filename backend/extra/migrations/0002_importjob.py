@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-18 14:10
+
+from django.conf import settings
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('extra', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Время создания')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Время изменения')),
+                ('kind', models.CharField(choices=[('questions', 'Вопросы задания'), ('users', 'Пользователи')], max_length=20, verbose_name='Тип импорта')),
+                ('status', models.PositiveSmallIntegerField(choices=[(0, 'В очереди'), (1, 'Выполняется'), (2, 'Завершен'), (3, 'Ошибка')], default=0, verbose_name='Статус')),
+                ('file', models.FileField(blank=True, null=True, upload_to='import_jobs/', verbose_name='Файл')),
+                ('text', models.TextField(blank=True, null=True, verbose_name='Текст (пользователи)')),
+                ('params', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего строк')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано')),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='С ошибками')),
+                ('errors', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=list, verbose_name='Ошибки')),
+                ('message', models.TextField(blank=True, default='', verbose_name='Сообщение')),
+                ('finish_time', models.DateTimeField(blank=True, null=True, verbose_name='Время окончания')),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Импорт',
+                'verbose_name_plural': 'Импорты',
+                'ordering': ['-created'],
+            },
+        ),
+    ]
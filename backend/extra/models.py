@@ -1,6 +1,10 @@
+from django.contrib.postgres.fields import JSONField
 from django.db import models
 from solo.models import SingletonModel
 
+from backend.helpers import BaseModel
+from backend.users.models import User
+
 
 class EmailSettings(SingletonModel):
     """
@@ -35,3 +39,60 @@ class EmailLogger(models.Model):
 
     def __str__(self):
         return str(self.id)
+
+
+class ImportJob(BaseModel):
+    """
+    Фоновый импорт из файла (вопросы задания, пользователи)
+    Выполняется задачей backend.extra.tasks.run_import_job, прогресс отправляется в канал уведомлений
+    """
+
+    # Что импортируется
+    KIND_QUESTIONS = 'questions'
+    KIND_USERS = 'users'
+
+    KIND_CHOICES = (
+        (KIND_QUESTIONS, 'Вопросы задания'),
+        (KIND_USERS, 'Пользователи'),
+    )
+
+    # Статусы импорта
+    PENDING = 0
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Завершен'),
+        (FAILED, 'Ошибка'),
+    )
+
+    kind = models.CharField('Тип импорта', max_length=20, choices=KIND_CHOICES)
+    status = models.PositiveSmallIntegerField('Статус', choices=STATUS_CHOICES, default=PENDING)
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        related_name='import_jobs',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    file = models.FileField('Файл', upload_to='import_jobs/', null=True, blank=True)
+    text = models.TextField('Текст (пользователи)', null=True, blank=True)
+    params = JSONField('Параметры', default=dict, blank=True)
+    total = models.PositiveIntegerField('Всего строк', default=0)
+    processed = models.PositiveIntegerField('Обработано', default=0)
+    failed = models.PositiveIntegerField('С ошибками', default=0)
+    errors = JSONField('Ошибки', default=list, blank=True)
+    message = models.TextField('Сообщение', blank=True, default='')
+    finish_time = models.DateTimeField('Время окончания', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Импорт'
+        verbose_name_plural = 'Импорты'
+        ordering = ['-created']
+
+    def __str__(self):
+        return f'{self.get_kind_display()} id_{self.pk}'
@@ -0,0 +1,67 @@
+from rest_framework import serializers
+
+from backend.extra.models import ImportJob
+from backend.users.utils import file_validator
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор фонового импорта
+        - вопросы (kind=questions): file, task_id
+        - пользователи (kind=users): file или text, course_id, design
+    """
+
+    file = serializers.FileField(required=False, validators=[file_validator])
+    task_id = serializers.IntegerField(required=False, write_only=True)
+    course_id = serializers.IntegerField(required=False, write_only=True)
+    design = serializers.IntegerField(required=False, write_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id',
+            'kind',
+            'status',
+            'file',
+            'text',
+            'task_id',
+            'course_id',
+            'design',
+            'params',
+            'total',
+            'processed',
+            'failed',
+            'errors',
+            'message',
+            'created',
+            'finish_time',
+        ]
+        read_only_fields = [
+            'id',
+            'status',
+            'params',
+            'total',
+            'processed',
+            'failed',
+            'errors',
+            'message',
+            'created',
+            'finish_time',
+        ]
+
+    def validate(self, attrs):
+        if attrs['kind'] == ImportJob.KIND_QUESTIONS:
+            if not attrs.get('file') or not attrs.get('task_id'):
+                raise serializers.ValidationError('Для импорта вопросов заполните поля: file, task_id')
+        elif bool(attrs.get('file')) == bool(attrs.get('text')):
+            raise serializers.ValidationError('Заполните только одно из этих полей: text, file')
+        return super().validate(attrs)
+
+    def create(self, validated_data):
+        params = {}
+        for key in ('task_id', 'course_id', 'design'):
+            value = validated_data.pop(key, None)
+            if value is not None:
+                params[key] = value
+        validated_data['params'] = params
+        return super().create(validated_data)
@@ -1,15 +1,20 @@
 from __future__ import absolute_import, unicode_literals
 
-from backend.extra.utils import get_email_data, make_log
+from backend.extra.utils import get_email_data, make_log, send_import_progress
 from celery import shared_task
 from django.contrib.sites.models import Site
 from django.core.mail import EmailMessage
 from django.template.loader import get_template
+from django.db import transaction
 from django.db.models import Q
+from django.utils.timezone import now
 
+from backend.extra.models import ImportJob
 from backend.mess.models import Message
-from backend.users.models import Company
-from backend.courses.models import Tag
+from backend.users.models import Company, User
+from backend.courses.importers import parse_questions, save_questions
+from backend.courses.models import Course, Tag, Task
+from backend.users.utils import creat_users_rows, parse_users_text, users_file_to_text
 
 
 @shared_task
@@ -60,3 +65,117 @@ def clean_companies():
     """
     deleted = Company.objects.filter(Q(company_users__isnull=True) & Q(company_chats__isnull=True)).delete()
     print(f"Deleted unused {deleted[0]} companies.")
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _import_questions(job, chunk_size):
+    task_id = job.params.get('task_id')
+    if not Task.objects.filter(pk=task_id).exists():
+        raise ValueError(f'Для id_{task_id} не удалось найти объекта задания')
+
+    with job.file.open('rb') as question_file:
+        questions, errors = parse_questions(question_file)
+
+    job.total = len(questions) + len(errors)
+    job.failed = len(errors)
+    job.errors = errors
+    yield
+
+    for chunk in _chunks(questions, chunk_size):
+        try:
+            save_questions(task_id, chunk)
+        except Exception as ex:
+            job.failed += len(chunk)
+            job.errors.extend({'row': question.row, 'error': str(ex)} for question in chunk)
+        else:
+            job.processed += len(chunk)
+        yield
+
+
+def _import_users(job, chunk_size):
+    course = None
+    course_id = job.params.get('course_id')
+    if course_id:
+        course = Course.objects.filter(pk=course_id).first()
+        if not course:
+            raise ValueError(f'Курс с ID <{course_id}> не существует')
+
+    if job.text:
+        text = job.text
+    else:
+        with job.file.open('rb') as file_users:
+            text = users_file_to_text(file_users)
+
+    # Номер строки - порядковый номер пользователя в списке
+    rows = list(enumerate(parse_users_text(text), start=1))
+    usernames = [row[1].strip() for _, row in rows if len(row) == 6]
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+    valid = []
+    seen = set()
+    for num, row in rows:
+        if len(row) != 6:
+            job.errors.append({'row': num, 'error': 'Ожидается 6 строк: ФИО, логин, пароль, компания, начало и конец курса'})
+            continue
+        username = row[1].strip()
+        if username in existing or username in seen:
+            job.errors.append({'row': num, 'error': f'Пользователь с ником <{username}> уже существует'})
+            continue
+        seen.add(username)
+        valid.append((num, row))
+
+    job.total = len(rows)
+    job.failed = len(job.errors)
+    yield
+
+    for chunk in _chunks(valid, chunk_size):
+        try:
+            with transaction.atomic():
+                creat_users_rows([row for _, row in chunk], course, job.params.get('design'))
+        except Exception as ex:
+            job.failed += len(chunk)
+            job.errors.extend({'row': num, 'error': f'{type(ex)}: {ex}'} for num, _ in chunk)
+        else:
+            job.processed += len(chunk)
+        yield
+
+
+IMPORTERS = {
+    ImportJob.KIND_QUESTIONS: _import_questions,
+    ImportJob.KIND_USERS: _import_users,
+}
+
+
+@shared_task
+def run_import_job(job_id, chunk_size=500):
+    """
+    Фоновый импорт из файла частями по chunk_size строк
+    После каждой части сохраняется прогресс и отправляется в канал уведомлений
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    if job.status != ImportJob.PENDING:
+        return
+
+    job.status = ImportJob.RUNNING
+    job.save(update_fields=['status', 'updated'])
+    send_import_progress(job)
+
+    progress_fields = ['total', 'processed', 'failed', 'errors', 'updated']
+    try:
+        for _ in IMPORTERS[job.kind](job, chunk_size):
+            job.save(update_fields=progress_fields)
+            send_import_progress(job)
+    except Exception as ex:
+        job.status = ImportJob.FAILED
+        job.message = f'{type(ex)}: {ex}'
+    else:
+        job.status = ImportJob.DONE
+        job.message = f'Импортировано: {job.processed}, с ошибками: {job.failed}'
+
+    job.finish_time = now()
+    job.save(update_fields=progress_fields + ['status', 'message', 'finish_time'])
+    send_import_progress(job)
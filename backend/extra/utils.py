@@ -29,3 +29,25 @@ def make_log(message):
     """
     log = EmailLogger.objects.create(message=message)
     return log
+
+
+def send_import_progress(job):
+    """
+    Отправка прогресса импорта автору в канал уведомлений
+    """
+    from backend.notifications.utils import send_to_user
+
+    if not job.author_id:
+        return
+
+    send_to_user(job.author_id, {
+        'type': 'import_job_progress',
+        'message_for': job.author_id,
+        'job_id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'total': job.total,
+        'processed': job.processed,
+        'failed': job.failed,
+        'message': job.message,
+    })
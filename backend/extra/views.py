@@ -0,0 +1,38 @@
+from django.db import transaction
+from rest_framework import generics
+from rest_framework import permissions
+
+from backend.api_v1.permissions import IsModerator
+from backend.extra.models import ImportJob
+from backend.extra.serializers import ImportJobSerializer
+from backend.extra.tasks import run_import_job
+
+
+class ImportJobListCreate(generics.ListCreateAPIView):
+    """
+    Фоновые импорты пользователя
+    Импорт запускается задачей run_import_job, прогресс - в канале уведомлений (type: import_job_progress)
+    """
+
+    serializer_class = ImportJobSerializer
+    permission_classes = (permissions.IsAuthenticated, IsModerator)
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(author=self.request.user)
+
+    def perform_create(self, serializer):
+        job = serializer.save(author=self.request.user)
+        transaction.on_commit(lambda: run_import_job.delay(job.pk))
+
+
+class ImportJobDetail(generics.RetrieveAPIView):
+    """
+    Статус фонового импорта
+    """
+
+    serializer_class = ImportJobSerializer
+    permission_classes = (permissions.IsAuthenticated, IsModerator)
+    lookup_field = 'id'
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(author=self.request.user)
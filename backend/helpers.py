@@ -4,6 +4,30 @@ from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import AccessToken
 
 
+class DynamicFieldsMixin:
+    """
+    Выборочные поля сериализатора: ?fields=id,task,user
+    Не запрошенные поля (и вычисляемые свойства за ними) не сериализуются
+    """
+
+    @property
+    def requested_fields(self):
+        request = self.context.get('request')
+        if request is None:
+            return None
+        fields = request.query_params.get('fields')
+        if not fields:
+            return None
+        return {field.strip() for field in fields.split(',') if field.strip()}
+
+    def get_field_names(self, declared_fields, info):
+        field_names = super().get_field_names(declared_fields, info)
+        requested = self.requested_fields
+        if requested is None:
+            return field_names
+        return [name for name in field_names if name in requested]
+
+
 class BaseModel(models.Model):
     """
     База для всех моделей
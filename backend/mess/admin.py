@@ -1,12 +1,12 @@
 from django.contrib import admin
 from solo.admin import SingletonModelAdmin
 
-from .models import Chat, Message, FirebaseSettings, UserMessage
+from .models import Chat, ChatUnreadCounter, Message, FirebaseSettings, UserMessage
 
 
 @admin.register(Chat)
 class ChatAdmin(admin.ModelAdmin):
-    list_display = ('__str__', 'chat_status', 'course', 'company', 'created')
+    list_display = ('__str__', 'chat_status', 'course', 'company', 'message_count', 'member_count', 'last_message_at')
     list_filter = ('created', 'company', 'chat_status')
     raw_id_fields = ('course', 'company')
 
@@ -28,3 +28,9 @@ class UserMessageAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'user', 'message', 'is_read', 'created', 'updated')
     list_filter = ('is_read',)
     raw_id_fields = ('user', 'message')
+
+
+@admin.register(ChatUnreadCounter)
+class ChatUnreadCounterAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'user', 'chat', 'unread')
+    raw_id_fields = ('user', 'chat')
@@ -1,55 +1,47 @@
-from asgiref.sync import async_to_sync
-from channels.generic.websocket import JsonWebsocketConsumer
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
 
 from backend.users.models import User
 from backend.mess.exceptions import ClientError
-from backend.mess.models import Chat, Message, UserMessage
+from backend.mess.models import Chat
+from backend.mess.utils import create_message
 
 
-class SupportChatConsumer(JsonWebsocketConsumer):
+class SupportChatConsumer(AsyncJsonWebsocketConsumer):
     chat_name = 'support_chat_'
     chat_status = Chat.STATUS_SUPPORT
     chat = None
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-
         self.user = None
 
-        user_data = self.scope['url_route']['kwargs']
-        user_id = user_data.get('user_id')
-        user_token = user_data.get('token')
-
-        # TODO: проверить token пользователя
-        if user_id and user_token:
-            try:
-                user = User.objects.get(id=user_id)
-            except User.DoesNotExist:
-                pass
-            else:
-                self.user = user
-
-    def connect(self):
+    async def connect(self):
         """
-        Соединение, добавление канала в группу
+        Соединение, проверка токена и добавление канала в группу
         """
-
-        # TODO: проверить token пользователя
+        self.user = await database_sync_to_async(self.authenticate)()
         if self.user:
-            self.chat = self.get_chat(self.user)
-            self.chat_name += str(self.chat.pk)
-            async_to_sync(self.channel_layer.group_add)(self.chat_name, self.channel_name)
-            self.accept()
-        else:
-            self.close()
+            self.chat = await database_sync_to_async(self.get_chat)(self.user)
+        if not self.chat:
+            await self.close()
+            return
+
+        self.chat_name += str(self.chat.pk)
+        await self.channel_layer.group_add(self.chat_name, self.channel_name)
+        await self.accept()
 
-    def disconnect(self, close_code):
+    async def disconnect(self, close_code):
         """
         При разрыве соединения очищаем группу
         """
-        async_to_sync(self.channel_layer.group_discard)(self.chat_name, self.channel_name)
+        if self.chat:
+            await self.channel_layer.group_discard(self.chat_name, self.channel_name)
 
-    def receive_json(self, content):
+    async def receive_json(self, content, **kwargs):
         """
         Обмен сообщениями в группе
         """
@@ -57,33 +49,51 @@ class SupportChatConsumer(JsonWebsocketConsumer):
 
         try:
             if command == 'send':
-                message = self.save_message(self.user, self.chat, content['message'])
-                async_to_sync(self.channel_layer.group_send)(
+                message = await database_sync_to_async(self.save_message)(self.user, self.chat, content['message'])
+                await self.channel_layer.group_send(
                     self.chat_name,
                     {
                         'type': 'send.message',
-                        'chat_user': self.scope['user'].username,
+                        'chat_user': self.user.username,
                         'message': message.mess,
                         'message_id': message.id,
                         'user_id': self.user.id,
                     }
                 )
         except ClientError as e:
-            self.send_json({'error': e.code})
+            await self.send_json({'error': e.code})
 
-    def send_message(self, event):
+    async def send_message(self, event):
         """
         Отправка сообщения в чат
         """
-        # print(event)
-        self.send_json({
+        await self.send_json({
             'message': event['message'],
+            'message_id': event['message_id'],
+            # После переподключения пропущенные сообщения: GET message/?chat=<id>&after=<cursor>
+            'cursor': event['message_id'],
             'user_id': event['user_id'],
             'username': self.user.username,
             'first_name': self.user.first_name,
             'last_name': self.user.last_name,
         })
 
+    def authenticate(self):
+        """
+        Пользователь из url, если token - его действующий access токен
+        """
+        user_data = self.scope['url_route']['kwargs']
+        user_id = user_data.get('user_id')
+
+        try:
+            token = AccessToken(user_data.get('token'))
+        except TokenError:
+            return None
+
+        if not user_id or str(token.get(api_settings.USER_ID_CLAIM)) != str(user_id):
+            return None
+        return User.objects.filter(id=user_id).first()
+
     def get_chat(self, user):
         """
         Получаем или создаем чат
@@ -108,6 +118,7 @@ class SupportChatConsumer(JsonWebsocketConsumer):
             except Chat.DoesNotExist:
                 # TODO: действия по инициализации чата от лица тех.поддержки или препода
                 print('нужно создать чат от лица админа или модератор')
+                chat = None
 
         else:
             chat = Chat.objects.filter(
@@ -127,29 +138,7 @@ class SupportChatConsumer(JsonWebsocketConsumer):
 
     @staticmethod
     def save_message(user, chat, message):
-        message = Message.objects.create(
-            user=user,
-            chat=chat,
-            mess=message,
-        )
-        for chat_user in chat.users.all():
-
-            # Если пользователь является создателем сообщения, то автоматом сообщение для него прочтено
-            if chat_user.id == user.id:
-                is_read = True
-            else:
-                is_read = False
-
-            UserMessage.objects.create(
-                message_id=message.id,
-                user_id=chat_user.id,
-                is_read=is_read,
-                author=user.username,
-                author_id=user.id,
-                chat_status=chat.chat_status,
-                message_text=message.mess
-            )
-        return message
+        return create_message(user, chat, message)
 
 
 class TeacherChatConsumer(SupportChatConsumer):
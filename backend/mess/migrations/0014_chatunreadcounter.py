@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mess', '0013_usermessage_message_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatUnreadCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread', models.PositiveIntegerField(default=0, verbose_name='Непрочитанных сообщений')),
+                ('chat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='mess.Chat', verbose_name='Чат')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_unread_counters', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Непрочитанные сообщения чата',
+                'verbose_name_plural': 'Непрочитанные сообщения чатов',
+                'unique_together': {('user', 'chat')},
+            },
+        ),
+        migrations.RunSQL(
+            'INSERT INTO mess_chatunreadcounter (user_id, chat_id, unread) '
+            'SELECT um.user_id, m.chat_id, COUNT(*) FROM mess_usermessage um '
+            'JOIN mess_message m ON m.id = um.message_id '
+            'WHERE NOT um.is_read GROUP BY um.user_id, m.chat_id',
+            migrations.RunSQL.noop,
+        ),
+    ]
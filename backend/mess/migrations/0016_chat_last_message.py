@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess', '0015_message_chat_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='last_message_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время последнего сообщения'),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Последнее сообщение'),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Кол-во сообщений'),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Кол-во участников'),
+        ),
+        migrations.RunSQL(
+            'UPDATE mess_chat SET '
+            'message_count = (SELECT COUNT(*) FROM mess_message m WHERE m.chat_id = mess_chat.id), '
+            'member_count = (SELECT COUNT(*) FROM mess_chat_users u WHERE u.chat_id = mess_chat.id), '
+            'last_message_at = COALESCE('
+            '(SELECT MAX(m.created) FROM mess_message m WHERE m.chat_id = mess_chat.id), mess_chat.created), '
+            'last_message_preview = COALESCE('
+            "(SELECT LEFT(COALESCE(m.mess, ''), 255) FROM mess_message m WHERE m.chat_id = mess_chat.id "
+            "ORDER BY m.created DESC, m.id DESC LIMIT 1), '')",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['-last_message_at', '-id'], name='chat_last_message_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess', '0016_chat_last_message'),
+        # Расширение pg_trgm
+        ('users', '0031_user_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunSQL(
+            'CREATE TRIGGER mess_message_search_vector_update BEFORE INSERT OR UPDATE '
+            'OF mess, search_vector ON mess_message FOR EACH ROW '
+            "EXECUTE PROCEDURE tsvector_update_trigger(search_vector, 'pg_catalog.russian', mess)",
+            'DROP TRIGGER mess_message_search_vector_update ON mess_message',
+        ),
+        migrations.RunSQL(
+            "UPDATE mess_message SET search_vector = to_tsvector('pg_catalog.russian', coalesce(mess, ''))",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='message_search_vector_idx'),
+        ),
+        # icontains -> UPPER(поле) LIKE UPPER(%s)
+        migrations.RunSQL(
+            'CREATE INDEX mess_message_mess_trgm_idx ON mess_message USING gin (UPPER(mess) gin_trgm_ops)',
+            'DROP INDEX mess_message_mess_trgm_idx',
+        ),
+    ]
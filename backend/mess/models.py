@@ -1,7 +1,11 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxLengthValidator, FileExtensionValidator
-from django.db import models
-from django.db.models import Max
+from django.db import connection, models
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Left
 from django.urls import reverse
+from django.utils import timezone
 from solo.models import SingletonModel
 
 from backend.courses.models import Course
@@ -12,14 +16,14 @@ from backend.users.models import User, Company
 class ChatQuerySet(models.QuerySet):
 
     def with_prefetch_related(self):
-        return self.prefetch_related('users', 'messages')
+        return self.prefetch_related('users')
 
     def with_annotations(self):
         """
-        Время последнего сообщения
+        Время последнего сообщения (хранится в Chat.last_message_at)
         """
         return self.annotate(
-            last_message_date=Max('messages__created')
+            last_message_date=F('last_message_at')
         )
 
 
@@ -51,12 +55,21 @@ class Chat(BaseModel):
         null=True,
         on_delete=models.SET_NULL,
     )
+    # Поддерживаются при записи сообщений и участников (backend.mess.signals), список чатов не читает сообщения
+    last_message_at = models.DateTimeField('Время последнего сообщения', default=timezone.now)
+    last_message_preview = models.CharField('Последнее сообщение', max_length=255, blank=True, default='')
+    message_count = models.PositiveIntegerField('Кол-во сообщений', default=0)
+    member_count = models.PositiveIntegerField('Кол-во участников', default=0)
 
     objects = ChatQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Чат'
         verbose_name_plural = 'Чаты'
+        indexes = [
+            # Список чатов по курсору (last_message_at, id) - ChatViewSet
+            models.Index(fields=['-last_message_at', '-id'], name='chat_last_message_idx'),
+        ]
 
     def __str__(self):
         return f'Чат id-{self.pk}'
@@ -78,7 +91,53 @@ class Chat(BaseModel):
 
     @property
     def num_messages(self):
-        return self.messages.count()
+        return self.message_count
+
+    @classmethod
+    def message_added(cls, message):
+        """
+        Учет нового сообщения в чате одним UPDATE: счетчик, время и текст последнего сообщения
+        (время и текст - только если сообщение не старше уже учтенного)
+        """
+        is_last = Q(last_message_at__lte=message.created)
+        preview = (message.mess or '')[:cls._meta.get_field('last_message_preview').max_length]
+        cls.objects.filter(pk=message.chat_id).update(
+            message_count=F('message_count') + 1,
+            last_message_at=Case(When(is_last, then=Value(message.created, output_field=models.DateTimeField())), default=F('last_message_at')),
+            last_message_preview=Case(When(is_last, then=Value(preview, output_field=models.CharField())), default=F('last_message_preview')),
+        )
+
+    @classmethod
+    def refresh_message_stats(cls, chat_ids):
+        """
+        Пересчет счетчика и последнего сообщения чатов по таблице сообщений (после удаления сообщений)
+        """
+        messages = Message.objects.filter(chat_id=OuterRef('pk'))
+        last_message = messages.order_by('-created', '-id')
+        max_length = cls._meta.get_field('last_message_preview').max_length
+        cls.objects.filter(pk__in=chat_ids).update(
+            message_count=Coalesce(Subquery(
+                messages.order_by().values('chat_id').annotate(count=Count('id')).values('count')
+            ), 0),
+            last_message_at=Coalesce(Subquery(last_message.values('created')[:1]), F('created')),
+            last_message_preview=Coalesce(Subquery(
+                last_message.annotate(preview=Left(Coalesce('mess', Value('')), max_length)).values('preview')[:1]
+            ), Value('')),
+        )
+
+    @classmethod
+    def refresh_member_count(cls, chat_ids):
+        """
+        Пересчет кол-ва участников чатов
+        """
+        through = cls.users.through
+        cls.objects.filter(pk__in=chat_ids).update(
+            member_count=Coalesce(Subquery(
+                through.objects.filter(chat_id=OuterRef('pk')).order_by().values('chat_id').annotate(
+                    count=Count('id'),
+                ).values('count')
+            ), 0),
+        )
 
 
 class Message(BaseModel):
@@ -95,10 +154,18 @@ class Message(BaseModel):
             FileExtensionValidator(allowed_extensions=('png', 'jpeg', 'jpg', 'bmp')),
         ],
     )
+    # mess - заполняется триггером в базе (migrations/0017_message_search)
+    search_vector = SearchVectorField('Поисковый вектор', null=True, editable=False)
 
     class Meta:
         verbose_name = 'Сообщение'
         verbose_name_plural = 'Сообщения'
+        indexes = [
+            # История чата по ключу (created, id) - MessageKeysetPagination
+            models.Index(fields=['chat', '-created', '-id'], name='message_chat_created_idx'),
+            # Поиск backend.api_v1.filters.TrigramSearchFilter, индексы pg_trgm - в миграции
+            GinIndex(fields=['search_vector'], name='message_search_vector_idx'),
+        ]
 
     def __str__(self):
         return f'Сообщение в чат id-{self.chat.pk} от {self.user.username}'
@@ -133,6 +200,62 @@ class UserMessage(BaseModel):
         return f'Сообщение ID:{self.message_id} для пользователя ID:{self.user_id} {is_read}'
 
 
+class ChatUnreadCounter(models.Model):
+    """
+    Кол-во непрочитанных сообщений пользователя в чате.
+    Увеличивается при рассылке сообщения (backend.mess.utils.create_message),
+    обнуляется при прочтении чата (ReadChatMessagesSerializer.update_is_read)
+    """
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='chat_unread_counters',
+        on_delete=models.CASCADE,
+    )
+    chat = models.ForeignKey(Chat, verbose_name='Чат', related_name='unread_counters', on_delete=models.CASCADE)
+    unread = models.PositiveIntegerField('Непрочитанных сообщений', default=0)
+
+    class Meta:
+        verbose_name = 'Непрочитанные сообщения чата'
+        verbose_name_plural = 'Непрочитанные сообщения чатов'
+        unique_together = ('user', 'chat')
+
+    def __str__(self):
+        return f'Чат ID:{self.chat_id} для пользователя ID:{self.user_id}: {self.unread}'
+
+    @classmethod
+    def increment(cls, chat_id, user_ids):
+        """
+        +1 непрочитанное сообщение чата для пользователей, одним INSERT ... ON CONFLICT
+        :return: dict, {user_id: непрочитанных в чате}
+        """
+        if not user_ids:
+            return {}
+        table = cls._meta.db_table
+        values = ', '.join(['(%s, %s, 1)'] * len(user_ids))
+        params = [value for user_id in user_ids for value in (user_id, chat_id)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, chat_id, unread) VALUES {values} '
+                f'ON CONFLICT (user_id, chat_id) DO UPDATE SET unread = {table}.unread + 1 '
+                f'RETURNING user_id, unread',
+                params,
+            )
+            return dict(cursor.fetchall())
+
+    @classmethod
+    def totals(cls, user_ids):
+        """
+        Всего непрочитанных сообщений пользователей
+        :return: dict, {user_id: непрочитанных во всех чатах}
+        """
+        return dict(
+            cls.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+                total=Sum('unread'),
+            ).values_list('user_id', 'total')
+        )
+
+
 class FirebaseSettings(SingletonModel):
     updated = models.DateTimeField('Время изменения', auto_now=True)
     apikey = models.CharField('api key', max_length=255)
@@ -1,7 +1,11 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils.encoding import filepath_to_uri
 from rest_framework import serializers
 
 from backend.users.models import User
-from .models import Chat, Message, UserMessage
+from .models import Chat, ChatUnreadCounter, Message, UserMessage
+from .utils import notify_unread
 
 
 class ReadChatMessagesSerializer(serializers.Serializer):
@@ -21,6 +25,8 @@ class ReadChatMessagesSerializer(serializers.Serializer):
                 message__chat=chat,
                 is_read=False,
             ).update(is_read=True)
+            ChatUnreadCounter.objects.filter(user=user, chat=chat).update(unread=0)
+            transaction.on_commit(lambda: notify_unread(user.id, chat.id))
 
         return True, f'All chat ID:{validated_data["chat_id"]} messages for the user ID:{user.id} are read'
 
@@ -42,7 +48,8 @@ class _UserSerializer(serializers.ModelSerializer):
 
 class ChatSerializer(serializers.ModelSerializer):
     list_users = _UserSerializer(read_only=True, many=True, source='users')
-    last_message_date = serializers.DateTimeField(required=False)
+    last_message_date = serializers.DateTimeField(source='last_message_at', read_only=True)
+    num_messages = serializers.IntegerField(source='message_count', read_only=True)
 
     class Meta:
         model = Chat
@@ -53,17 +60,44 @@ class ChatSerializer(serializers.ModelSerializer):
             'course',
             'company',
             'num_messages',
+            'member_count',
             'list_users',
             'last_message_date',
+            'last_message_preview',
         )
 
 
+class ChatImageField(serializers.ImageField):
+    """
+    Ссылка на изображение сообщения: адрес MEDIA_URL строится один раз на запрос,
+    а не через storage.url и build_absolute_uri для каждого сообщения
+    """
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        media_url = self.context.get('chat_media_url')
+        if media_url is None:
+            request = self.context.get('request')
+            media_url = request.build_absolute_uri(settings.MEDIA_URL) if request else settings.MEDIA_URL
+            self.context['chat_media_url'] = media_url
+        return media_url + filepath_to_uri(value.name)
+
+
 class MessageSerializer(serializers.ModelSerializer):
     user = _UserSerializer(read_only=True)
+    image = ChatImageField(
+        required=False,
+        allow_null=True,
+        validators=Message._meta.get_field('image').validators,
+    )
 
     class Meta:
         model = Message
-        fields = '__all__'
+        # search_vector - служебное поле поиска (TrigramSearchFilter)
+        exclude = (
+            'search_vector',
+        )
 
 
 class MassMessageSerializer(serializers.Serializer):
@@ -1,12 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-
-from backend.extra.tasks import new_message
 from backend.users.models import User
-from backend.mess.models import Chat, UserMessage
+from backend.mess.models import Chat, Message
 
 
 @receiver(post_save, sender=Chat)
@@ -31,21 +27,31 @@ def add_users_to_chat(sender, instance, **kwargs):
         instance.users.add(*groups)
 
 
-@receiver(post_save, sender=UserMessage)
-def send_email_notification(sender, instance, created, **kwargs):
+
+@receiver(post_save, sender=Message)
+def count_new_message(sender, instance, created, **kwargs):
     if created:
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)("notifications", {
-            "type": "new_chat_message",
-            "message": f'Новое сообщение от {instance.author}',
-            "message_for": instance.user.pk,
-            "chat_id": instance.message.chat.pk,
-            "author_id": instance.author_id,
-            "author": instance.author,
-            "chat_status": instance.chat_status,
-            "message_text": instance.message_text,
-            "message_id": instance.id
-        })
-
-    if created and instance.user.is_admin and not instance.is_read:
-        new_message.delay(instance.message_id)
+        Chat.message_added(instance)
+
+
+@receiver(post_delete, sender=Message)
+def count_deleted_message(sender, instance, **kwargs):
+    Chat.refresh_message_stats([instance.chat_id])
+
+
+@receiver(m2m_changed, sender=Chat.users.through)
+def count_chat_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Чаты пользователя после очистки уже не узнать
+        instance._cleared_chat_ids = list(instance.user_chats.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        chat_ids = [instance.pk]
+    elif action == 'post_clear':
+        chat_ids = getattr(instance, '_cleared_chat_ids', [])
+    else:
+        chat_ids = list(pk_set or [])
+    Chat.refresh_member_count(chat_ids)
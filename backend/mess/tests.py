@@ -0,0 +1,157 @@
+import datetime
+
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from backend.mess.models import Chat, ChatUnreadCounter, Message, UserMessage
+from backend.mess.utils import create_message
+from backend.users.models import User
+
+
+def create_chat(*users):
+    chat = Chat.objects.create()
+    chat.users.add(*users)
+    return chat
+
+
+class ChatUnreadCounterTest(APITestCase):
+    """
+    Счетчики непрочитанных: +1 получателям при create_message, 0 при прочтении чата
+    """
+
+    def setUp(self):
+        self.author, self.first, self.second = [
+            User.objects.create(username=username) for username in ('author', 'first', 'second')
+        ]
+        self.chat = create_chat(self.author, self.first, self.second)
+        self.other_chat = create_chat(self.author, self.first)
+
+    def unread(self, chat=None):
+        return dict(ChatUnreadCounter.objects.filter(chat=chat or self.chat).values_list('user_id', 'unread'))
+
+    def test_create_message(self):
+        create_message(self.author, self.chat, 'Первое')
+        create_message(self.author, self.chat, 'Второе')
+        self.assertEqual(self.unread(), {self.first.pk: 2, self.second.pk: 2})
+
+        create_message(self.first, self.chat, 'Ответ')
+        self.assertEqual(self.unread(), {self.first.pk: 2, self.second.pk: 3, self.author.pk: 1})
+        self.assertEqual(
+            ChatUnreadCounter.increment(self.chat.pk, [self.author.pk, self.first.pk]),
+            {self.author.pk: 2, self.first.pk: 3},
+        )
+
+    def test_read_chat(self):
+        create_message(self.author, self.chat, 'Сообщение')
+        create_message(self.author, self.other_chat, 'Сообщение')
+        self.client.force_authenticate(self.first)
+
+        response = self.client.get('/api/v1/chats/unread_message/')
+        self.assertEqual(response.data['total_unread_messages'], 2)
+
+        response = self.client.post('/api/v1/chats/message/is_read/', {'chat_id': self.chat.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.unread(), {self.first.pk: 0, self.second.pk: 1})
+        self.assertEqual(self.unread(self.other_chat), {self.first.pk: 1})
+        self.assertFalse(UserMessage.objects.filter(user=self.first, message__chat=self.chat, is_read=False).exists())
+
+        response = self.client.get('/api/v1/chats/unread_message/')
+        self.assertEqual(response.data['total_unread_messages'], 1)
+        self.assertEqual([chat['chat_id'] for chat in response.data['chats']], [self.other_chat.pk])
+
+    def test_read_foreign_chat(self):
+        outsider = User.objects.create(username='outsider')
+        self.client.force_authenticate(outsider)
+        response = self.client.post('/api/v1/chats/message/is_read/', {'chat_id': self.chat.pk})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChatStatsTest(TestCase):
+    """
+    Счетчики и последнее сообщение чата поддерживаются сигналами сообщений и участников
+    """
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.chat = create_chat(self.author)
+
+    def assert_stats(self, message_count, last_message=None):
+        chat = Chat.objects.get(pk=self.chat.pk)
+        self.assertEqual(chat.message_count, message_count)
+        if last_message is None:
+            self.assertEqual((chat.last_message_at, chat.last_message_preview), (chat.created, ''))
+        else:
+            self.assertEqual((chat.last_message_at, chat.last_message_preview), (last_message.created, last_message.mess))
+
+    def test_message_created_and_deleted(self):
+        first = create_message(self.author, self.chat, 'Первое')
+        self.assert_stats(1, first)
+        second = Message.objects.create(user=self.author, chat=self.chat, mess='Второе')
+        self.assert_stats(2, second)
+
+        second.delete()
+        self.assert_stats(1, first)
+        Message.objects.filter(chat=self.chat).delete()
+        self.assert_stats(0)
+
+    def test_older_message_keeps_last(self):
+        last = Message.objects.create(user=self.author, chat=self.chat, mess='Последнее')
+        older = Message(user=self.author, chat=self.chat, mess='Старое')
+        older.created = last.created - datetime.timedelta(minutes=1)
+        Chat.message_added(older)
+        self.assert_stats(2, last)
+
+    def test_long_preview(self):
+        message = Message.objects.create(user=self.author, chat=self.chat, mess='x' * 300)
+        chat = Chat.objects.get(pk=self.chat.pk)
+        self.assertEqual(chat.last_message_preview, message.mess[:255])
+
+        message.delete()
+        Message.objects.create(user=self.author, chat=self.chat, mess='y' * 300)
+        Chat.refresh_message_stats([self.chat.pk])
+        self.assertEqual(Chat.objects.get(pk=self.chat.pk).last_message_preview, 'y' * 255)
+
+    def test_member_count(self):
+        first, second = User.objects.create(username='first'), User.objects.create(username='second')
+        self.chat.users.add(first, second)
+        self.assertEqual(Chat.objects.get(pk=self.chat.pk).member_count, 3)
+
+        self.chat.users.remove(first)
+        self.assertEqual(Chat.objects.get(pk=self.chat.pk).member_count, 2)
+
+        other = create_chat(second)
+        second.user_chats.clear()
+        self.assertEqual(Chat.objects.get(pk=self.chat.pk).member_count, 1)
+        self.assertEqual(Chat.objects.get(pk=other.pk).member_count, 0)
+
+        self.chat.users.clear()
+        self.assertEqual(Chat.objects.get(pk=self.chat.pk).member_count, 0)
+
+
+class ChatListTest(APITestCase):
+    """
+    Список чатов по ключу (last_message_at, id) из полей чата
+    """
+    url = '/api/v1/chats/chat/'
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.client.force_authenticate(self.author)
+        self.chats = [create_chat(self.author) for _ in range(5)]
+        for chat in reversed(self.chats):
+            create_message(self.author, chat, f'Чат {chat.pk}')
+
+    def test_pages(self):
+        ids = []
+        response = self.client.get(self.url, {'limit': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [chat['id'] for chat in response.data['results']]
+            if not response.data['has_more']:
+                break
+            response = self.client.get(self.url, {'limit': 2, 'before': response.data['cursor']})
+        self.assertEqual(ids, [chat.pk for chat in self.chats])
+
+        chat = self.client.get(self.url, {'limit': 1}).data['results'][0]
+        self.assertEqual((chat['num_messages'], chat['member_count']), (1, 1))
+        self.assertEqual(chat['last_message_preview'], f'Чат {self.chats[0].pk}')
@@ -0,0 +1,92 @@
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from backend.extra.tasks import new_message
+from backend.mess.models import ChatUnreadCounter, Message, UserMessage
+from backend.notifications.utils import send_to_user
+from backend.users.models import User
+
+
+def create_message(user, chat, text):
+    """
+    Сообщение в чат и его копии для участников чата (UserMessage) одной вставкой.
+    Уведомления рассылаются после коммита (notify_new_message).
+
+    :return: Message
+    """
+    members = list(chat.users.values_list('id', 'user_status'))
+    admin_ids = {member_id for member_id, user_status in members if user_status == User.STATUS_ADMIN}
+
+    with transaction.atomic():
+        message = Message.objects.create(
+            user=user,
+            chat=chat,
+            mess=text,
+        )
+        user_messages = UserMessage.objects.bulk_create([
+            UserMessage(
+                message_id=message.id,
+                user_id=member_id,
+                # Если пользователь является создателем сообщения, то автоматом сообщение для него прочтено
+                is_read=member_id == user.id,
+                author=user.username,
+                author_id=user.id,
+                chat_status=chat.chat_status,
+                message_text=message.mess,
+            )
+            for member_id, _ in members
+        ])
+        unread = ChatUnreadCounter.increment(chat.id, [member_id for member_id, _ in members if member_id != user.id])
+        transaction.on_commit(lambda: notify_new_message(message, user_messages, admin_ids, unread))
+    return message
+
+
+def notify_new_message(message, user_messages, admin_ids=(), unread=None):
+    """
+    Уведомление получателей о новом сообщении в их группы уведомлений (notifications_user_<id>)
+    и одно письмо администраторам, если среди получателей есть администратор
+    :param user_messages: list, UserMessage сообщения
+    :param admin_ids: set, id администраторов среди участников чата
+    :param unread: dict, {user_id: непрочитанных в чате} - счетчики отправляются вместе с уведомлением
+    """
+    recipients = [
+        user_message for user_message in user_messages
+        if user_message.user_id != user_message.author_id
+    ]
+    if not recipients:
+        return
+
+    unread = unread or {}
+    totals = ChatUnreadCounter.totals(list(unread))
+
+    channel_layer = get_channel_layer()
+    for user_message in recipients:
+        send_to_user(user_message.user_id, {
+            'type': 'new_chat_message',
+            'message': f'Новое сообщение от {user_message.author}',
+            'message_for': user_message.user_id,
+            'chat_id': message.chat_id,
+            'author_id': user_message.author_id,
+            'author': user_message.author,
+            'chat_status': user_message.chat_status,
+            'message_text': user_message.message_text,
+            'message_id': user_message.id,
+            'unread_messages': unread.get(user_message.user_id),
+            'total_unread_messages': totals.get(user_message.user_id),
+        }, channel_layer)
+
+    if any(user_message.user_id in admin_ids and not user_message.is_read for user_message in recipients):
+        new_message.delay(message.id)
+
+
+def notify_unread(user_id, chat_id):
+    """
+    Отправка кол-ва непрочитанных сообщений чата и всего в сокеты уведомлений пользователя
+    """
+    unread = ChatUnreadCounter.objects.filter(user_id=user_id, chat_id=chat_id).values_list('unread', flat=True).first()
+    send_to_user(user_id, {
+        'type': 'unread_messages',
+        'chat_id': chat_id,
+        'unread_messages': unread or 0,
+        'total_unread_messages': ChatUnreadCounter.totals([user_id]).get(user_id) or 0,
+    })
@@ -1,17 +1,23 @@
+import datetime
+from collections import OrderedDict
+
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, F, Sum
+from django.db.models import F, Q
 from django.http import Http404
 from django.views.generic import TemplateView, DetailView
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, status
+from rest_framework import status
 from rest_framework import generics
 from rest_framework import permissions
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from backend.api_v1.filters import TrigramSearchFilter
 from backend.api_v1.permissions import IsAdministrator, IsModerator
-from .models import Chat, Message, FirebaseSettings
+from .models import Chat, ChatUnreadCounter, Message, FirebaseSettings
 from .serializers import (
     ChatSerializer,
     MessageSerializer,
@@ -21,18 +27,87 @@ from .serializers import (
 )
 
 
+class KeysetPagination(BasePagination):
+    """
+    Постраничная выдача по ключу, без OFFSET: {has_more, cursor, results}
+    cursor - ключ последней записи страницы для следующего запроса
+    """
+    default_limit = 50
+    max_limit = 200
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('has_more', self.has_more),
+            ('cursor', self.get_cursor(self.page[-1]) if self.page else None),
+            ('results', data),
+        ]))
+
+    def get_page(self, queryset):
+        page = list(queryset[:self.limit + 1])
+        self.has_more = len(page) > self.limit
+        self.page = page[:self.limit]
+        return self.page
+
+    def get_cursor(self, obj):
+        raise NotImplementedError('get_cursor() must be implemented.')
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return self.default_limit
+        return min(max(limit, 1), self.max_limit)
+
+
+class ChatKeysetPagination(KeysetPagination):
+    """
+    Список чатов по ключу (last_message_at, id), от новых к старым
+        ?before=<cursor> - чаты после указанного ключа (cursor из предыдущего ответа)
+        ?limit=50
+    Ключ передается значениями, а не id чата: чат, в который пришло сообщение, поднимается наверх
+    (о нем сообщает сокет) и не повторяется на следующих страницах
+    """
+    max_limit = 500
+    epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        before = request.query_params.get('before')
+
+        if before:
+            last_message_at, pk = self.parse_cursor(before)
+            queryset = queryset.filter(
+                Q(last_message_at__lt=last_message_at) | Q(last_message_at=last_message_at, id__lt=pk)
+            )
+        return self.get_page(queryset.order_by('-last_message_at', '-id'))
+
+    def get_cursor(self, obj):
+        # Микросекунды от эпохи - без символов, которые нужно экранировать в адресе
+        return f'{(obj.last_message_at - self.epoch) // datetime.timedelta(microseconds=1)}_{obj.id}'
+
+    def parse_cursor(self, cursor):
+        try:
+            microseconds, pk = (int(value) for value in cursor.split('_'))
+        except ValueError:
+            raise NotFound(f'Invalid cursor: {cursor}')
+        return self.epoch + datetime.timedelta(microseconds=microseconds), pk
+
+
 class ChatViewSet(generics.ListCreateAPIView):
     """
     Чаты
+    Последнее сообщение и счетчики хранятся в Chat, таблица сообщений не читается
     """
     serializer_class = ChatSerializer
+    pagination_class = ChatKeysetPagination
     permission_classes = (permissions.IsAuthenticated,)
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter,)
+    # Порядок задает ключ пагинации: last_message_at и счетчики меняются, курсор по ним с ?ordering= пропускал
+    # и повторял чаты между страницами
+    filter_backends = (DjangoFilterBackend,)
     filterset_fields = ('id', 'chat_status', 'users', 'course', 'company', 'created')
-    ordering_fields = '__all__'
 
     def get_queryset(self):
-        return Chat.objects.with_prefetch_related().with_annotations()
+        return Chat.objects.with_prefetch_related()
 
 
 class ChatDeleteView(generics.DestroyAPIView):
@@ -43,16 +118,64 @@ class ChatDeleteView(generics.DestroyAPIView):
     permission_classes = (permissions.IsAuthenticated, IsModerator)
 
 
+class MessageKeysetPagination(KeysetPagination):
+    """
+    История чата по ключу (created, id), без OFFSET
+        ?before=<id сообщения> - сообщения старше указанного, от новых к старым (по умолчанию - последние)
+        ?after=<id сообщения> - сообщения новее указанного, от старых к новым (догрузка после переподключения
+        сокета, id последнего сообщения приходит в сокет как cursor)
+        ?limit=50
+    В ответе cursor - id последнего сообщения страницы для следующего запроса с тем же параметром
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        before = request.query_params.get('before')
+        after = request.query_params.get('after')
+
+        if after:
+            created, pk = self.get_anchor(after)
+            queryset = queryset.filter(
+                Q(created__gt=created) | Q(created=created, id__gt=pk)
+            ).order_by('created', 'id')
+        else:
+            if before:
+                created, pk = self.get_anchor(before)
+                queryset = queryset.filter(Q(created__lt=created) | Q(created=created, id__lt=pk))
+            queryset = queryset.order_by('-created', '-id')
+
+        return self.get_page(queryset)
+
+    def get_cursor(self, obj):
+        return obj.id
+
+    @staticmethod
+    def get_anchor(message_id):
+        """
+        Ключ (created, id) сообщения, от которого отсчитывается страница
+        """
+        try:
+            anchor = Message.objects.filter(pk=int(message_id)).values_list('created', 'id').first()
+        except ValueError:
+            anchor = None
+        if anchor is None:
+            raise NotFound(f'Message ID:{message_id} not found')
+        return anchor
+
+
 class MessageViewSet(generics.ListCreateAPIView):
     """
-    Сообщения чатов
+    Сообщения чатов, постранично (MessageKeysetPagination)
     """
     queryset = Message.objects.select_related('user')
+    pagination_class = MessageKeysetPagination
     serializer_class = MessageSerializer
     permission_classes = (permissions.IsAuthenticated,)
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter,)
+    # Порядок задает ключ пагинации
+    filter_backends = (DjangoFilterBackend, TrigramSearchFilter)
     filterset_fields = ('id', 'chat', 'user', 'created')
-    ordering_fields = '__all__'
+    search_fields = ['mess']
+    search_ranking = False
 
 
 class EmptyChatView(LoginRequiredMixin, TemplateView):
@@ -160,18 +283,18 @@ class GetUnreadMessageCountView(APIView):
             total_unread_messages: XX
         }
         """
-        chats = Chat.objects.filter(
-            messages__user_messages__user=request.user,
-            messages__user_messages__is_read=False,
-        ).annotate(
-            chat_id=F('id'),
-            chat_type=F('chat_status'),
-            unread_messages=Count('messages__user_messages'),
-        ).order_by('id').values('chat_id', 'chat_type', 'unread_messages')
-        res = chats.aggregate(total_unread_messages=Sum('unread_messages'))
-        res.update({
-            'chats': list(chats)
-        })
+        chats = list(ChatUnreadCounter.objects.filter(
+            user=request.user,
+            unread__gt=0,
+        ).order_by('chat_id').values(
+            'chat_id',
+            chat_type=F('chat__chat_status'),
+            unread_messages=F('unread'),
+        ))
+        res = {
+            'total_unread_messages': sum(chat['unread_messages'] for chat in chats) if chats else None,
+            'chats': chats,
+        }
         return Response(res, status=status.HTTP_200_OK)
 
 
@@ -2,8 +2,12 @@ import json
 from asgiref.sync import async_to_sync
 from channels.generic.websocket import JsonWebsocketConsumer
 
+from backend.notifications.utils import user_group
+
+
 class NotificationConsumer(JsonWebsocketConsumer):
-    room_group_name = 'notifications'
+    # Группа своя у каждого пользователя (notifications_user_<id>), события приходят только получателю
+    room_group_name = None
     user_id = None
 
     def __init__(self, *args, **kwargs):
@@ -12,6 +16,7 @@ class NotificationConsumer(JsonWebsocketConsumer):
         self.user = None
         user_data = self.scope['url_route']['kwargs']
         self.user_id = user_data.get('user_id')
+        self.room_group_name = user_group(self.user_id)
 
         # TODO: сделать проверку по токену
 
@@ -46,9 +51,9 @@ class NotificationConsumer(JsonWebsocketConsumer):
         author = hasattr(text_data_json, 'author') and text_data_json.author
         message_id = hasattr(text_data_json, 'message_id') and text_data_json.message_id
 
-        # Send message to room group
+        # Send message to recipient group
         async_to_sync(self.channel_layer.group_send)(
-            self.room_group_name,
+            user_group(message_for),
             {
                 'type': 'new_chat_message',
                 'message': message,
@@ -84,4 +89,19 @@ class NotificationConsumer(JsonWebsocketConsumer):
             'chat_status': chat_status,
             'message_text': message_text,
             'author': author,
+            'unread_messages': event.get('unread_messages'),
+            'total_unread_messages': event.get('total_unread_messages'),
         }))
+
+    # Кол-во непрочитанных сообщений после прочтения чата (backend.mess.utils.notify_unread)
+    def unread_messages(self, event):
+        self.send(text_data=json.dumps({
+            key: value for key, value in event.items() if key != 'type'
+        }))
+
+    # Прогресс фонового импорта (backend.extra.tasks.run_import_job)
+    def import_job_progress(self, event):
+        if event['message_for'] == self.user_id:
+            self.send(text_data=json.dumps({
+                key: value for key, value in event.items() if key != 'type'
+            }))
@@ -0,0 +1,68 @@
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand
+
+from backend.notifications.utils import user_group
+
+# Старая схема: все сокеты уведомлений в одной группе
+BROADCAST_GROUP = 'notifications_bench'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark publish cost of one notification against the number of connected sockets: '
+        'per-user groups (notifications_user_<id>) vs a single broadcast group'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sockets', default='10,100,1000', help='Comma separated socket counts')
+        parser.add_argument('--messages', type=int, default=100, help='Notifications per measurement')
+
+    def handle(self, *args, **kwargs):
+        channel_layer = get_channel_layer()
+        counts = [int(count) for count in kwargs['sockets'].split(',') if count.strip()]
+
+        self.stdout.write(f'{"sockets":>8} {"per-user, ms":>14} {"broadcast, ms":>14}')
+        for count in counts:
+            per_user, broadcast = async_to_sync(self.measure)(channel_layer, count, kwargs['messages'])
+            self.stdout.write(f'{count:>8} {per_user:>14.3f} {broadcast:>14.3f}')
+
+        self.stdout.write(self.style.WARNING('Time is per published notification.'))
+
+    @staticmethod
+    async def measure(channel_layer, count, messages):
+        """
+        Подключение count сокетов (каналов) и замер group_send одному пользователю в обеих схемах
+        :return: tuple, (мс на уведомление в группу пользователя, мс на уведомление в общую группу)
+        """
+        # id пользователей бенчмарка не пересекаются с настоящими
+        user_ids = [-(index + 1) for index in range(count)]
+        channels = [await channel_layer.new_channel() for _ in user_ids]
+        for user_id, channel in zip(user_ids, channels):
+            await channel_layer.group_add(user_group(user_id), channel)
+            await channel_layer.group_add(BROADCAST_GROUP, channel)
+
+        event = {
+            'type': 'new_chat_message',
+            'message_for': user_ids[0],
+            'message_text': 'bench',
+        }
+        try:
+            start = time.perf_counter()
+            for _ in range(messages):
+                await channel_layer.group_send(user_group(user_ids[0]), event)
+            per_user = (time.perf_counter() - start) * 1000 / messages
+
+            start = time.perf_counter()
+            for _ in range(messages):
+                await channel_layer.group_send(BROADCAST_GROUP, event)
+            broadcast = (time.perf_counter() - start) * 1000 / messages
+        finally:
+            # Неполученные события каналов бенчмарка истекают сами (expiry слоя каналов)
+            for user_id, channel in zip(user_ids, channels):
+                await channel_layer.group_discard(user_group(user_id), channel)
+                await channel_layer.group_discard(BROADCAST_GROUP, channel)
+
+        return per_user, broadcast
@@ -0,0 +1,17 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+def user_group(user_id):
+    """
+    Группа сокетов уведомлений одного пользователя
+    """
+    return f'notifications_user_{user_id}'
+
+
+def send_to_user(user_id, event, channel_layer=None):
+    """
+    Отправка события в сокеты уведомлений пользователя (NotificationConsumer)
+    """
+    channel_layer = channel_layer or get_channel_layer()
+    async_to_sync(channel_layer.group_send)(user_group(user_id), event)
@@ -24,6 +24,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
 
     'backend.courses.apps.CoursesConfig',
     'backend.mess.apps.MessagesConfig',
@@ -187,12 +188,41 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
 }
 
+# Сколько секунд кэшируется сводка прогресса компании для куратора (backend.courses.progress.company_rollup)
+COMPANY_PROGRESS_CACHE_TIMEOUT = 300
+
+# Конфигурация полнотекстового поиска PostgreSQL (search_vector пользователей, материалов, вопросов, сообщений)
+SEARCH_CONFIG = 'russian'
+
+# Как часто (сек.) буфер последней активности пользователей записывается в User.last_active
+LAST_ACTIVE_FLUSH_INTERVAL = 5
+
+# Как часто (сек.) буфер активности из сокета пишется в UserActivity
+USER_ACTIVITY_FLUSH_INTERVAL = 5
+
+# Сколько месяцев хранить секции таблицы активности (UserActivity)
+USER_ACTIVITY_RETENTION_MONTHS = 6
+# Промежуток между событиями активности дольше этого (сек.) считается перерывом
+USER_ACTIVITY_IDLE_TIMEOUT = 300
+# Как часто (сек.) активность сворачивается в UserDayActivity и с каким отставанием от текущего времени
+USER_ACTIVITY_AGGREGATE_INTERVAL = 60
+USER_ACTIVITY_AGGREGATE_LAG = 30
+
+# Кол-во процессов для хеширования паролей при массовом создании пользователей (None - по числу ядер)
+PASSWORD_HASH_WORKERS = None
+
 CELERY_BROKER_URL = "redis://redis:6379/1"
 CELERY_RESULT_BACKEND = 'redis://redis:6379/2'
 CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Europe/Moscow'
+
+# Автозакрытие просроченных попыток тестирования периодическим пакетным обходом
+# вместо отдельной отложенной задачи на каждую попытку
+PASSING_SWEEPER = True
+PASSING_SWEEP_INTERVAL = 30  # секунды
+
 CELERY_BEAT_SCHEDULE = {
     'check_clients': {
         'task': 'backend.users.tasks.check_clients',
@@ -210,6 +240,18 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'backend.extra.tasks.clean_companies',
         'schedule': crontab(minute=59, hour=23),
     },
+    'maintain_activity_partitions': {
+        'task': 'backend.users.tasks.maintain_activity_partitions',
+        'schedule': crontab(minute=10, hour=0),
+    },
+    'aggregate_user_activity': {
+        'task': 'backend.users.tasks.aggregate_user_activity',
+        'schedule': USER_ACTIVITY_AGGREGATE_INTERVAL,
+    },
+    'close_expired_attempts': {
+        'task': 'backend.courses.tasks.close_expired_attempts',
+        'schedule': PASSING_SWEEP_INTERVAL,
+    },
 }
 
 DJANGO_DEVELOPMENT=False
@@ -0,0 +1,163 @@
+from collections import defaultdict, namedtuple
+
+from django.db.models import Count
+
+from backend.courses.models import Answer, Passing, Question, TaskScoring, TaskVariantAssignment, UserCourseProgress
+from backend.testing.models import UserAnswer
+
+
+class GradedAnswer(namedtuple('GradedAnswer', [
+    'user_answer_id',
+    'question_id',
+    'score',
+    'is_free_answer',
+    'user_points',
+    'answer_id',
+    'chosen',
+    'correct',
+])):
+    """
+    Ответ пользователя, подготовленный для проверки в памяти
+    """
+
+    @property
+    def points(self):
+        """
+        Баллы за ответ, правила те же, что и в UserAnswer.get_user_points
+        """
+        if self.is_free_answer:
+            return self.user_points or 0
+        if self.chosen == self.correct:
+            return self.score
+        return 0
+
+    @property
+    def is_pending(self):
+        """
+        Ответ в свободной форме, еще не оцененный модератором
+        """
+        return self.is_free_answer and self.answer_id is None and self.user_points is None
+
+
+def load_graded_answers(passing_ids):
+    """
+    Загрузка всех ответов для прохождений фиксированным числом запросов:
+    ответы, вопросы, снимки правильных ответов заданий (TaskScoring) и выбранные ответы.
+    Одиночный выбранный ответ (UserAnswer.answer) переносится в UserAnswer.answers одной вставкой.
+
+    :return: dict, {passing_id: [GradedAnswer, ...]}
+    """
+    rows = list(UserAnswer.objects.filter(
+        passing_id__in=passing_ids,
+    ).order_by().values_list('id', 'passing_id', 'passing__task_id', 'question_id', 'answer_id', 'user_points'))
+    if not rows:
+        return {}
+
+    question_ids = {row[3] for row in rows}
+    questions = {
+        pk: (score, is_free_answer)
+        for pk, score, is_free_answer in Question.objects.filter(
+            pk__in=question_ids,
+        ).values_list('id', 'score', 'is_free_answer')
+    }
+
+    task_ids = {row[2] for row in rows}
+    scorings = {scoring.task_id: scoring for scoring in TaskScoring.objects.filter(task_id__in=task_ids)}
+    if len(scorings) < len(task_ids):
+        for scoring in TaskScoring.refresh_for_tasks(task_ids - scorings.keys()):
+            scorings[scoring.task_id] = scoring
+
+    correct = {}
+    for _, _, task_id, question_id, _, _ in rows:
+        correct[task_id, question_id] = scorings[task_id].correct_answers(question_id)
+
+    # Вопрос убрали из задания после ответа - правильные ответы берем из базы
+    detached = {question_id for (_, question_id), answers in correct.items() if answers is None}
+    if detached:
+        detached_correct = defaultdict(set)
+        for question_id, answer_id in Answer.objects.filter(
+            question_id__in=detached,
+            is_true=True,
+        ).order_by().values_list('question_id', 'id'):
+            detached_correct[question_id].add(answer_id)
+        for task_id, question_id in correct:
+            if correct[task_id, question_id] is None:
+                correct[task_id, question_id] = frozenset(detached_correct[question_id])
+
+    through = UserAnswer.answers.through
+    chosen = defaultdict(set)
+    for user_answer_id, answer_id in through.objects.filter(
+        useranswer_id__in=[row[0] for row in rows],
+    ).values_list('useranswer_id', 'answer_id'):
+        chosen[user_answer_id].add(answer_id)
+
+    missing = []
+    for user_answer_id, _, _, question_id, answer_id, _ in rows:
+        _, is_free_answer = questions[question_id]
+        if answer_id and not is_free_answer and answer_id not in chosen[user_answer_id]:
+            chosen[user_answer_id].add(answer_id)
+            missing.append(through(useranswer_id=user_answer_id, answer_id=answer_id))
+    if missing:
+        through.objects.bulk_create(missing, ignore_conflicts=True)
+
+    result = defaultdict(list)
+    for user_answer_id, passing_id, task_id, question_id, answer_id, user_points in rows:
+        score, is_free_answer = questions[question_id]
+        result[passing_id].append(GradedAnswer(
+            user_answer_id=user_answer_id,
+            question_id=question_id,
+            score=score,
+            is_free_answer=is_free_answer,
+            user_points=user_points,
+            answer_id=answer_id,
+            chosen=frozenset(chosen[user_answer_id]),
+            correct=correct[task_id, question_id],
+        ))
+    return result
+
+
+def grade_passings(passing_ids):
+    """
+    Баллы за прохождения тестов
+
+    :return: dict, {passing_id: сумма баллов за ответы}
+    """
+    graded = load_graded_answers(passing_ids)
+    return {
+        passing_id: sum(answer.points for answer in graded.get(passing_id, ()))
+        for passing_id in passing_ids
+    }
+
+
+def finish_passings(passings):
+    """
+    Пакетное закрытие прохождений: проверка ответов и статусы рассчитываются для всей пачки сразу,
+    результат записывается одним bulk UPDATE.
+    У каждого прохождения уже должен быть выставлен finish_time.
+
+    :param passings: list, прохождения с подгруженным task
+    :return: list, закрытые прохождения
+    """
+    if not passings:
+        return []
+
+    graded = load_graded_answers([passing.pk for passing in passings])
+    attempts = {
+        (task_id, user_id): count
+        for task_id, user_id, count in Passing.objects.filter(
+            task_id__in={passing.task_id for passing in passings},
+            user_id__in={passing.user_id for passing in passings},
+        ).order_by().values('task_id', 'user_id').annotate(
+            count=Count('pk'),
+        ).values_list('task_id', 'user_id', 'count')
+    }
+
+    for passing in passings:
+        passing.apply_grading(
+            graded.get(passing.pk, []),
+            attempts.get((passing.task_id, passing.user_id), 0),
+        )
+    Passing.objects.bulk_update(passings, ['finish_time', 'success_passed', 'user_points'])
+    TaskVariantAssignment.refresh_for_passings(passings)
+    UserCourseProgress.refresh_for_passings(passings)
+    return passings
@@ -1,11 +1,21 @@
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils.functional import cached_property
 
 from backend.courses.models import Question, Answer, Course, Task, Passing
 from backend.helpers import BaseModel
 from backend.users.models import User
 
 
+class UserAnswerQuerySet(models.QuerySet):
+
+    def with_scoring(self):
+        """
+        Вопрос, снимок баллов задания и выбранные ответы - get_user_points и correct_answer без запросов на строку
+        """
+        return self.select_related('question', 'passing__task__scoring').prefetch_related('answers')
+
+
 class UserAnswer(BaseModel):
     """
     Ответ пользователя на вопрос из теста
@@ -44,6 +54,8 @@ class UserAnswer(BaseModel):
         null=True,
     )
 
+    objects = UserAnswerQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Ответ'
         verbose_name_plural = 'Ответы'
@@ -57,22 +69,20 @@ class UserAnswer(BaseModel):
         """
         Получение баллов за ответ
             - если ответ в свободной форме, то получать self.user_points
-            - если ответ не в сободной форме, то сравнивать выбранные ответы
+            - если ответ не в сободной форме, то сравнивать выбранные ответы (answers и answer)
             со списком правильных ответов, баллы начисляются только при полном совпадении списков
+        Правила те же, что и в backend.testing.grading.GradedAnswer.points
         :return: int, баллы за ответ
         """
-        user_points = 0
         if self.question.is_free_answer:
-            user_points = self.user_points or 0
-        else:
-            if self.answer:
-                self.answers.add(self.answer)
-            correct_answers = list(self.question.correct_answer)
-            user_answers = list(self.answers.values_list('id', flat=True))
-            if correct_answers == user_answers:
-                user_points = self.question.score
+            return self.user_points or 0
 
-        return user_points
+        chosen = {answer.pk for answer in self.answers.all()}
+        if self.answer_id:
+            chosen.add(self.answer_id)
+        if chosen == set(self.correct_answer):
+            return self.question.score
+        return 0
 
     @property
     def max_points(self):
@@ -82,9 +92,12 @@ class UserAnswer(BaseModel):
     def variants(self):
         return self.question.variants
 
-    @property
+    @cached_property
     def correct_answer(self):
-        return self.question.correct_answer
+        """
+        Правильные ответы из снимка задания прохождения (TaskScoring)
+        """
+        return self.question.get_correct_answers(self.passing.task.scoring_snapshot)
 
 
 class Attempts(BaseModel):
@@ -0,0 +1,212 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from backend.courses.models import Answer, Course, Material, Passing, Question, Task
+from backend.testing.grading import GradedAnswer, finish_passings, grade_passings
+from backend.testing.models import UserAnswer
+from backend.users.models import User
+
+
+def create_question(task, correct=1, wrong=1, **kwargs):
+    """
+    :return: (Question, list правильных Answer, list неправильных Answer)
+    """
+    question = Question.objects.create(text='Вопрос', **kwargs)
+    question.tasks.add(task)
+    true = [Answer.objects.create(question=question, is_true=True, text='Да') for _ in range(correct)]
+    false = [Answer.objects.create(question=question, is_true=False, text='Нет') for _ in range(wrong)]
+    return question, true, false
+
+
+def create_user_answer(passing, question, answer=None, answers=(), **kwargs):
+    """
+    Ответ без сигнала post_save: проверка прохождения запускается в тестах явно
+    """
+    user_answer, = UserAnswer.objects.bulk_create([
+        UserAnswer(passing=passing, question=question, answer=answer, **kwargs),
+    ])
+    user_answer.answers.set(answers)
+    return user_answer
+
+
+def graded(score=1, chosen=(), correct=(), is_free_answer=False, user_points=None):
+    return GradedAnswer(
+        user_answer_id=None,
+        question_id=None,
+        score=score,
+        is_free_answer=is_free_answer,
+        user_points=user_points,
+        answer_id=None,
+        chosen=frozenset(chosen),
+        correct=frozenset(correct),
+    )
+
+
+class GradingTest(TestCase):
+    """
+    Пакетная проверка ответов (backend.testing.grading) и расчет статуса прохождения
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='client')
+        course = Course.objects.create(title='Курс')
+        material = Material.objects.create(course=course, title='Материал')
+        self.task = Task.objects.create(
+            material=material,
+            title='Тест',
+            travel_time=datetime.time(hour=1),
+            passing=50,
+            attempts=3,
+        )
+        self.multi, self.multi_true, self.multi_false = create_question(self.task, correct=2, score=2)
+        self.single, self.single_true, self.single_false = create_question(self.task)
+        self.free, _, _ = create_question(self.task, correct=0, wrong=0, is_free_answer=True, score=3)
+
+    def create_passing(self, **kwargs):
+        return Passing.objects.create(task=self.task, user=self.user, **kwargs)
+
+    def test_grade_passings(self):
+        t0, t1 = self.multi_true
+        f0, = self.multi_false
+        s_true, = self.single_true
+        s_false, = self.single_false
+
+        passings = {}
+        # Все правильные варианты, одиночный answer, оцененный свободный ответ
+        passings[6] = self.create_passing()
+        create_user_answer(passings[6], self.multi, answers=[t0, t1])
+        create_user_answer(passings[6], self.single, answer=s_true)
+        create_user_answer(passings[6], self.free, user_points=3)
+        # Пропущен правильный вариант, неверный answer, свободный ответ не оценен
+        passings[0] = self.create_passing()
+        create_user_answer(passings[0], self.multi, answers=[t0])
+        create_user_answer(passings[0], self.single, answer=s_false)
+        create_user_answer(passings[0], self.free)
+        # Лишний неверный вариант, правильный ответ только в answers
+        passings[2] = self.create_passing()
+        create_user_answer(passings[2], self.multi, answers=[t0, t1, f0])
+        create_user_answer(passings[2], self.single, answers=[s_true])
+        create_user_answer(passings[2], self.free, user_points=1)
+        # answer и answers вместе дают все правильные варианты; answer верный, но в answers неверный
+        passings[3] = self.create_passing()
+        create_user_answer(passings[3], self.multi, answer=t0, answers=[t1])
+        create_user_answer(passings[3], self.single, answer=s_true, answers=[s_false])
+        create_user_answer(passings[3], self.free, user_points=1)
+
+        # Прежний путь: UserAnswer.get_user_points по каждому ответу
+        old = {
+            passing.pk: sum(answer.get_user_points() for answer in passing.user_answers.with_scoring())
+            for passing in passings.values()
+        }
+        points = grade_passings([passing.pk for passing in passings.values()])
+        self.assertEqual(points, {passing.pk: expected for expected, passing in passings.items()})
+        self.assertEqual(points, old)
+
+        # Одиночный answer перенесен в answers
+        user_answer = UserAnswer.objects.get(passing=passings[6], question=self.single)
+        self.assertEqual(list(user_answer.answers.all()), [s_true])
+
+    def test_grade_passings_num_queries(self):
+        one = self.create_passing()
+        create_user_answer(one, self.single, answers=self.single_true)
+        many = [self.create_passing() for _ in range(3)]
+        for passing in many:
+            create_user_answer(passing, self.multi, answers=self.multi_true)
+            create_user_answer(passing, self.single, answers=self.single_true)
+            create_user_answer(passing, self.free, user_points=2)
+
+        with CaptureQueriesContext(connection) as small:
+            grade_passings([one.pk])
+        with CaptureQueriesContext(connection) as large:
+            grade_passings([passing.pk for passing in many])
+        self.assertEqual(len(small), len(large))
+
+    def test_pending_free_answer(self):
+        self.assertTrue(graded(is_free_answer=True).is_pending)
+        self.assertFalse(graded(is_free_answer=True, user_points=0).is_pending)
+        self.assertEqual(graded(score=3, is_free_answer=True).points, 0)
+        self.assertEqual(graded(score=3, is_free_answer=True, user_points=2).points, 2)
+        self.assertEqual(graded(score=2, chosen=[1, 2], correct=[1, 2]).points, 2)
+        self.assertEqual(graded(score=2, chosen=[1], correct=[1, 2]).points, 0)
+
+    def test_apply_grading(self):
+        correct = graded(score=2, chosen=[1], correct=[1])
+        wrong = graded(score=2, chosen=[2], correct=[1])
+        pending = graded(score=2, is_free_answer=True)
+
+        passing = self.create_passing()
+        passing.finish_time = passing.start_time + datetime.timedelta(hours=2)
+        self.assertFalse(passing.apply_grading([correct], attempts=1))
+        self.assertEqual(passing.success_passed, Passing.LIMIT)
+
+        passing = self.create_passing(is_trial=True)
+        passing.finish_time = passing.start_time
+        self.assertFalse(passing.apply_grading([correct, wrong], attempts=1))
+        self.assertEqual((passing.success_passed, passing.user_points), (Passing.NOT_FINISHED, 2))
+
+        passing = self.create_passing()
+        passing.finish_time = passing.start_time
+        self.assertFalse(passing.apply_grading([correct], attempts=4))
+        self.assertEqual(passing.success_passed, Passing.ATTEMPTS)
+
+        self.assertFalse(passing.apply_grading([correct, pending], attempts=1))
+        self.assertEqual(passing.success_passed, Passing.ON_CHECK)
+
+        passing.max_points = 6
+        self.assertFalse(passing.apply_grading([correct, wrong, wrong], attempts=1))
+        self.assertEqual((passing.success_passed, passing.user_points), (Passing.SCORE, 2))
+
+        self.assertFalse(passing.apply_grading([wrong, wrong, wrong], attempts=1))
+        self.assertEqual((passing.success_passed, passing.user_points), (Passing.SCORE, 0))
+
+        self.assertTrue(passing.apply_grading([correct, correct, wrong], attempts=1))
+        self.assertEqual((passing.success_passed, passing.user_points), (Passing.PASSED, 4))
+
+    def test_check_passing(self):
+        passing = self.create_passing()
+        create_user_answer(passing, self.multi, answers=self.multi_true)
+        create_user_answer(passing, self.single, answer=self.single_true[0])
+        create_user_answer(passing, self.free, user_points=0)
+        self.assertTrue(passing.check_passing())
+
+        passing.refresh_from_db()
+        self.assertIsNotNone(passing.finish_time)
+        self.assertEqual((passing.success_passed, passing.user_points), (Passing.PASSED, 3))
+
+        passing = self.create_passing()
+        create_user_answer(passing, self.free)
+        self.assertFalse(passing.check_passing())
+        passing.refresh_from_db()
+        self.assertEqual(passing.success_passed, Passing.ON_CHECK)
+
+    def test_finish_passings(self):
+        passings = [self.create_passing() for _ in range(3)]
+        create_user_answer(passings[0], self.multi, answers=self.multi_true)
+        create_user_answer(passings[0], self.single, answers=self.single_true)
+        create_user_answer(passings[1], self.multi, answers=self.multi_false)
+        create_user_answer(passings[2], self.free)
+
+        passings = list(Passing.objects.filter(
+            pk__in=[passing.pk for passing in passings],
+        ).select_related('task').order_by('pk'))
+        for passing in passings:
+            passing.finish_time = passing.start_time
+        with CaptureQueriesContext(connection) as queries:
+            finish_passings(passings)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "courses_passing"')]
+        self.assertEqual(len(updates), 1)
+
+        statuses = dict(Passing.objects.filter(pk__in=[passing.pk for passing in passings]).values_list(
+            'pk', 'success_passed',
+        ))
+        self.assertEqual(
+            [statuses[passing.pk] for passing in passings],
+            [Passing.PASSED, Passing.SCORE, Passing.ON_CHECK],
+        )
+        self.assertEqual(
+            dict(Passing.objects.filter(pk=passings[0].pk).values_list('pk', 'user_points')),
+            {passings[0].pk: 3},
+        )
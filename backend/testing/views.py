@@ -44,7 +44,7 @@ class ModeratorUserAnswerViewSet(ModelViewSet):
                 Q(passing__task__material__course__author=self.request.user.pk) |
                 Q(passing__task__material__course__moderators=self.request.user.pk)
             )
-        return qs
+        return qs.with_scoring()
 
 
 class ModeratorUserAnswerDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -64,7 +64,7 @@ class ModeratorUserAnswerDetail(generics.RetrieveUpdateDestroyAPIView):
                 Q(passing__task__material__course__author=self.request.user.pk) |
                 Q(passing__task__material__course__moderators=self.request.user.pk)
             )
-        return qs
+        return qs.with_scoring()
 
 
 class UserAnswerClientListCreate(generics.ListCreateAPIView):
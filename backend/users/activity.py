@@ -0,0 +1,205 @@
+import asyncio
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from backend.users.models import User, UserActivity
+
+logger = logging.getLogger(__name__)
+
+# Буфер последней активности процесса: {user_id: datetime}
+_buffer = {}
+_lock = threading.Lock()
+_flusher_pid = None
+
+# Буфер активности из сокета (UserActivityConsumer): [(user_id, is_client, course_id, content, time), ...]
+_heartbeats = []
+_heartbeat_task = None
+_presence_changed = False
+
+
+def touch(user_id, moment=None):
+    """
+    Отметка активности пользователя
+    Время попадает в буфер процесса и записывается в User.last_active пакетно (flush) раз в
+    settings.LAST_ACTIVE_FLUSH_INTERVAL секунд
+    """
+    moment = moment or timezone.now()
+    with _lock:
+        previous = _buffer.get(user_id)
+        if previous is None or previous < moment:
+            _buffer[user_id] = moment
+    _ensure_flusher()
+
+
+def buffered_since(moment):
+    """
+    id пользователей из буфера процесса, активных начиная с moment
+    """
+    with _lock:
+        return [user_id for user_id, last_active in _buffer.items() if last_active >= moment]
+
+
+def flush():
+    """
+    Запись буфера в User.last_active одним UPDATE ... FROM (VALUES ...)
+    Более позднее время в базе не перезаписывается, при ошибке записи буфер восстанавливается
+    :return: int, кол-во записанных пользователей
+    """
+    global _buffer
+    with _lock:
+        pending, _buffer = _buffer, {}
+    if not pending:
+        return 0
+
+    table = User._meta.db_table
+    values = ', '.join(['(%s, %s::timestamptz)'] * len(pending))
+    params = [value for item in pending.items() for value in item]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET last_active = v.last_active '
+                f'FROM (VALUES {values}) AS v (id, last_active) '
+                f'WHERE {table}.id = v.id '
+                f'AND ({table}.last_active IS NULL OR {table}.last_active < v.last_active)',
+                params,
+            )
+    except Exception:
+        # Не записанное возвращается в буфер (к новой активности), запись - при следующем flush
+        with _lock:
+            for user_id, moment in pending.items():
+                previous = _buffer.get(user_id)
+                if previous is None or previous < moment:
+                    _buffer[user_id] = moment
+        raise
+    return len(pending)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(settings.LAST_ACTIVE_FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            # Соединение могло быть разорвано - буфер остается в памяти до следующей попытки
+            logger.exception('Ошибка записи последней активности пользователей')
+        finally:
+            close_old_connections()
+
+
+def _ensure_flusher():
+    """
+    Фоновый поток записи буфера, один на процесс (после fork воркера запускается заново)
+    """
+    global _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _lock:
+        if _flusher_pid == pid:
+            return
+        _flusher_pid = pid
+    threading.Thread(target=_flush_loop, name='last-active-flusher', daemon=True).start()
+
+
+def queue_heartbeat(user, content):
+    """
+    Активность из сокета в буфер процесса, запись - flush_heartbeats по таймеру
+    """
+    try:
+        course_id = int(content.get('course'))
+    except (TypeError, ValueError):
+        course_id = None
+    _heartbeats.append((user.pk, user.is_client, course_id, content, time.time()))
+
+
+def presence_changed():
+    """
+    Подключение/отключение сокета - при следующей записи буфера разослать кол-во онлайн
+    """
+    global _presence_changed
+    _presence_changed = True
+
+
+def take_heartbeats():
+    """
+    Забрать накопленную активность из буфера (в цикле событий, где буфер пополняется)
+    :return: tuple, (события, было ли подключение/отключение сокетов)
+    """
+    global _heartbeats, _presence_changed
+    pending, _heartbeats = _heartbeats, []
+    changed, _presence_changed = _presence_changed, False
+    return pending, changed
+
+
+def flush_heartbeats(pending, changed=False):
+    """
+    Запись активности: UserActivity одной вставкой, индекс онлайн одним ZADD,
+    одна рассылка кол-ва онлайн администраторам
+    :return: int, кол-во записанных событий
+    """
+    from backend.users import presence
+
+    if pending:
+        insert_heartbeats(pending)
+        presence.mark_online_many({
+            user_id: moment for user_id, is_client, _, _, moment in pending if is_client
+        })
+    if pending or changed:
+        presence.notify_online_users()
+    return len(pending)
+
+
+def insert_heartbeats(pending):
+    """
+    UserActivity одним INSERT, created - время события из буфера, а не время записи:
+    свертка активности (UserDayActivity) считает промежутки между событиями.
+    bulk_create не подходит - auto_now_add перезаписывает created
+    """
+    table = UserActivity._meta.db_table
+    moment = timezone.now()
+    values = ', '.join(['(%s, %s, %s, %s, %s::jsonb, %s)'] * len(pending))
+    params = []
+    for user_id, _, course_id, content, heartbeat_time in pending:
+        params += [
+            datetime.datetime.fromtimestamp(heartbeat_time, tz=datetime.timezone.utc),
+            moment,
+            user_id,
+            course_id,
+            json.dumps(content),
+            '',
+        ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (created, updated, user_id, course_id, data, headers) VALUES {values}',
+            params,
+        )
+
+
+async def _heartbeat_loop():
+    while True:
+        await asyncio.sleep(settings.USER_ACTIVITY_FLUSH_INTERVAL)
+        pending, changed = take_heartbeats()
+        if not pending and not changed:
+            continue
+        try:
+            await database_sync_to_async(flush_heartbeats)(pending, changed)
+        except Exception:
+            logger.exception('Ошибка записи буфера активности пользователей')
+
+
+def start_heartbeat_flusher():
+    """
+    Таймер записи буфера активности в цикле событий процесса (один на процесс)
+    """
+    global _heartbeat_task
+    if _heartbeat_task is None or _heartbeat_task.done():
+        _heartbeat_task = asyncio.ensure_future(_heartbeat_loop())
@@ -48,7 +48,7 @@ class CompanyAdmin(admin.ModelAdmin):
 
 @admin.register(UserActivity)
 class UserActivityAdmin(admin.ModelAdmin):
-    list_display = ('user', 'headers', 'payload', 'total_time', 'created', 'updated')
+    list_display = ('user', 'course_id', 'data', 'total_time', 'created', 'updated')
     search_fields = ['user__username']
 
 
@@ -1,95 +1,49 @@
-import time
-from datetime import date, datetime
-
-from channels.generic.websocket import JsonWebsocketConsumer
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer, JsonWebsocketConsumer
 from asgiref.sync import async_to_sync
 
-from .models import User, UserDayActivity, UserActivity
+from . import activity
+from .models import User
 
 
-class UserActivityConsumer(JsonWebsocketConsumer):
-    room_group_name = 'online_users'
+class UserActivityConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Активность клиента. События копятся в буфере процесса и записываются пакетно
+    (backend.users.activity.flush_heartbeats), там же рассылается кол-во онлайн администраторам
+    """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.user_activity = None
-        self.start_time = 0
+        self.user = None
 
-    def chat_message(self, event):
-        pass
-
-    def connect(self):
+    async def connect(self):
         # TODO: сделать проверку по токену
         # TODO: возможно получить пользователя по токену
-        self.start_time = time.time()
-        async_to_sync(self.channel_layer.group_add)(
-            self.room_group_name,
-            self.channel_name
-        )
-        self.accept()
+        await self.accept()
+        activity.start_heartbeat_flusher()
+        activity.presence_changed()
 
-        async_to_sync(self.channel_layer.group_send)(
-            self.room_group_name,
-            {
-                'type': 'chat_message',
-                'message': 'message'
-            }
-        )
-
-        # if auth_token:
-        #     obj = AccessToken(auth_token)
-        #     try:
-        #         obj.verify()
-        #     except TokenError:
-        #         self.close()
-        #     else:
-        #         self.accept()
-
-    def receive_json(self, content, **kwargs):
+    async def receive_json(self, content, **kwargs):
         if 'user' in content:
-            try:
-                user = User.objects.get(pk=content['user'])
-                user.last_active = datetime.now()
-                user.save()
-
-                async_to_sync(self.channel_layer.group_send)(
-                    self.room_group_name,
-                    {
-                        'type': 'chat_message',
-                        'message': 'message'
-                    }
-                )
-            except User.DoesNotExist:
-                pass
-            else:
-                payload = {
-                    'user': user,
-                    'day': date.today(),
-                    'course_id': content.get('course'),
-                }
-                # self.user_activity, _ = UserDayActivity.objects.get_or_create(**payload)
-                UserActivity.objects.create(user=user, headers=str(content), payload=str(content),
-                                            course_id=content.get('course'))
-
-    def disconnect(self, close_code):
-        async_to_sync(self.channel_layer.group_send)(
-            self.room_group_name,
-            {
-                'type': 'chat_message',
-                'message': 'message'
-            }
-        )
+            user = await self.get_user(content['user'])
+            if user is None:
+                return
+
+            activity.touch(user.pk)
+            activity.queue_heartbeat(user, content)
 
-        if self.user_activity:
-            session_time = time.time() - self.start_time
-            total_time = self.user_activity.seconds + session_time
-            self.user_activity.seconds = total_time
-            self.user_activity.save()
+    async def disconnect(self, close_code):
+        activity.presence_changed()
 
-            async_to_sync(self.channel_layer.group_discard)(
-                'online_users',
-                self.channel_name
-            )
+    async def get_user(self, pk):
+        """
+        Пользователь сокета, запрашивается один раз на подключение
+        """
+        if self.user is None or str(self.user.pk) != str(pk):
+            self.user = await database_sync_to_async(
+                User.objects.filter(pk=pk).only('id', 'user_status').first
+            )()
+        return self.user
 
 
 class OnlineUsersConsumer(JsonWebsocketConsumer):
@@ -125,7 +79,10 @@ class OnlineUsersConsumer(JsonWebsocketConsumer):
         self.send_json({'online_users': count})
 
     def chat_message(self, event):
-        count = User.get_online_clients_count(15)
+        # Кол-во уже посчитано отправителем (presence.notify_online_users)
+        count = event.get('online_users')
+        if count is None:
+            count = User.get_online_clients_count(15)
         self.send_json({'online_users': count})
 
 
@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
 from backend.courses.models import Passing, Task, Course
+from backend.courses.progress import CuratorPassingsReport
 from backend.users.models import Company, UserDayActivity
 from backend.users.serializers import _PassingSerializer
 
@@ -69,6 +70,10 @@ class _TkSerializer(serializers.ModelSerializer):
 
 
 class _CsSerializer(serializers.ModelSerializer):
+    """
+    Курс пользователя с прохождениями из CuratorPassingsReport (context['passings_report'])
+    """
+
     def __init__(self, *args, **kwargs):
         self.user_id = kwargs.pop('user_id')
         super().__init__(*args, **kwargs)
@@ -79,39 +84,19 @@ class _CsSerializer(serializers.ModelSerializer):
     final_passings = serializers.SerializerMethodField()
 
     def get_final_passings(self, obj):
-        if self.user_id:
-            return _PassingSerializer(Passing.objects.filter(
-                user_id=self.user_id,
-                task_id__in=[task.id for task in obj.get_all_tasks()],
-                task__is_final=True,
-            ), many=True).data
-        else:
-            return _PassingSerializer(Passing.objects.filter(
-                task_id__in=[task.id for task in obj.get_all_tasks()],
-                task__is_final=True,
-            ), many=True).data
+        return _PassingSerializer(
+            self.context['passings_report'].get_final_passings(self.user_id, obj.id),
+            many=True,
+        ).data
 
     def get_num_intermediate_tests(self, obj):
         return obj.num_intermediate_tests if obj.num_intermediate_tests < 2 else obj.num_intermediate_tests
 
     def get_intermediate_passings(self, obj):
-        if self.user_id:
-            passings = Passing.objects.filter(
-                user_id=self.user_id,
-                task_id__in=[task.id for task in obj.get_all_tasks()],
-                task__is_final=False,
-                task__is_active=True,
-                is_trial=False,
-            )
-        else:
-            passings = Passing.objects.filter(
-                task_id__in=[task.id for task in obj.get_all_tasks()],
-                task__is_final=False,
-                task__is_active=True,
-                is_trial=False,
-            )
-        s_passings = _PgSerializer(passings, many=True).data
-        return s_passings
+        return _PgSerializer(
+            self.context['passings_report'].get_intermediate_passings(self.user_id, obj.id),
+            many=True,
+        ).data
 
     class Meta:
         model = Course
@@ -145,7 +130,15 @@ class CuratorUsersListSerializer(serializers.ModelSerializer):
         read_only=True
     )
     def get_courses(self, obj):
-        return _CsSerializer(obj.courses_with_num_intermediate_tests, many=True, user_id=obj.id).data
+        context = dict(self.context)
+        if not context.get('passings_report'):
+            context['passings_report'] = CuratorPassingsReport([obj])
+        return _CsSerializer(
+            obj.courses_with_num_intermediate_tests,
+            many=True,
+            user_id=obj.id,
+            context=context,
+        ).data
 
     #courses = _CsSerializer(
     #    source='courses_with_num_intermediate_tests',
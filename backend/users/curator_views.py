@@ -4,8 +4,10 @@ from rest_framework import permissions, filters
 from rest_framework.generics import ListAPIView
 from rest_framework.pagination import PageNumberPagination
 
+from backend.api_v1.filters import TrigramSearchFilter
 from backend.api_v1.permissions import IsCurator
 from backend.courses.models import Passing, Course
+from backend.courses.progress import CuratorPassingsReport
 from backend.users.curator_serializers import CuratorUsersListSerializer, CuratorUserAllActivitySerializer
 from backend.users.models import User, UserDayActivity
 
@@ -24,7 +26,7 @@ class CuratorUsersListView(ListAPIView):
     serializer_class = CuratorUsersListSerializer
     pagination_class = StandardResultsSetPagination
     permission_classes = (permissions.IsAuthenticated, IsCurator)
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, TrigramSearchFilter)
     filterset_fields = ('id', 'company', 'courses',)
     ordering_fields = '__all__'
     search_fields = [
@@ -40,16 +42,13 @@ class CuratorUsersListView(ListAPIView):
         """
         # return User.objects.with_select_related()
         return User.objects.prefetch_related(
-            'days_activity',
-            'courses',
-            'courses__materials',
             Prefetch(
                 'passings',
                 queryset=Passing.objects.filter(
                     task__is_final=True,
                     task__is_active=True,
                     is_trial=False,
-                ),
+                ).select_related('task__material__course'),
                 to_attr='filtered_final_passing'
             ),
             Prefetch(
@@ -58,7 +57,7 @@ class CuratorUsersListView(ListAPIView):
                     task__is_final=False,
                     task__is_active=True,
                     is_trial=False,
-                ),
+                ).select_related('task__material__course'),
                 to_attr='filtered_intermediate_passing'
             ),
             Prefetch(
@@ -75,6 +74,19 @@ class CuratorUsersListView(ListAPIView):
                 ).values('title')[:1]),
         ).with_annotations().for_curator(self.request.user.curator_company.all()).distinct()
 
+    def get_serializer(self, *args, **kwargs):
+        # Прохождения по курсам загружаются на всю страницу пользователей сразу
+        if kwargs.get('many') and args:
+            users = list(args[0])
+            self.passings_report = CuratorPassingsReport(users)
+            args = (users,) + args[1:]
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['passings_report'] = getattr(self, 'passings_report', None)
+        return context
+
 
 class CuratorUserAllActivityListView(ListAPIView):
     """
@@ -0,0 +1,72 @@
+import operator
+import time
+from functools import reduce
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from backend.api_v1.filters import TrigramSearchFilter
+from backend.courses.models import Material, Question
+from backend.mess.models import Message
+from backend.users.models import User
+
+# Модель и search_fields как во view поиска
+TARGETS = {
+    'users': (User, ['username', 'first_name']),
+    'materials': (Material, ['title']),
+    'questions': (Question, ['text']),
+    'messages': (Message, ['mess']),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark ?search= latency: DRF SearchFilter (icontains over search_fields) '
+        'vs TrigramSearchFilter (pg_trgm + search_vector, ranked)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('terms', nargs='+', help='Search strings, one measurement each')
+        parser.add_argument('--targets', default=','.join(TARGETS), help='Comma separated: ' + ', '.join(TARGETS))
+        parser.add_argument('--repeat', type=int, default=20, help='Queries per measurement')
+        parser.add_argument('--limit', type=int, default=50, help='Page size')
+
+    def handle(self, *args, **kwargs):
+        search_filter = TrigramSearchFilter()
+        targets = [target.strip() for target in kwargs['targets'].split(',') if target.strip()]
+
+        self.stdout.write(f'{"target":>10} {"search":>20} {"rows":>6} {"icontains, ms":>14} {"trigram, ms":>12}')
+        for target in targets:
+            model, fields = TARGETS[target]
+            for search in kwargs['terms']:
+                terms = search.split()
+                old = self.icontains(model.objects.all(), terms, fields)
+                new = search_filter.search(model.objects.all(), terms, fields).order_by(
+                    '-search_rank', '-search_similarity', '-pk'
+                )
+                old_ms = self.measure(old, kwargs['limit'], kwargs['repeat'])
+                new_ms = self.measure(new, kwargs['limit'], kwargs['repeat'])
+                rows = new.count()
+                self.stdout.write(f'{target:>10} {search[:20]:>20} {rows:>6} {old_ms:>14.3f} {new_ms:>12.3f}')
+
+        self.stdout.write(self.style.WARNING('Time is per page query, run after migrate to use the search indexes.'))
+
+    @staticmethod
+    def icontains(queryset, terms, fields):
+        """
+        Отбор как в rest_framework.filters.SearchFilter
+        """
+        return queryset.filter(reduce(operator.and_, (
+            reduce(operator.or_, (Q(**{f'{field}__icontains': term}) for field in fields))
+            for term in terms
+        )))
+
+    @staticmethod
+    def measure(queryset, limit, repeat):
+        """
+        :return: float, мс на запрос страницы
+        """
+        start = time.perf_counter()
+        for _ in range(repeat):
+            list(queryset[:limit])
+        return (time.perf_counter() - start) * 1000 / repeat
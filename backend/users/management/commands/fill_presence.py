@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from backend.users.models import User
+from backend.users.presence import PRESENCE_KEY, PRESENCE_TTL, get_redis
+
+
+class Command(BaseCommand):
+    help = 'Fill Redis online index from User.last_active (last 24 hours)'
+
+    def handle(self, *args, **kwargs):
+        clients = User.objects.filter(
+            user_status=User.STATUS_CLIENT,
+            last_active__gte=timezone.now() - timedelta(seconds=PRESENCE_TTL),
+        ).values_list('id', 'last_active')
+
+        mapping = {user_id: last_active.timestamp() for user_id, last_active in clients}
+        if mapping:
+            get_redis().zadd(PRESENCE_KEY, mapping)
+
+        self.stdout.write(self.style.WARNING(f'Online index filled: {len(mapping)} clients.'))
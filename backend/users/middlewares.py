@@ -1,18 +1,18 @@
-from datetime import datetime
-
-from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 
-from backend.users.models import User
+from backend.users import activity, presence
 
 
 class LastActiveUserMiddleware(MiddlewareMixin):
+    """
+    Отметка последней активности пользователя: запись в базу - пакетно (backend.users.activity),
+    индекс онлайн - backend.users.presence
+    """
+
     def __call__(self, request):
         if request.user and request.user.is_authenticated:
-            u = User.objects.get(id=request.user.id)
-            u.last_active = datetime.now()
-            u.save()
+            activity.touch(request.user.id)
+            presence.mark_online(request.user)
 
         response = self.get_response(request)
         return response
-       
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 15:20
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0027_userlogerrors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useractivity',
+            name='data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, verbose_name='Данные активности'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:05
+
+import datetime
+
+from django.db import migrations, models
+
+TABLE = 'users_useractivity'
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_activity(apps, schema_editor):
+    """
+    Перевод таблицы активности на помесячные секции по created
+    Секции - с месяца самой старой записи до двух месяцев вперед, плюс секция по умолчанию
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_old')
+        cursor.execute(f'ALTER SEQUENCE {TABLE}_id_seq OWNED BY NONE')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {TABLE}_old INCLUDING DEFAULTS) PARTITION BY RANGE (created)'
+        )
+        cursor.execute(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (id, created)')
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_user_id_fk '
+            f'FOREIGN KEY (user_id) REFERENCES users_user (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(f'CREATE INDEX {TABLE}_user_created_idx ON {TABLE} (user_id, created)')
+        cursor.execute(f'CREATE INDEX {TABLE}_created_idx ON {TABLE} (created)')
+        cursor.execute(f'ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+
+        cursor.execute(f'SELECT min(created) FROM {TABLE}_old')
+        oldest = cursor.fetchone()[0]
+        today = datetime.date.today()
+        month = datetime.date((oldest or today).year, (oldest or today).month, 1)
+        last = add_months(datetime.date(today.year, today.month, 1), 2)
+        while month <= last:
+            cursor.execute(
+                f'CREATE TABLE {TABLE}_{month:%Y_%m} PARTITION OF {TABLE} '
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            )
+            month = add_months(month, 1)
+        cursor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {TABLE}_old')
+        cursor.execute(f'DROP TABLE {TABLE}_old')
+
+
+def unpartition_activity(apps, schema_editor):
+    """
+    Обратный перевод: обычная таблица с записями всех секций
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER SEQUENCE {TABLE}_id_seq OWNED BY NONE')
+        cursor.execute(f'CREATE TABLE {TABLE}_plain (LIKE {TABLE} INCLUDING DEFAULTS)')
+        cursor.execute(f'INSERT INTO {TABLE}_plain SELECT * FROM {TABLE}')
+        # Вместе с секциями, индексами и ограничениями - их имена освобождаются для обычной таблицы
+        cursor.execute(f'DROP TABLE {TABLE}')
+        cursor.execute(f'ALTER TABLE {TABLE}_plain RENAME TO {TABLE}')
+        cursor.execute(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (id)')
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_user_id_fk '
+            f'FOREIGN KEY (user_id) REFERENCES users_user (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        # Индекс внешнего ключа, как до секционирования; индексы секционированной таблицы
+        # создаются заново при повторном применении миграции
+        cursor.execute(f'CREATE INDEX {TABLE}_user_id_idx ON {TABLE} (user_id)')
+        cursor.execute(f'ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0028_useractivity_data'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_activity, unpartition_activity),
+        migrations.AlterField(
+            model_name='userdayactivity',
+            name='day',
+            field=models.DateField(default=datetime.date.today, verbose_name='Дата'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userdayactivity',
+            unique_together={('user', 'day', 'course_id')},
+        ),
+    ]
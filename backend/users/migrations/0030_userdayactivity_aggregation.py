@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0029_useractivity_partitions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userdayactivity',
+            name='seconds',
+            field=models.PositiveIntegerField(default=0, verbose_name='Секунды'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userdayactivity',
+            unique_together=set(),
+        ),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX users_userdayactivity_user_day_course_uniq '
+            'ON users_userdayactivity (user_id, day, COALESCE(course_id, -1))',
+            'DROP INDEX users_userdayactivity_user_day_course_uniq',
+        ),
+        migrations.CreateModel(
+            name='UserActivityAggregation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('aggregated_until', models.DateTimeField(blank=True, null=True, verbose_name='Активность учтена до')),
+            ],
+            options={
+                'verbose_name': 'Свертка активности пользователей',
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0030_userdayactivity_aggregation'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='user',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunSQL(
+            'CREATE TRIGGER users_user_search_vector_update BEFORE INSERT OR UPDATE '
+            'OF username, first_name, last_name, search_vector ON users_user FOR EACH ROW '
+            "EXECUTE PROCEDURE tsvector_update_trigger(search_vector, 'pg_catalog.russian', "
+            'username, first_name, last_name)',
+            'DROP TRIGGER users_user_search_vector_update ON users_user',
+        ),
+        migrations.RunSQL(
+            "UPDATE users_user SET search_vector = to_tsvector('pg_catalog.russian', "
+            "concat_ws(' ', username, first_name, last_name))",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='user_search_vector_idx'),
+        ),
+        # icontains -> UPPER(поле) LIKE UPPER(%s)
+        migrations.RunSQL(
+            'CREATE INDEX users_user_username_trgm_idx ON users_user USING gin (UPPER(username) gin_trgm_ops)',
+            'DROP INDEX users_user_username_trgm_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX users_user_first_name_trgm_idx ON users_user USING gin (UPPER(first_name) gin_trgm_ops)',
+            'DROP INDEX users_user_first_name_trgm_idx',
+        ),
+    ]
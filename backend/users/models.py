@@ -1,9 +1,13 @@
 import time
-from datetime import timedelta, time
+from datetime import timedelta, time, date
 
 from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
-from django.db.models import Count, Q, DateTimeField, Max, IntegerField
+from django.db.models import Count, Q, DateTimeField, Max, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from solo.models import SingletonModel
@@ -92,42 +96,69 @@ class UserQuerySet(models.QuerySet):
 
     def with_passing_on_check(self):
         """
-        аннотируестя кол-во прохождений на проверке
+        аннотируестя кол-во прохождений на проверке и дата последнего прохождения финального теста
+        (коррелированные подзапросы - строки пользователей не размножаются join-ом по прохождениям)
         """
+        from backend.courses.models import Passing
+
+        on_check = Passing.objects.filter(
+            user=OuterRef('pk'),
+            success_passed=1,
+            is_trial=False,
+        ).order_by().values('user').annotate(c=Count('pk')).values('c')
         return self.annotate(
-            on_check=Count(
-                'passings',
-                filter=Q(
-                    passings__success_passed=1,
-                    passings__is_trial=False,
-                    # passings__finish_time__is_null=False,
-                ),
-                output_field=IntegerField()),
-            last_passing_dt=Max(
-                'passings__finish_time',
-                filter=Q(
-                    passings__task__is_final=True, # uncomment if you need final tasks only
-                    passings__success_passed=0,
-                    passings__is_trial=False,
-                    passings__finish_time__isnull=False,
-                ),
-                output_field=DateTimeField()),
-        )
+            on_check=Coalesce(Subquery(on_check, output_field=IntegerField()), 0),
+        ).with_last_passing_date()
+
     def with_last_passing_date(self):
         """
         аннотируестя дата последнего прохождения финального теста
         """
-        # отфильтровать нулевые значения
+        from backend.courses.models import Passing
+
+        last_passing = Passing.objects.filter(
+            user=OuterRef('pk'),
+            task__is_final=True,
+            success_passed=0,
+            is_trial=False,
+            finish_time__isnull=False,
+        ).order_by('-finish_time').values('finish_time')[:1]
         return self.annotate(
-            last_passing_dt=Max(
-                'passings__finish_time',
-                filter=Q(
-                    passings__task__is_final=True,
-                    passings__success_passed=0,
-                    passings__is_trial=False,
-                    passings__finish_time__isnull=False
-                ),
-                output_field=DateTimeField()),
+            last_passing_dt=Subquery(last_passing, output_field=DateTimeField()),
+        )
+
+    def with_course_count(self):
+        """
+        аннотируется кол-во курсов пользователя
+        """
+        from backend.courses.models import Course
+
+        course_count = Course.users.through.objects.filter(
+            user=OuterRef('pk'),
+        ).order_by().values('user').annotate(c=Count('pk')).values('c')
+        return self.annotate(
+            course_count=Coalesce(Subquery(course_count, output_field=IntegerField()), 0),
+        )
+
+    def with_last_task_passings(self):
+        """
+        Для списков пользователей: курсы, курируемые компании и last_task_passings -
+        последнее (по start_time) непробное прохождение каждого задания, одним запросом DISTINCT ON (user, task)
+        """
+        from backend.courses.models import Passing
+
+        return self.prefetch_related(
+            'courses',
+            'curator_company',
+            Prefetch(
+                'passings',
+                queryset=Passing.objects.filter(
+                    is_trial=False,
+                ).select_related(
+                    'task__material__course',
+                ).order_by('user_id', 'task_id', '-start_time', '-id').distinct('user_id', 'task_id'),
+                to_attr='last_task_passings',
+            ),
         )
 
 
@@ -188,17 +219,38 @@ class User(AbstractUser, BaseModel):
 
     # Last user activity
     last_active = models.DateTimeField('Последняя активность', blank=True, null=True)
+    # username, first_name, last_name - заполняется триггером в базе (migrations/0031_user_search)
+    search_vector = SearchVectorField('Поисковый вектор', null=True, editable=False)
 
     objects = UserManager.from_queryset(UserQuerySet)()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Поиск backend.api_v1.filters.TrigramSearchFilter, индексы pg_trgm - в миграции
+            GinIndex(fields=['search_vector'], name='user_search_vector_idx'),
+        ]
+
     @classmethod
     def get_online_clients_count(cls, timedelta_min):
+        """
+        Кол-во клиентов онлайн за timedelta_min минут - из индекса онлайн в Redis (backend.users.presence),
+        если Redis недоступен - по last_active с учетом буфера процесса (backend.users.activity).
+        Подсчет по базе приблизительный: учитывается буфер только текущего процесса, активность
+        в буферах других воркеров видна после их записи (до settings.LAST_ACTIVE_FLUSH_INTERVAL секунд)
+        """
+        import redis
+        from backend.users.activity import buffered_since
+        from backend.users.presence import count_online
+
+        try:
+            return count_online(timedelta_min)
+        except redis.RedisError:
+            pass
+
+        since = timezone.now() - timedelta(minutes=timedelta_min)
         return cls.objects.filter(
+            Q(last_active__range=(since, timezone.now())) | Q(pk__in=buffered_since(since)),
             user_status=cls.STATUS_CLIENT,
-            last_active__range=(
-                timezone.now() - timedelta(minutes=timedelta_min),
-                timezone.now()
-            )
         ).count()
 
     @classmethod
@@ -252,8 +304,10 @@ class UserOnlineHistory(BaseModel):
 
 class UserActivity(BaseModel):
     user = models.ForeignKey(User, verbose_name='Пользователь', related_name='activities', on_delete=models.CASCADE)
+    # headers и payload - старый формат (str(content)), новые записи хранят content в data
     headers = models.TextField('headers', blank=True)
     payload = models.TextField('payload', blank=True, null=True)
+    data = JSONField('Данные активности', default=dict, blank=True)
     course_id = models.IntegerField(
         'ID курса в момент посещения',
         blank=True,
@@ -267,6 +321,7 @@ class UserActivity(BaseModel):
     class Meta:
         verbose_name = 'Пользовательская активность'
         verbose_name_plural = 'Пользовательская активность'
+        # Таблица разбита на помесячные секции по created (backend.users.partitions)
 
     def __str__(self):
         return f'Активность пользователя ID_{self.user.id}'
@@ -304,9 +359,9 @@ class UserDayActivity(BaseModel):
     )
     day = models.DateField(
         'Дата',
-        auto_now_add=True,
+        default=date.today,
     )
-    seconds = models.PositiveSmallIntegerField(
+    seconds = models.PositiveIntegerField(
         'Секунды',
         default=0,
     )
@@ -321,21 +376,31 @@ class UserDayActivity(BaseModel):
     class Meta:
         verbose_name = 'Время активности пользователей по дням'
         verbose_name_plural = 'Время активности пользователей по дням'
-        unique_together = ('user', 'day')
+        # Уникальность (user, day, course_id) с учетом NULL курса - индекс
+        # users_userdayactivity_user_day_course_uniq (migrations/0030), нужен для ON CONFLICT
 
     def __str__(self):
-        return f'Активность пользователя ID_{self.user.id} на {self.day}'
+        return f'Активность пользователя ID_{self.user_id} на {self.day}'
 
     @property
     def human_time(self):
-        return time.strftime("%H:%M:%S", time.gmtime(self.seconds))
-
-    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
-        if self.user:
-            from backend.courses.models import Course
-            course = Course.objects.filter(users=self.user).first()
-            self.course = course.id
-        super().save(force_insert, force_update, using, update_fields)
+        minutes, seconds = divmod(self.seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return f'{hours:02}:{minutes:02}:{seconds:02}'
+
+
+class UserActivityAggregation(SingletonModel):
+    """
+    Состояние свертки UserActivity в UserDayActivity (backend.users.tasks.aggregate_user_activity)
+    """
+
+    aggregated_until = models.DateTimeField('Активность учтена до', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Свертка активности пользователей'
+
+    def __str__(self):
+        return f'Активность учтена до {self.aggregated_until}'
 
 
 class UsersSettings(SingletonModel):
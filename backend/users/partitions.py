@@ -0,0 +1,98 @@
+import datetime
+
+from django.db import connection, transaction
+
+from backend.users.models import UserActivity
+
+# Таблица UserActivity разбита на помесячные секции по created (migrations/0029_useractivity_partitions)
+ACTIVITY_TABLE = UserActivity._meta.db_table
+DEFAULT_PARTITION = f'{ACTIVITY_TABLE}_default'
+
+
+def month_start(day):
+    return datetime.date(day.year, day.month, 1)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{ACTIVITY_TABLE}_{month:%Y_%m}'
+
+
+def activity_partitions():
+    """
+    Помесячные секции таблицы активности
+    :return: dict, {первый день месяца: имя секции}
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE parent.relname = %s',
+            [ACTIVITY_TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        try:
+            month = datetime.datetime.strptime(name[len(ACTIVITY_TABLE) + 1:], '%Y_%m').date()
+        except ValueError:
+            # секция по умолчанию
+            continue
+        partitions[month] = name
+    return partitions
+
+
+def create_activity_partitions(months_ahead=2, today=None):
+    """
+    Создание секций с текущего месяца на months_ahead месяцев вперед
+    Записи месяца, уже попавшие в секцию по умолчанию, переносятся в новую секцию -
+    иначе PostgreSQL не дает добавить секцию (строки default пересекаются с ее диапазоном)
+    :return: list, имена созданных секций
+    """
+    existing = activity_partitions()
+    current = month_start(today or datetime.date.today())
+
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month in existing:
+                continue
+            name = partition_name(month)
+            cursor.execute(f'CREATE TABLE {name} (LIKE {ACTIVITY_TABLE} INCLUDING DEFAULTS)')
+            cursor.execute(
+                f'WITH moved AS ('
+                f'DELETE FROM {DEFAULT_PARTITION} WHERE created >= %s AND created < %s RETURNING *'
+                f') INSERT INTO {name} SELECT * FROM moved',
+                [month, add_months(month, 1)],
+            )
+            cursor.execute(
+                f'ALTER TABLE {ACTIVITY_TABLE} ATTACH PARTITION {name} '
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            )
+            created.append(name)
+    return created
+
+
+def drop_activity_partitions(keep_months, today=None):
+    """
+    Удаление секций старше keep_months месяцев (текущий месяц не считается)
+    :return: list, имена удаленных секций
+    """
+    oldest = add_months(month_start(today or datetime.date.today()), -keep_months)
+
+    dropped = []
+    with connection.cursor() as cursor:
+        for month, name in sorted(activity_partitions().items()):
+            if month >= oldest:
+                continue
+            cursor.execute(f'ALTER TABLE {ACTIVITY_TABLE} DETACH PARTITION {name}')
+            cursor.execute(f'DROP TABLE {name}')
+            dropped.append(name)
+    return dropped
@@ -0,0 +1,120 @@
+import time
+
+import redis
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+# Клиенты онлайн: sorted set {user_id: время последней активности (unix time)}
+PRESENCE_KEY = 'presence:clients'
+# Метка последней рассылки кол-ва онлайн в группу online_users
+NOTIFY_KEY = 'presence:notified'
+NOTIFY_INTERVAL_MS = 1000
+# Рассылка в конце окна уже запланирована; если задача потеряна, метка истечет и рассылка запланируется заново
+PENDING_KEY = 'presence:pending'
+PENDING_TTL_MS = 10 * NOTIFY_INTERVAL_MS
+# Дольше суток активность в индексе не нужна
+PRESENCE_TTL = 24 * 60 * 60
+
+_client = None
+
+
+def get_redis():
+    """
+    Клиент Redis, который уже используется для CHANNEL_LAYERS
+    """
+    global _client
+    if _client is None:
+        host = settings.CHANNEL_LAYERS['default']['CONFIG']['hosts'][0]
+        if isinstance(host, str):
+            _client = redis.Redis.from_url(host)
+        else:
+            _client = redis.Redis(host=host[0], port=host[1])
+    return _client
+
+
+def mark_online(user, moment=None):
+    """
+    Отметка активности клиента в индексе онлайн
+    """
+    if not user.is_client:
+        return
+    moment = moment or time.time()
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zadd(PRESENCE_KEY, {user.pk: moment})
+    pipe.zremrangebyscore(PRESENCE_KEY, '-inf', moment - PRESENCE_TTL)
+    try:
+        pipe.execute()
+    except redis.RedisError:
+        # Индекс онлайн не должен ломать запросы, last_active пишется в базу отдельно
+        pass
+
+
+def mark_online_many(moments):
+    """
+    Отметка активности нескольких клиентов одним ZADD
+    :param moments: dict, {user_id: время последней активности (unix time)}
+    """
+    if not moments:
+        return
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zadd(PRESENCE_KEY, moments)
+    pipe.zremrangebyscore(PRESENCE_KEY, '-inf', time.time() - PRESENCE_TTL)
+    try:
+        pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+def count_online(timedelta_min):
+    """
+    Кол-во клиентов онлайн за timedelta_min минут (ZCOUNT)
+    """
+    return get_redis().zcount(PRESENCE_KEY, time.time() - timedelta_min * 60, '+inf')
+
+
+def notify_online_users(timedelta_min=15):
+    """
+    Рассылка кол-ва клиентов онлайн в группу online_users, не чаще раза в NOTIFY_INTERVAL_MS
+    Изменение внутри окна не теряется: на окно планируется одна рассылка после его окончания
+    (backend.users.tasks.notify_online_users_trailing)
+    """
+    from backend.users.tasks import notify_online_users_trailing
+
+    client = get_redis()
+    try:
+        if not client.set(NOTIFY_KEY, 1, px=NOTIFY_INTERVAL_MS, nx=True):
+            if client.set(PENDING_KEY, 1, px=PENDING_TTL_MS, nx=True):
+                countdown = max(client.pttl(NOTIFY_KEY), 0) / 1000
+                notify_online_users_trailing.apply_async((timedelta_min,), countdown=countdown)
+            return
+    except redis.RedisError:
+        return
+    send_online_users(timedelta_min)
+
+
+def send_trailing_online_users(timedelta_min=15):
+    """
+    Отложенная рассылка в конце окна notify_online_users, с нее начинается новое окно
+    """
+    client = get_redis()
+    try:
+        client.delete(PENDING_KEY)
+        client.set(NOTIFY_KEY, 1, px=NOTIFY_INTERVAL_MS)
+    except redis.RedisError:
+        return
+    send_online_users(timedelta_min)
+
+
+def send_online_users(timedelta_min):
+    """
+    Кол-во клиентов онлайн за timedelta_min минут в группу online_users
+    """
+    try:
+        count = count_online(timedelta_min)
+    except redis.RedisError:
+        return
+    async_to_sync(get_channel_layer().group_send)('online_users', {
+        'type': 'chat_message',
+        'online_users': count,
+    })
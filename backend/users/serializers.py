@@ -4,9 +4,10 @@ from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
 
-from backend.courses.models import Course, Passing, MaterialPassing, Material, Task, UserCourseSettings
+from backend.courses.models import Course, Passing, MaterialPassing, UserCourseSettings
+from backend.courses.progress import CourseProgressReport
 from backend.users.models import UserOnlineHistory
-from backend.users.utils import file_validator, creat_users
+from backend.users.utils import file_validator, creat_users, users_file_to_text
 from backend.constants import USERS_CREATE
 from backend.users.models import Company, UserDayActivity, UserActivity, UserLogErrors
 
@@ -145,7 +146,7 @@ class UserSerializer(serializers.ModelSerializer):
             'tech_chat',
             'on_check',
             'last_passing_dt',
-            'last_test_passings',  # !!! ~900 запросов, по запросу на одного пользователя
+            'last_test_passings',
         )
         extra_kwargs = {
             'password': {'write_only': True}
@@ -165,22 +166,24 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
     def get_last_test_passings(self, obj):
-        result = {}
-        if obj.user_course:
-            user_passings = _UserPassingSerializer(
-                obj.passings.filter(is_trial=False).prefetch_related(
-                    'task'
-                ).select_related(
+        """
+        Последнее (по start_time) непробное прохождение каждого задания пользователя
+        Списки подгружают их одним запросом (UserQuerySet.with_last_task_passings)
+        """
+        if hasattr(obj, 'serialized_last_test_passings'):
+            return obj.serialized_last_test_passings
+
+        result = []
+        if obj.courses.all():
+            if hasattr(obj, 'last_task_passings'):
+                passings = obj.last_task_passings
+            else:
+                passings = obj.passings.filter(is_trial=False).select_related(
                     'task__material__course'
-                ).order_by('task'),
-                many=True).data
-            for item in user_passings:
-                if item['task'] in result:
-                    if item['start_time'] > result[item['task']]['start_time']:
-                        result[item['task']] = item
-                else:
-                    result[item['task']] = item
-        return result.values()
+                ).order_by('task_id', '-start_time', '-id').distinct('task_id')
+            result = _UserPassingSerializer(passings, many=True).data
+        obj.serialized_last_test_passings = result
+        return result
 
     def get_courses(self, obj):
         return CourseForUserSerializer(obj.courses.all(), many=True,
@@ -315,20 +318,7 @@ class MassUsersSerializer(serializers.Serializer):
         if validated_data.get('text_users'):
             txt = validated_data.get('text_users')
         elif file_users:
-            from openpyxl import load_workbook
-            wb = load_workbook(filename=file_users, read_only=True)
-            sheet = wb.active
-
-            for idx, row in enumerate(sheet.rows):
-
-                # Пропускаем первую строку - названия стобцов
-                if idx == 0:
-                    continue
-
-                for cell in row:
-                    if not cell.value:
-                        break
-                    txt += str(cell.value) + '\n'
+            txt = users_file_to_text(file_users)
 
         return creat_users(txt, validated_data.get('course_id'), validated_data.get('design'))
 
@@ -401,15 +391,6 @@ class _MaterialPassingSerializer(serializers.ModelSerializer):
         )
 
 
-class _MaterialSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Material
-        fields = (
-            'id',
-            'title',
-        )
-
-
 class _CourseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Course
@@ -421,16 +402,6 @@ class _CourseSerializer(serializers.ModelSerializer):
         )
 
 
-class _TaskSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Task
-        fields = (
-            'id',
-            'title',
-            'is_final',
-        )
-
-
 class _UserDayActivitySerializer(serializers.ModelSerializer):
     class Meta:
         model = UserDayActivity
@@ -474,64 +445,16 @@ class CuratorUserSerializer(serializers.ModelSerializer):
             task__is_final=True,
         ), many=True).data
 
-    @staticmethod
-    def get_tasks(user, material_id):
-        """
-        Задания для выбранного курса
-        Для всех заданий отдаются последние прохождения пользователя
-        """
-        tasks = _TaskSerializer(Task.objects.filter(
-            is_active=True,
-            material_id=material_id,
-        ), many=True).data
-        for task in tasks:
-            last_passing = Passing.objects.filter(
-                user=user,
-                task=task['id'],
-                is_trial=False,
-            ).last()
-            if last_passing:
-                task.update({
-                    'start_time': last_passing.start_time,
-                    'finish_time': last_passing.finish_time,
-                    'passing_status': last_passing.success_passed,
-                })
-        return tasks
-
     def get_courses(self, obj):
         """
-        Для курса отдаем все активные материалы, для всех материалов отдаем статус прохождения пользователем,
-        если прохождения нет, то создаем его и статвим статус в STATUS_NOT_STARTED
+        Для курса отдаем все активные материалы со статусом прохождения пользователем
+        и последними прохождениями заданий (backend.courses.progress.CourseProgressReport)
         """
+        report = self.context.get('progress_report') or CourseProgressReport([obj])
         courses = _CourseSerializer(obj.courses, many=True).data
         for course in courses:
-            materials = _MaterialSerializer(
-                Material.objects.filter(
-                    course=course['id'],
-                    is_active=True,
-                ).order_by('rank', 'id'),
-                many=True,
-            ).data
-            for material in materials:
-                try:
-                    status, _ = MaterialPassing.objects.get_or_create(
-                        user=obj,
-                        material_id=material['id'],
-                        defaults={
-                            'status': MaterialPassing.STATUS_NOT_STARTED
-                        }
-                    )
-                except MaterialPassing.MultipleObjectsReturned:
-                    status = MaterialPassing.objects.filter(
-                        user=obj,
-                        material_id=material['id'],
-                    ).first()
-                material.update({
-                    'material_passing_status': status.status,
-                    'tasks': self.get_tasks(obj, material['id']),
-                })
             course.update({
-                'materials': materials,
+                'materials': report.get_materials(obj.pk, course['id']),
             })
         return courses
 
@@ -575,6 +498,8 @@ class UserActivityDetailsSerializer(serializers.ModelSerializer):
     payload = serializers.SerializerMethodField(read_only=True)
 
     def get_payload(self, obj):
+        if obj.data or not obj.payload:
+            return obj.data
         return ast.literal_eval(obj.payload)
 
     class Meta:
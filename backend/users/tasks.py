@@ -3,9 +3,14 @@ from __future__ import absolute_import, unicode_literals
 from datetime import timedelta
 
 from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.dateparse import parse_date
 from django.utils.timezone import now
 
-from backend.users.models import User, UserOnlineHistory
+from backend.users.models import User, UserOnlineHistory, UserActivity, UserDayActivity, UserActivityAggregation
+from backend.users import presence
+from backend.users.partitions import create_activity_partitions, drop_activity_partitions
 
 
 @shared_task
@@ -40,3 +45,99 @@ def online_clients_history():
     clients_count = User.get_online_clients_day_count(r_date)
     UserOnlineHistory.objects.update_or_create(date=r_date, defaults={'active_clients_count': clients_count})
     print(f"{clients_count} was active on {now()}")
+
+
+@shared_task
+def notify_online_users_trailing(timedelta_min=15):
+    """
+    Рассылка кол-ва клиентов онлайн в конце окна presence.notify_online_users
+    """
+    presence.send_trailing_online_users(timedelta_min)
+
+
+@shared_task
+def maintain_activity_partitions():
+    """
+    Секции таблицы активности: создаем на 2 месяца вперед,
+    удаляем старше settings.USER_ACTIVITY_RETENTION_MONTHS месяцев
+    """
+    created = create_activity_partitions(months_ahead=2)
+    dropped = drop_activity_partitions(settings.USER_ACTIVITY_RETENTION_MONTHS)
+    print(f"Created partitions: {created}, dropped partitions: {dropped}")
+
+
+@shared_task
+def rollup_user_activity(day=None):
+    """
+    Полный пересчет UserDayActivity за день (по умолчанию - вчера): секунды по пользователю и курсу.
+    Обычно активность учитывается постепенно (aggregate_user_activity), пересчет - для восстановления.
+    Время - сумма промежутков между соседними событиями пользователя, промежуток дольше
+    settings.USER_ACTIVITY_IDLE_TIMEOUT считается перерывом. Промежуток относится к курсу события.
+    """
+    day = parse_date(day) if isinstance(day, str) else day or now().date() - timedelta(days=1)
+    table = UserActivity._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT user_id, course_id, SUM(gap) FROM ('
+            f'  SELECT user_id, course_id, '
+            f'  EXTRACT(EPOCH FROM created - LAG(created) OVER (PARTITION BY user_id ORDER BY created)) AS gap '
+            f'  FROM {table} WHERE created >= %s AND created < %s'
+            f') AS gaps WHERE gap <= %s GROUP BY user_id, course_id',
+            [day, day + timedelta(days=1), settings.USER_ACTIVITY_IDLE_TIMEOUT],
+        )
+        rows = cursor.fetchall()
+
+    with transaction.atomic():
+        UserDayActivity.objects.filter(day=day).delete()
+        UserDayActivity.objects.bulk_create([
+            UserDayActivity(
+                user_id=user_id,
+                course_id=course_id,
+                day=day,
+                seconds=round(seconds),
+            ) for user_id, course_id, seconds in rows
+        ])
+    print(f"Rolled up activity of {len(rows)} users/courses on {day}")
+
+
+@shared_task
+def aggregate_user_activity():
+    """
+    Постепенная свертка UserActivity в UserDayActivity с момента прошлого запуска
+    (UserActivityAggregation.aggregated_until) до now - USER_ACTIVITY_AGGREGATE_LAG.
+    Для промежутков на границе берутся события до отметки в пределах USER_ACTIVITY_IDLE_TIMEOUT.
+    Секунды добавляются к существующим одной вставкой INSERT ... ON CONFLICT DO UPDATE.
+    """
+    until = now() - timedelta(seconds=settings.USER_ACTIVITY_AGGREGATE_LAG)
+    idle = settings.USER_ACTIVITY_IDLE_TIMEOUT
+    activity_table = UserActivity._meta.db_table
+    day_table = UserDayActivity._meta.db_table
+
+    with transaction.atomic():
+        state = UserActivityAggregation.objects.select_for_update().get_or_create(pk=1)[0]
+        since = state.aggregated_until or now().replace(hour=0, minute=0, second=0, microsecond=0)
+        if since >= until:
+            return 0
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {day_table} (created, updated, user_id, day, course_id, seconds) '
+                f'SELECT now(), now(), user_id, day, course_id, ROUND(SUM(gap)) FROM ('
+                f'  SELECT user_id, course_id, created::date AS day, '
+                f'  EXTRACT(EPOCH FROM created - LAG(created) OVER (PARTITION BY user_id ORDER BY created)) AS gap, '
+                f'  created >= %s AS is_new '
+                f'  FROM {activity_table} WHERE created >= %s AND created < %s'
+                f') AS gaps WHERE is_new AND gap <= %s '
+                f'GROUP BY user_id, day, course_id '
+                f'ON CONFLICT (user_id, day, COALESCE(course_id, -1)) DO UPDATE '
+                f'SET seconds = {day_table}.seconds + EXCLUDED.seconds, updated = EXCLUDED.updated',
+                [since, since - timedelta(seconds=idle), until, idle],
+            )
+            upserted = cursor.rowcount
+
+        state.aggregated_until = until
+        state.save()
+
+    print(f"Aggregated activity from {since} to {until}: {upserted} user days")
+    return upserted
@@ -0,0 +1,212 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from backend.constants import ALREADY_CREATED, INVALID_DATA, USERS_CREATE
+from backend.courses.models import Course, Material, Passing, Task, UserCourseSettings
+from backend.users import activity
+from backend.users.models import Company, User, UserActivity
+from backend.users.partitions import DEFAULT_PARTITION, activity_partitions, create_activity_partitions
+from backend.users.utils import PARALLEL_HASH_MIN, _hash_passwords, creat_users
+
+
+class CuratorUsersListViewTest(APITestCase):
+    """
+    Список пользователей куратора: прохождения по курсам загружаются на всю страницу (CuratorPassingsReport)
+    """
+    url = '/api/v1/curator/ref/users/'
+
+    def setUp(self):
+        company = Company.objects.create(title='Компания')
+        curator = User.objects.create(username='curator', user_status=User.STATUS_CURATOR)
+        curator.curator_company.add(company)
+        self.client.force_authenticate(curator)
+
+        course = Course.objects.create(title='Курс')
+        material = Material.objects.create(course=course, title='Материал')
+        tasks = [
+            Task.objects.create(material=material, title=title, is_final=is_final, travel_time=datetime.time(hour=1))
+            for title, is_final in (('Промежуточный', False), ('Итоговый', True))
+        ]
+        for index in range(5):
+            user = User.objects.create(username=f'client{index}', company=company)
+            course.users.add(user)
+            for task in tasks:
+                Passing.objects.create(task=task, user=user)
+                Passing.objects.create(task=task, user=user, is_trial=True)
+        # max_points при создании пересчитывается сигналом по вопросам задания
+        Passing.objects.filter(is_trial=False).update(user_points=1, max_points=2)
+
+    def get(self, page_size):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return response, len(queries)
+
+    def test_passings(self):
+        response, _ = self.get(5)
+        course = response.data['results'][0]['courses'][0]
+        self.assertEqual(len(course['intermediate_passings']), 1)
+        self.assertEqual(len(course['final_passings']), 2)
+        self.assertEqual(
+            sorted(passing['response_rate'] for passing in course['final_passings']),
+            ['0:0', '50%'],
+        )
+
+    def test_num_queries_do_not_depend_on_page_size(self):
+        _, small = self.get(1)
+        _, large = self.get(5)
+        self.assertEqual(small, large)
+
+
+@mock.patch('backend.users.activity._ensure_flusher', mock.Mock())
+class LastActiveFlushTest(TestCase):
+    """
+    Пакетная запись User.last_active из буфера процесса
+    """
+
+    def setUp(self):
+        activity._buffer.clear()
+        self.user = User.objects.create(username='client')
+
+    def tearDown(self):
+        activity._buffer.clear()
+
+    def test_flush(self):
+        moment = timezone.now()
+        activity.touch(self.user.pk, moment)
+        self.assertEqual(activity.flush(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_active, moment)
+
+        # Более раннее время не перезаписывает записанное
+        activity.touch(self.user.pk, moment - datetime.timedelta(minutes=1))
+        activity.flush()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_active, moment)
+
+    def test_failed_flush_keeps_buffer(self):
+        moment = timezone.now()
+        activity.touch(self.user.pk, moment)
+        with mock.patch('backend.users.activity.connection') as broken:
+            broken.cursor.side_effect = DatabaseError
+            with self.assertRaises(DatabaseError):
+                activity.flush()
+        self.assertEqual(activity._buffer, {self.user.pk: moment})
+
+        # Пока запись не удалась, пришла более ранняя активность - в буфере остается более позднее время
+        activity.touch(self.user.pk, moment - datetime.timedelta(minutes=1))
+        self.assertEqual(activity.flush(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_active, moment)
+
+
+class ActivityPartitionsTest(TestCase):
+    """
+    Помесячные секции UserActivity
+    """
+
+    def test_rows_moved_from_default_partition(self):
+        user = User.objects.create(username='client')
+        today = datetime.date.today()
+        # За пределами созданных миграцией секций - запись попадает в секцию по умолчанию
+        future = datetime.datetime(today.year + 2, 1, 15, tzinfo=datetime.timezone.utc)
+        activity.insert_heartbeats([(user.pk, True, None, {}, future.timestamp())])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {DEFAULT_PARTITION}')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        created = create_activity_partitions(months_ahead=1, today=future.date())
+        self.assertEqual(created, [f'{UserActivity._meta.db_table}_{today.year + 2}_01',
+                                   f'{UserActivity._meta.db_table}_{today.year + 2}_02'])
+        self.assertIn(future.date().replace(day=1), activity_partitions())
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {DEFAULT_PARTITION}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+            cursor.execute(f'SELECT count(*) FROM {created[0]}')
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(UserActivity.objects.filter(user=user, created=future).count(), 1)
+
+        # Повторный вызов секции не пересоздает
+        self.assertEqual(create_activity_partitions(months_ahead=1, today=future.date()), [])
+
+
+def users_text(*users):
+    """
+    Текстовое представление пользователей для creat_users: (ФИО, логин, пароль, компания)
+    """
+    return '\n'.join(
+        f'{index}.\n{name}\n{login}\n{password}\n{company}\n2021-01-10 00:00:00\n2021-06-30 00:00:00'
+        for index, (name, login, password, company) in enumerate(users, start=1)
+    )
+
+
+# Быстрый хешер - в тестах важен не алгоритм, а то, что пароль проверяется
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MassUsersCreationTest(TestCase):
+    """
+    Пакетное создание пользователей с компаниями, записью на курс и UserCourseSettings
+    """
+
+    def setUp(self):
+        self.company = Company.objects.create(title='Компания')
+        self.course = Course.objects.create(title='Курс')
+
+    def test_create_with_course(self):
+        status, message, users, code = creat_users(users_text(
+            ('Иван Иванов', 'ivanov', 'secret1', 'Компания'),
+            ('Петр Петров', 'petrov', 'secret2', 'Новая компания'),
+        ), self.course.pk)
+        self.assertEqual((status, code), (True, USERS_CREATE), message)
+        self.assertEqual([user.username for user in users], ['ivanov', 'petrov'])
+
+        ivanov = User.objects.get(username='ivanov')
+        petrov = User.objects.get(username='petrov')
+        self.assertEqual(ivanov.first_name, 'Иван Иванов')
+        self.assertEqual(ivanov.company, self.company)
+        self.assertEqual(petrov.company.title, 'Новая компания')
+        self.assertTrue(check_password('secret2', petrov.password))
+        self.assertEqual((ivanov.start_course, ivanov.end_course), (datetime.date(2021, 1, 10), datetime.date(2021, 6, 30)))
+
+        self.assertEqual(set(self.course.users.all()), {ivanov, petrov})
+        settings = UserCourseSettings.objects.filter(course=self.course).order_by('user__username')
+        self.assertEqual([item.user for item in settings], [ivanov, petrov])
+        self.assertEqual(settings[0].start_course.date(), datetime.date(2021, 1, 10))
+        self.assertEqual(settings[0].end_course.date(), datetime.date(2021, 6, 30))
+
+    def test_create_without_course(self):
+        status, message, users, code = creat_users(users_text(('Иван Иванов', 'ivanov', 'secret', 'Компания')))
+        self.assertEqual((status, code), (True, USERS_CREATE), message)
+        self.assertFalse(self.course.users.exists())
+        self.assertFalse(UserCourseSettings.objects.exists())
+
+    def test_existing_username(self):
+        User.objects.create(username='ivanov')
+        status, message, users, code = creat_users(users_text(
+            ('Иван Иванов', 'ivanov', 'secret', 'Компания'),
+            ('Петр Петров', 'petrov', 'secret', 'Компания'),
+        ), self.course.pk)
+        self.assertEqual((status, code, users), (False, ALREADY_CREATED, ['ivanov']))
+        self.assertFalse(User.objects.filter(username='petrov').exists())
+
+    def test_unknown_course(self):
+        status, message, users, code = creat_users(
+            users_text(('Иван Иванов', 'ivanov', 'secret', 'Компания')),
+            self.course.pk + 100,
+        )
+        self.assertEqual((status, code), (False, INVALID_DATA))
+        self.assertFalse(User.objects.filter(username='ivanov').exists())
+
+    @override_settings(PASSWORD_HASH_WORKERS=2)
+    def test_hash_passwords_in_pool(self):
+        passwords = [f'secret{index}' for index in range(PARALLEL_HASH_MIN)]
+        hashed = _hash_passwords(passwords)
+        self.assertEqual(len(hashed), len(passwords))
+        self.assertTrue(all(check_password(password, value) for password, value in zip(passwords, hashed)))
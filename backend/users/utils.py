@@ -1,14 +1,25 @@
+import logging
+import multiprocessing
 import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
+from django.db import transaction
 from rest_framework import serializers
 
 from backend.constants import USERS_CREATE, PARSE_ERROR, ALREADY_CREATED, INVALID_DATA
-from backend.courses.models import Course
+from backend.courses.models import Course, UserCourseSettings
 from backend.users.models import User, Company
 
+logger = logging.getLogger(__name__)
+
+# С какого кол-ва паролей хешировать в пуле процессов
+PARALLEL_HASH_MIN = 50
+
 
 def file_validator(file):
     """
@@ -29,6 +40,114 @@ def file_validator(file):
     return file
 
 
+def users_file_to_text(file_users):
+    """
+    Текстовое представление пользователей из файла '.xlsx' (формат как у text_users)
+    """
+    from openpyxl import load_workbook
+
+    txt = ''
+    wb = load_workbook(filename=file_users, read_only=True)
+    sheet = wb.active
+
+    for idx, row in enumerate(sheet.rows):
+
+        # Пропускаем первую строку - названия стобцов
+        if idx == 0:
+            continue
+
+        for cell in row:
+            if not cell.value:
+                break
+            txt += str(cell.value) + '\n'
+    return txt
+
+
+def parse_users_text(text):
+    """
+    Разбор текстового представления пользователей
+    :return: list, [[ФИО, логин, пароль, компания, начало курса, конец курса], ...]
+    """
+    user_list = [usr.strip() for usr in re.split('\d+\.', text) if usr]
+    return [user_data.split('\n') for user_data in user_list]
+
+
+def _hash_passwords(passwords):
+    """
+    Хеширование паролей (make_password), при большом кол-ве - параллельно в пуле процессов.
+    В демонических процессах (воркеры celery) дочерние процессы запрещены - хешируем последовательно.
+    """
+    workers = settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+    if workers < 2 or len(passwords) < PARALLEL_HASH_MIN or multiprocessing.current_process().daemon:
+        return [make_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+def creat_users_rows(rows, course=None, design=None):
+    """
+    Создание пользователей из разобранных строк, с записью на курс
+    Компании, пользователи, записи на курс и UserCourseSettings создаются пакетными вставками в одной транзакции
+    :param rows: list, [[ФИО, логин, пароль, компания, начало курса, конец курса], ...]
+    :return: list, созданные пользователи
+    """
+    des = design or User.DEFAULT_DESIGN
+    if not rows:
+        return []
+
+    parsed = []
+    for name, login, password, company, start_course, end_course in rows:
+        parsed.append((
+            name.strip(),
+            login.strip(),
+            password.strip(),
+            company.strip(),
+            datetime.strptime(start_course.strip(), "%Y-%m-%d %H:%M:%S").date(),
+            datetime.strptime(end_course.strip(), "%Y-%m-%d %H:%M:%S").date(),
+        ))
+
+    hashed_passwords = _hash_passwords([row[2] for row in parsed])
+
+    with transaction.atomic():
+        titles = {row[3] for row in parsed}
+        companies = dict(Company.objects.filter(title__in=titles).values_list('title', 'id'))
+        missing = titles - companies.keys()
+        if missing:
+            Company.objects.bulk_create([Company(title=title) for title in missing], ignore_conflicts=True)
+            companies.update(Company.objects.filter(title__in=missing).values_list('title', 'id'))
+
+        result_list = User.objects.bulk_create([
+            User(
+                first_name=name,
+                username=login,
+                password=hashed_password,
+                old_password=password,
+                company_id=companies[company],
+                start_course=start_date,
+                end_course=end_date,
+                design=des,
+            )
+            for (name, login, password, company, start_date, end_date), hashed_password in zip(parsed, hashed_passwords)
+        ])
+
+        if course:
+            through = Course.users.through
+            through.objects.bulk_create([
+                through(course_id=course.pk, user_id=user.pk) for user in result_list
+            ], ignore_conflicts=True)
+            UserCourseSettings.objects.bulk_create([
+                UserCourseSettings(
+                    user=user,
+                    course=course,
+                    start_course=user.start_course,
+                    end_course=user.end_course,
+                ) for user in result_list
+            ])
+    return result_list
+
+
 def creat_users(text, course_id=None, design=None):
     """
     Создание пользователей из текстового представления
@@ -37,7 +156,6 @@ def creat_users(text, course_id=None, design=None):
     result_list = []
     code = USERS_CREATE
     course = None
-    des = design or User.DEFAULT_DESIGN
 
     if course_id:
         try:
@@ -49,8 +167,7 @@ def creat_users(text, course_id=None, design=None):
             return status, message, result_list, code
 
     try:
-        user_list = [usr.strip() for usr in re.split('\d+\.', text) if usr]
-        fin_list = [user_data.split('\n') for user_data in user_list]
+        fin_list = parse_users_text(text)
         names = [name[1].strip() for name in fin_list]
     except Exception as ex:
         status = False
@@ -60,14 +177,8 @@ def creat_users(text, course_id=None, design=None):
     else:
 
         # Проверка на уже существующих пользователей
-        old_users = []
-        for name in names:
-            try:
-                User.objects.get(username=name)
-            except User.DoesNotExist:
-                pass
-            else:
-                old_users.append(name)
+        existing = set(User.objects.filter(username__in=names).values_list('username', flat=True))
+        old_users = [name for name in names if name in existing]
         if old_users:
             status = False
             message = f'Пользователи с ником <{", ".join(old_users)}> уже существуют'
@@ -76,30 +187,12 @@ def creat_users(text, course_id=None, design=None):
             return status, message, result_list, code
 
         try:
-            objects = []
-            for name, login, password, company, start_course, end_course in fin_list:
-                real_company, created = Company.objects.get_or_create(title=company.strip())
-
-                start_date = datetime.strptime(start_course.strip(), "%Y-%m-%d %H:%M:%S").date()
-                end_date = datetime.strptime(end_course.strip(), "%Y-%m-%d %H:%M:%S").date()
-
-                objects.append(
-                    User(
-                        first_name=name.strip(),
-                        username=login.strip(),
-                        password=make_password(password.strip()),
-                        old_password=password.strip(),
-                        company=real_company,
-                        start_course=start_date,
-                        end_course=end_date,
-                        design=des,
-                    )
-                )
-            if objects:
-                result_list = User.objects.bulk_create(objects)
-            if course:
-                course.users.add(*result_list)
-            message = f'Созданы пользователи: {names}'
+            start = time.monotonic()
+            result_list = creat_users_rows(fin_list, course, design)
+            elapsed = time.monotonic() - start
+            speed = len(result_list) / elapsed if elapsed else 0
+            logger.info(f'Создано пользователей: {len(result_list)} за {elapsed:.1f} сек. ({speed:.1f} польз./сек.)')
+            message = f'Созданы пользователи: {names} ({speed:.1f} польз./сек.)'
         except Exception as ex:
             status = False
             message = f'{type(ex)}: {ex.__str__()}'
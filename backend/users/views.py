@@ -1,21 +1,20 @@
 import json
-from math import ceil
 from datetime import timedelta
 
 from django.db.models import Q
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet, DateFilter
 from django.utils import timezone
-from django.db.models import Count
 
 from rest_framework import filters
 from rest_framework import generics, status
 from rest_framework import permissions
 from rest_framework.generics import UpdateAPIView
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from backend.api_v1.filters import TrigramSearchFilter
 from backend.api_v1.permissions import (
     IsModerator,
     IsAdministrator,
@@ -28,6 +27,7 @@ from backend.api_v1.permissions import (
 from backend.api_v1.utils import response_success, response_error
 from backend.constants import INVALID_DATA, ALREADY_CREATED
 from backend.courses.models import Course
+from backend.courses.progress import CourseProgressReport, company_progress, company_rollup
 from backend.users.models import Company, User, UserDayActivity, UserOnlineHistory, UserActivity, UserLogErrors
 from backend.users.serializers import (
     CompanySerializer,
@@ -46,7 +46,6 @@ from backend.users.serializers import (
     SingleUserSerializer,
     UserLogErrorsSerializer
     )
-from backend.courses.models import UserCourseSettings
 
 
 class CompanyListCreate(generics.ListCreateAPIView):
@@ -115,12 +114,6 @@ class MassUsersCreation(generics.GenericAPIView):
                     ) for user in result_list
                 ])
 
-                if serializer.data.get('course_id'):
-                    for user in result_list:
-                        UserCourseSettings.objects.create(user=user, course_id=serializer.data.get('course_id'),
-                                                    start_course=user.start_course,
-                                                    end_course=user.end_course)
-
                 return response_success(code, message, res, status.HTTP_201_CREATED)
             else:
                 return response_error(code, message, {'already_exist': result_list}, status.HTTP_400_BAD_REQUEST)
@@ -182,11 +175,21 @@ class UsersPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
 
 
+def get_moderator_user_ids(moderator):
+    """
+    Подзапрос id пользователей курсов, которые модератор ведет или модерирует
+    (без join пользователей с курсами, строки пользователей не размножаются)
+    """
+    return Course.users.through.objects.filter(
+        Q(course__author=moderator) | Q(course__moderators=moderator)
+    ).values('user_id')
+
+
 class UserListExamsCreate(generics.ListCreateAPIView):
     serializer_class = UserSerializer
     pagination_class = UsersPagination
     permission_classes = (permissions.IsAuthenticated, IsModerator)
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, TrigramSearchFilter)
     filterset_fields = (
         'user_status',
         'company',
@@ -202,30 +205,21 @@ class UserListExamsCreate(generics.ListCreateAPIView):
 
     def get_queryset(self):
         if self.request.user and self.request.user.is_authenticated and is_administrator(self.request.user):
-            return User.objects.with_select_related().with_prefetch_related().with_last_passing_date().annotate(
-                course_count=Count('courses')).filter(
-                        passings__task__is_final=True,
-                        passings__success_passed=0,
-                        passings__is_trial=False,
-                        passings__finish_time__isnull=False
-                    )
+            users = User.objects.all()
         elif self.request.user and self.request.user.is_authenticated and is_moderator(self.request.user):
-            return User.objects.filter(
-                Q(courses__author=self.request.user) |
-                Q(courses__moderators=self.request.user)
-            ).with_select_related().with_prefetch_related().with_last_passing_date().annotate(
-                course_count=Count('courses')).filter(
-                        passings__task__is_final=True,
-                        passings__success_passed=0,
-                        passings__is_trial=False,
-                        passings__finish_time__isnull=False
-                    )
+            users = User.objects.filter(pk__in=get_moderator_user_ids(self.request.user))
+        else:
+            return User.objects.none()
+        # Есть успешно пройденный финальный тест
+        return users.with_select_related().with_last_task_passings().with_last_passing_date().with_course_count(
+        ).filter(last_passing_dt__isnull=False)
+
 
 class UserListCreate(generics.ListCreateAPIView):
     serializer_class = UserSerializer
     pagination_class = UsersPagination
     permission_classes = (permissions.IsAuthenticated, IsModerator)
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, TrigramSearchFilter)
     filterset_fields = (
         'user_status',
         'company',
@@ -241,14 +235,13 @@ class UserListCreate(generics.ListCreateAPIView):
 
     def get_queryset(self):
         if self.request.user and self.request.user.is_authenticated and is_administrator(self.request.user):
-            return User.objects.with_select_related().with_prefetch_related().with_passing_on_check().annotate(
-                course_count=Count('courses'))
+            users = User.objects.all()
         elif self.request.user and self.request.user.is_authenticated and is_moderator(self.request.user):
-            return User.objects.filter(
-                Q(courses__author=self.request.user) |
-                Q(courses__moderators=self.request.user)
-            ).with_select_related().with_prefetch_related().with_passing_on_check().annotate(
-                course_count=Count('courses'))
+            users = User.objects.filter(pk__in=get_moderator_user_ids(self.request.user))
+        else:
+            return User.objects.none()
+        # Аннотации подзапросами, последние прохождения заданий - один запрос на страницу
+        return users.with_select_related().with_last_task_passings().with_passing_on_check().with_course_count()
 
 
 class UserDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -419,11 +412,23 @@ class CuratorUserViewSet(ModelViewSet):
         return User.objects.prefetch_related(
             'days_activity',
             'courses',
-            'courses__materials',
         ).select_related(
             'company',
         ).with_annotations().for_curator(self.request.user.curator_company.all()).distinct()
 
+    def get_serializer(self, *args, **kwargs):
+        # Прогресс по курсам загружается на весь список пользователей сразу
+        if kwargs.get('many') and args:
+            users = list(args[0])
+            self.progress_report = CourseProgressReport(users)
+            args = (users,) + args[1:]
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['progress_report'] = getattr(self, 'progress_report', None)
+        return context
+
 
 class CuratorUserProgressView(generics.GenericAPIView):
     """
@@ -444,19 +449,9 @@ class CuratorUserProgressView(generics.GenericAPIView):
 
         course = Course.objects.filter(users=user).first()
 
-        all_tasks_count = course.get_all_tasks().count()
-        success_task_count = course.get_success_tasks_for_user(user).count()
-
-        all_course_materials_count = course.get_all_materials().count()
-        passed_materials_count = course.get_passed_materials_for_user(
-            user
-        ).count()
-
-        try:
-            result = ceil((success_task_count + all_course_materials_count) /
-                          (all_tasks_count + passed_materials_count) * 100)
-        except ZeroDivisionError:
-            result = 0
+        # Один сгруппированный запрос по UserCourseProgress (backend.courses.progress)
+        rows = company_progress(course_id=course.id, user_id=user.pk)
+        result = rows[0]['progress'] if rows else 0
 
         res.update({
             'user_id': user_pk,
@@ -466,6 +461,51 @@ class CuratorUserProgressView(generics.GenericAPIView):
         return Response(res, status=status.HTTP_200_OK)
 
 
+def get_curator_company_ids(request):
+    """
+    id курируемых компаний пользователя, ?company=<id> - только эта компания
+    """
+    companies = request.user.curator_company.all()
+    company_id = request.query_params.get('company')
+    if company_id:
+        companies = companies.filter(pk=int(company_id))
+    return list(companies.values_list('id', flat=True))
+
+
+class CuratorCompanyProgressView(generics.GenericAPIView):
+    """
+    Прогресс всех пользователей курируемых компаний по курсам одним запросом
+    ?company=<id> - одна из курируемых компаний, ?course=<id> - один курс
+    """
+    permission_classes = (permissions.IsAuthenticated, IsCurator)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            company_ids = get_curator_company_ids(request)
+            course_id = request.query_params.get('course')
+            course_id = course_id and int(course_id)
+        except ValueError as ex:
+            return response_error(INVALID_DATA, 'invalid data', str(ex), status.HTTP_400_BAD_REQUEST)
+
+        return Response(company_progress(company_ids, course_id=course_id), status=status.HTTP_200_OK)
+
+
+class CuratorCompanyRollupView(generics.GenericAPIView):
+    """
+    Сводка прогресса по курируемым компаниям для обзора (кэшируется)
+    ?company=<id> - одна из курируемых компаний
+    """
+    permission_classes = (permissions.IsAuthenticated, IsCurator)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            company_ids = get_curator_company_ids(request)
+        except ValueError as ex:
+            return response_error(INVALID_DATA, 'invalid data', str(ex), status.HTTP_400_BAD_REQUEST)
+
+        return Response([company_rollup(company_id) for company_id in company_ids], status=status.HTTP_200_OK)
+
+
 class UserDayActivityViewSet(ModelViewSet):
     """
     Пользовательская активность по дням
@@ -523,16 +563,30 @@ class CourseClientADView(generics.GenericAPIView):
         return response_error(INVALID_DATA, 'invalid data', serializer.errors, status.HTTP_400_BAD_REQUEST)
 
 
+class UserActivityPagination(CursorPagination):
+    """
+    Постраничная выдача активности по курсору created - без OFFSET по секционированной таблице
+    """
+    page_size = 500
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('-created', '-id')
+
+
 class UserActivityDetailsViewSet(ModelViewSet):
     """
     Пользовательская активность детальная
+    Сводка по дням - UserDayActivityViewSet (UserDayActivity)
     """
 
     queryset = UserActivity.objects.all()
     serializer_class = UserActivityDetailsSerializer
+    pagination_class = UserActivityPagination
     permission_classes = (permissions.IsAuthenticated, IsModerator)
     http_method_names = ['get']
-    ordering_fields = '__all__'
+    ordering_fields = ('created',)
+    # CursorPagination берет сортировку из OrderingFilter
+    ordering = ('-created', '-id')
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter,)
     filterset_fields = (
         'id',